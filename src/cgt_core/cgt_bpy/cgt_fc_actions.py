@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 from typing import List
 from collections import namedtuple
 
@@ -35,6 +36,52 @@ class FCurveHelper:
             fc.keyframe_points.foreach_set("co", [x for co in zip(frames, samples) for x in co])
             fc.update()
 
+    def foreach_insert(self, data_path: str, frames: List[int], *args: List[float]):
+        """ Insert multiple keyframes at once, existing keyframes are kept.
+            Keyframes at the inserted frames get their value replaced like keyframe_insert does,
+            their handles move along. Only not yet keyed frames get added.
+            data_path: String Enum [location, scale, rotation_euler, rotation_quaternion]
+            frames: flat list of int
+            args: flat lists of float """
+        f_curves = self.get_f_curves(data_path)
+        frames = np.asarray(frames, dtype=np.float32)
+
+        for samples, fc in zip(args, f_curves):
+            if fc is None:
+                continue
+            samples = np.asarray(samples, dtype=np.float32)
+            points = fc.keyframe_points
+
+            # match the frames to the existing keyframes
+            count = len(points)
+            co = np.empty(count * 2, dtype=np.float32)
+            points.foreach_get("co", co)
+            co = co.reshape(-1, 2)
+            order = np.argsort(co[:, 0], kind='stable')
+            pos = np.minimum(np.searchsorted(co[order, 0], frames), max(count - 1, 0))
+            keyed = co[order[pos], 0] == frames if count else np.zeros(len(frames), dtype=bool)
+
+            # replace the values of keyed frames in place
+            if keyed.any():
+                idx = order[pos[keyed]]
+                delta = samples[keyed] - co[idx, 1]
+                co[idx, 1] = samples[keyed]
+                points.foreach_set("co", co.ravel())
+                for handle in ("handle_left", "handle_right"):
+                    handles = np.empty(count * 2, dtype=np.float32)
+                    points.foreach_get(handle, handles)
+                    handles = handles.reshape(-1, 2)
+                    handles[idx, 1] += delta
+                    points.foreach_set(handle, handles.ravel())
+
+            # append the new keyframes, foreach_set can only write all points
+            new = ~keyed
+            if new.any():
+                points.add(count=int(new.sum()))
+                co = np.concatenate([co, np.column_stack([frames[new], samples[new]])])
+                points.foreach_set("co", co.ravel())
+            fc.update()
+
     def update(self, data_path: str):
         if not hasattr(self, data_path):
             raise KeyError
@@ -50,7 +97,11 @@ class FCurveHelper:
         return s
 
 
-def create_actions(objects, overwrite: bool = True):
+DATA_PATHS = [('location', 3), ('rotation_euler', 3), ('scale', 3), ('rotation_quaternion', 4)]
+
+
+def create_actions(objects, overwrite: bool = True, data_paths: List[str] = None):
+    """ Returns f-curve helpers of the objects actions, f-curves of the data paths get added if missing. """
     actions = []
 
     # get or create actions for objs
@@ -58,6 +109,11 @@ def create_actions(objects, overwrite: bool = True):
         action_name = ob.name
         ad = ob.animation_data_create()
 
+        # keep the current action of the object
+        if overwrite is False and ad.action is not None:
+            actions.append(ad.action)
+            continue
+
         # remove old action from objects animation data (default)
         action_data = bpy.data.actions
         if action_name in action_data:
@@ -79,23 +135,18 @@ def create_actions(objects, overwrite: bool = True):
     for action in actions:
         # add existing data_paths to helper obj
         helper = FCurveHelper()
-        offset, last = 0, None
-
-        fc_data_paths = set()
-        for i, fc in action.fcurves.items():
-            if fc.group.name != last:
-                fc_data_paths.add(fc.group.name)
-                last = fc.group.name
-                offset = i
-            m_data_path = getattr(helper, fc.group.name)
-            m_data_path[i - offset] = fc
+        for fc in action.fcurves:
+            m_data_path = getattr(helper, fc.data_path, None)
+            if isinstance(m_data_path, list) and fc.array_index < len(m_data_path):
+                m_data_path[fc.array_index] = fc
 
         # add new fcurve
-        for data_path, indexes in [('location', 3), ('rotation_euler', 3), ('scale', 3), ('rotation_quaternion', 4)]:
-            if data_path in fc_data_paths:
+        for data_path, indexes in DATA_PATHS:
+            if data_paths is not None and data_path not in data_paths:
                 continue
-
             for i in range(0, indexes):
+                if getattr(helper, data_path)[i] is not None:
+                    continue
                 try:
                     fc = action.fcurves.new(
                         data_path=data_path,
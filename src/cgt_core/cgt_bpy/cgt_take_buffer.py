@@ -0,0 +1,125 @@
+""" Columnar recording of a take.
+    Output nodes write the transforms of their objects into (frames, objects, channels) float32
+    arrays instead of inserting keyframes per object and frame. The arrays grow in chunks, once
+    the take ends all keyframes get written to the f-curves at once. """
+from __future__ import annotations
+import logging
+from typing import List, Dict, Optional, Sequence, Any
+
+import bpy
+import numpy as np
+
+from . import cgt_fc_actions
+
+
+# channels per data path
+CHANNELS = {
+    'location': 3,
+    'rotation_euler': 3,
+    'scale': 3,
+}
+
+
+class TakeBuffer:
+    def __init__(self, objects: List[bpy.types.Object], chunk_size: int = 256):
+        """ objects: objects of the take, writes refer to their index.
+            chunk_size: frames allocated at once, the buffer grows at least by a chunk. """
+        self.objects = objects
+        self.chunk_size = chunk_size
+        self.capacity = 0
+        self.length = 0
+        self.frames = np.empty(0, dtype=np.int32)
+        # arrays get allocated on the first write of a data path, nan if not keyed
+        self.data: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return self.length
+
+    def reserve(self, capacity: int):
+        """ Grows the arrays to hold at least capacity frames. """
+        if capacity <= self.capacity:
+            return
+
+        # grow in whole chunks, by half of the current size for long takes
+        capacity = max(capacity, self.capacity + max(self.chunk_size, self.capacity // 2))
+        capacity = -(-capacity // self.chunk_size) * self.chunk_size
+
+        frames = np.empty(capacity, dtype=np.int32)
+        frames[:self.length] = self.frames[:self.length]
+        self.frames = frames
+        for data_path, arr in self.data.items():
+            self.data[data_path] = self.allocate(data_path, capacity)
+            self.data[data_path][:self.length] = arr[:self.length]
+        self.capacity = capacity
+
+    def allocate(self, data_path: str, capacity: int) -> np.ndarray:
+        return np.full((capacity, len(self.objects), CHANNELS[data_path]), np.nan, dtype=np.float32)
+
+    def row(self, frame: int) -> int:
+        """ Row of the frame, frames get appended in order. """
+        if self.length > 0 and self.frames[self.length - 1] == frame:
+            return self.length - 1
+
+        self.reserve(self.length + 1)
+        self.frames[self.length] = frame
+        self.length += 1
+        return self.length - 1
+
+    def write(self, data_path: str, frame: int, indices: Sequence[int], values: Any, offset: int = 0):
+        """ Writes the values of the objects at offset + indices, indices exceeding the objects get ignored. """
+        if len(indices) == 0:
+            return
+
+        row = self.row(frame)
+        if data_path not in self.data:
+            self.data[data_path] = self.allocate(data_path, self.capacity)
+
+        indices = np.asarray(indices) + offset
+        valid = indices < len(self.objects)
+        self.data[data_path][row, indices[valid]] = np.asarray(values, dtype=np.float32)[valid]
+
+    def view(self, data_path: str, idx: Optional[int] = None) -> Optional[np.ndarray]:
+        """ View of the recorded (frames, objects, channels) values or (frames, channels) of an object. """
+        arr = self.data.get(data_path)
+        if arr is None:
+            return None
+        if idx is None:
+            return arr[:self.length]
+        return arr[:self.length, idx]
+
+    def clear(self):
+        """ Drops the recorded frames, keeps the allocated memory. """
+        for arr in self.data.values():
+            arr[:self.length] = np.nan
+        self.length = 0
+
+    def flush(self):
+        """ Writes the recorded frames to the f-curves of the objects and clears the buffer. """
+        if self.length == 0:
+            return
+
+        # objects grouped by their recorded data paths
+        frames = self.frames[:self.length]
+        groups: Dict[tuple, List[int]] = {}
+        for idx in range(len(self.objects)):
+            data_paths = tuple(data_path for data_path, arr in self.data.items()
+                               if not np.isnan(arr[:self.length, idx, 0]).all())
+            if data_paths:
+                groups.setdefault(data_paths, []).append(idx)
+
+        for data_paths, indices in groups.items():
+            try:
+                helpers = cgt_fc_actions.create_actions(
+                    [self.objects[idx] for idx in indices], overwrite=False, data_paths=list(data_paths))
+            except ReferenceError as err:
+                logging.error(f"Objects of the take have been removed: {err}")
+                continue
+
+            for idx, helper in zip(indices, helpers):
+                for data_path in data_paths:
+                    values = self.data[data_path][:self.length, idx]
+                    valid = ~np.isnan(values[:, 0])
+                    helper.foreach_insert(data_path, frames[valid], *values[valid].T)
+
+        logging.debug(f"Flushed {self.length} frames of {sum(map(len, groups.values()))} objects.")
+        self.clear()
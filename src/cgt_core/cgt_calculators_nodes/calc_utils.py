@@ -1,9 +1,23 @@
+import hashlib
 import numpy as np
 import logging
-from mathutils import Euler
+from typing import Optional, Dict, Sequence
 from . import cgt_math
 
 
+def landmark_locations(landmarks) -> np.ndarray:
+    """ Returns a (N, 3) copy of the landmark locations.
+        Expects a landmark array [x, y, z, visibility] or a list of [idx, [x, y, z]]. """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks[:, :3].astype(np.float64)
+    return np.array([landmark[1] for landmark in landmarks], dtype=np.float64)
+
+
+def fingerprint(landmarks: np.ndarray) -> bytes:
+    """ Digest of the raw landmark buffer. """
+    return hashlib.blake2b(np.ascontiguousarray(landmarks).data, digest_size=16).digest()
+
+
 class CustomData:
     idx = None
     loc = None
@@ -16,32 +30,56 @@ class CustomData:
 
 class ProcessorUtils:
     data = None
-    # array for comparison, as noise is present every frame values should change
     frame = 0
-    prev_rotation = {}
-    prev_sum = [0.0, 0.0]
-
-    def has_duplicated_results(self, data=None, detector_type=None, idx=0):
-        """ Sums data array values and compares them each frame to avoid duplicated values
-            in the timeline. This fixes duplicated frame issue mainly occurring on Windows. """
-        summed = np.sum([v[1] for v in data[:21]])
-        if summed == self.prev_sum[idx]:
+    # previous euler rotation per slot and whether the slot has been set, created per instance
+    prev_rotation: np.ndarray = None
+    has_prev_rotation: np.ndarray = None
+    # fingerprints of the previous landmarks per slot, created per instance
+    fingerprints: Dict[int, bytes] = None
+
+    def is_duplicated_frame(self, landmarks: Optional[np.ndarray], slot: int = 0) -> bool:
+        """ Compares the fingerprint of the raw landmarks with the previous landmarks of the slot.
+            As noise is present every frame values should change, duplicated camera frames
+            (mainly occurring on Windows) get skipped before calculating. """
+        if landmarks is None:
+            return False
+        if self.fingerprints is None:
+            self.fingerprints = {}
+
+        digest = fingerprint(landmarks)
+        if self.fingerprints.get(slot) == digest:
             return True
-
-        self.prev_sum[idx] = summed
+        self.fingerprints[slot] = digest
         return False
 
+    def reserve_rotation_slots(self, size: int):
+        """ Grows the previous rotation arrays to hold at least size slots. """
+        if self.prev_rotation is None:
+            self.prev_rotation = np.zeros((0, 3))
+            self.has_prev_rotation = np.zeros(0, dtype=bool)
+        if size > len(self.prev_rotation):
+            missing = size - len(self.prev_rotation)
+            self.prev_rotation = np.concatenate([self.prev_rotation, np.zeros((missing, 3))])
+            self.has_prev_rotation = np.concatenate([self.has_prev_rotation, np.zeros(missing, dtype=bool)])
+
+    def get_prev_rotation(self, slot: int) -> Optional[np.ndarray]:
+        """ Returns the previous euler rotation of the slot if available. """
+        if self.prev_rotation is None or slot >= len(self.prev_rotation) or not self.has_prev_rotation[slot]:
+            return None
+        return self.prev_rotation[slot]
+
+    def set_prev_rotation(self, slot: int, euler):
+        self.reserve_rotation_slots(slot + 1)
+        self.prev_rotation[slot] = euler
+        self.has_prev_rotation[slot] = True
+
     def quart_to_euler_combat(self, quart, idx, idx_offset=0, axis='XYZ'):
         """ Converts quart to euler rotation while comparing with previous rotation. """
-        if len(self.prev_rotation) > 0:
-            try:
-                combat = self.prev_rotation[idx + idx_offset]
-                return cgt_math.to_euler(quart, combat, axis)
-            except KeyError:
-                logging.debug(f"Invalid id to euler combat {idx}, {self.frame}")
-                return cgt_math.to_euler(quart)
-        else:
+        combat = self.get_prev_rotation(idx + idx_offset)
+        if combat is None:
+            logging.debug(f"Invalid id to euler combat {idx}, {self.frame}")
             return cgt_math.to_euler(quart)
+        return cgt_math.to_euler(quart, combat, axis)
 
     @staticmethod
     def offset_euler(euler, offset: list = None):
@@ -49,7 +87,7 @@ class ProcessorUtils:
         if offset is None:
             return euler
 
-        rotation = Euler((
+        rotation = cgt_math.euler_rotation((
             euler[0] + np.pi * offset[0],
             euler[1] + np.pi * offset[1],
             euler[2] + np.pi * offset[2],
@@ -63,26 +101,31 @@ class ProcessorUtils:
             return cgt_math.to_euler(quart_rotation)
 
         # initialize prev rotation
-        elif prev_rot_idx not in self.prev_rotation:
-            self.prev_rotation[prev_rot_idx] = cgt_math.to_euler(quart_rotation)
-            return self.prev_rotation[prev_rot_idx]
+        prev_rotation = self.get_prev_rotation(prev_rot_idx)
+        if prev_rotation is None:
+            euler_rot = self.offset_euler(cgt_math.to_euler(quart_rotation), offset)
 
         # get euler with combat
-        if offset is None:
-            euler_rot = cgt_math.to_euler(
-                quart_rotation,
-                self.prev_rotation[prev_rot_idx]
-            )
-            self.prev_rotation[prev_rot_idx] = euler_rot
-            return self.prev_rotation[prev_rot_idx]
+        elif offset is None:
+            euler_rot = cgt_math.to_euler(quart_rotation, prev_rotation)
 
         else:
             tmp_offset = [-o for o in offset]
-            euler_rot = cgt_math.to_euler(
-                quart_rotation,
-                self.offset_euler(self.prev_rotation[prev_rot_idx], tmp_offset)
-            )
-
-            self.prev_rotation[prev_rot_idx] = self.offset_euler(euler_rot, offset)
-            return self.prev_rotation[prev_rot_idx]
-
+            euler_rot = cgt_math.to_euler(quart_rotation, self.offset_euler(prev_rotation, tmp_offset))
+            euler_rot = self.offset_euler(euler_rot, offset)
+
+        self.set_prev_rotation(prev_rot_idx, euler_rot)
+        return euler_rot
+
+    def try_get_eulers(self, quarts: np.ndarray, slots: Sequence[int], offset: np.ndarray = None) -> np.ndarray:
+        """ Converts (N, 4) or (T, N, 4) quaternions at once, the eulers get compatible to the
+            previous rotations of their slots (N) and along the time axis.
+            Offsets (N, 3) using euler radians *pi get added to the eulers. """
+        slots = np.asarray(slots)
+        self.reserve_rotation_slots(int(slots.max()) + 1)
+        offset = np.zeros((len(slots), 3)) if offset is None else np.pi * np.asarray(offset, dtype=np.float64)
+        compat = np.where(self.has_prev_rotation[slots, None], self.prev_rotation[slots] - offset, 0)
+        eulers = cgt_math.quaternions_to_eulers(np.asarray(quarts, dtype=np.float64), compat) + offset
+        self.prev_rotation[slots] = eulers[-1] if eulers.ndim == 3 else eulers
+        self.has_prev_rotation[slots] = True
+        return eulers
@@ -0,0 +1,222 @@
+""" Temporal filters of landmark frames.
+    The filter state of every landmark is stored in numpy arrays, all landmarks of a frame get
+    filtered in one step. Landmarks which haven't been detected keep their state, the filter
+    restarts once they get detected again. Only the locations get filtered, the visibility is kept. """
+from __future__ import annotations
+from abc import abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple, Any
+
+import numpy as np
+
+from ..cgt_patterns import cgt_nodes
+from ..cgt_patterns.cgt_landmarks import LandmarkFrame
+
+
+State = Dict[str, np.ndarray]
+
+
+class LandmarkFilter(cgt_nodes.CalculatorNode):
+    reuses_data = True
+
+    def __init__(self, rate: float = 30.0):
+        """ rate: frames per second, time base of the filters. """
+        self.rate = rate
+        # state and output frame per landmark frame of the data (holistic data contains multiple frames)
+        self.states: Dict[int, State] = {}
+        self.outputs: Dict[int, LandmarkFrame] = {}
+
+    @abstractmethod
+    def init_state(self, x: np.ndarray) -> State:
+        """ Filter state of the (N, 3) landmark locations, arrays with the leading axis N. """
+        pass
+
+    @abstractmethod
+    def step(self, state: State, x: np.ndarray, dt: np.ndarray) -> Tuple[State, np.ndarray]:
+        """ Returns the next state and the filtered (N, 3) locations, dt (N, 1) in seconds. """
+        pass
+
+    def filter_frame(self, key: int, landmark_frame: LandmarkFrame, frame: int) -> LandmarkFrame:
+        x, valid = landmark_frame.data[:, :3], landmark_frame.mask
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = self.init_state(x)
+            state['frame'] = np.full(len(x), frame, dtype=np.float64)
+            state['valid'] = np.zeros(len(x), dtype=bool)
+
+        # restart the filter of landmarks which haven't been detected in the previous frame
+        restart = valid & ~state['valid']
+        if restart.any():
+            for name, value in self.init_state(x[restart]).items():
+                state[name][restart] = value
+
+        dt = np.maximum(frame - state['frame'], 1)[:, None] / self.rate
+        next_state, filtered = self.step(state, x, dt)
+        update = valid & ~restart
+        for name, value in next_state.items():
+            state[name][update] = value[update]
+        state['frame'][valid] = frame
+        state['valid'][:] = valid
+
+        output = self.outputs.get(key)
+        if output is None or output.source != landmark_frame.source:
+            output = self.outputs[key] = LandmarkFrame(landmark_frame.source)
+        output.data[:] = landmark_frame.data
+        output.data[update, :3] = filtered[update]
+        output.mask[:] = valid
+        output.frame = landmark_frame.frame
+        return output
+
+    def update(self, data: Any, frame: int) -> Tuple[Any, int]:
+        """ Filters a landmark frame or a list of landmark frames, the output frames get reused. """
+        if isinstance(data, list):
+            return [self.filter_frame(key, landmark_frame, frame) for key, landmark_frame in enumerate(data)], frame
+        return self.filter_frame(0, data, frame), frame
+
+    def update_batch(self, data: Sequence[Any], frames: Sequence[int]) -> Tuple[List[Any], List[int]]:
+        results = []
+        for chunk, frame in zip(data, frames):
+            chunk, frame = self.update(chunk, frame)
+            results.append([f.copy() for f in chunk] if isinstance(chunk, list) else chunk.copy())
+        return results, list(frames)
+
+    def reset(self):
+        self.states = {}
+
+
+class OneEuroFilter(LandmarkFilter):
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 10.0, d_cutoff: float = 1.0, rate: float = 30.0):
+        """ Speed adaptive low pass filter (Casiez et al. 2012).
+            min_cutoff: cutoff frequency (Hz) at rest, lower values reduce jitter.
+            beta: increase of the cutoff frequency with the speed, higher values reduce lag. """
+        super().__init__(rate)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+
+    @staticmethod
+    def alpha(dt: np.ndarray, cutoff) -> np.ndarray:
+        return 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+
+    def init_state(self, x: np.ndarray) -> State:
+        return {'x': x.astype(np.float64), 'dx': np.zeros(x.shape)}
+
+    def step(self, state: State, x: np.ndarray, dt: np.ndarray) -> Tuple[State, np.ndarray]:
+        dx = (x - state['x']) / dt
+        dx_hat = state['dx'] + self.alpha(dt, self.d_cutoff) * (dx - state['dx'])
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        x_hat = state['x'] + self.alpha(dt, cutoff) * (x - state['x'])
+        return {'x': x_hat, 'dx': dx_hat}, x_hat
+
+
+class KalmanFilter(LandmarkFilter):
+    def __init__(self, measurement_noise: float = 0.01, process_noise: float = 5.0, rate: float = 30.0):
+        """ Constant velocity kalman filter per coordinate.
+            measurement_noise: standard deviation of the detected locations.
+            process_noise: standard deviation of the acceleration (per second²). """
+        super().__init__(rate)
+        self.r = measurement_noise ** 2
+        self.q = process_noise ** 2
+
+    def init_state(self, x: np.ndarray) -> State:
+        return {
+            'x': x.astype(np.float64), 'v': np.zeros(x.shape),
+            'p00': np.full(x.shape, self.r), 'p01': np.zeros(x.shape), 'p11': np.ones(x.shape),
+        }
+
+    def step(self, state: State, x: np.ndarray, dt: np.ndarray) -> Tuple[State, np.ndarray]:
+        # predict
+        pos = state['x'] + state['v'] * dt
+        p00 = state['p00'] + dt * (2 * state['p01'] + dt * state['p11']) + self.q * dt ** 4 / 4
+        p01 = state['p01'] + dt * state['p11'] + self.q * dt ** 3 / 2
+        p11 = state['p11'] + self.q * dt ** 2
+
+        # correct
+        k0, k1 = p00 / (p00 + self.r), p01 / (p00 + self.r)
+        residual = x - pos
+        pos = pos + k0 * residual
+        state = {
+            'x': pos, 'v': state['v'] + k1 * residual,
+            'p00': (1 - k0) * p00, 'p01': (1 - k0) * p01, 'p11': p11 - k1 * p01,
+        }
+        return state, pos
+
+
+@lru_cache(maxsize=64)
+def savgol_coefficients(window: int, order: int) -> np.ndarray:
+    """ (window, window) matrix, row p evaluates the least squares polynomial of the window at position p. """
+    vander = np.vander(np.arange(window) - window // 2, order + 1, increasing=True)
+    return vander @ np.linalg.pinv(vander)
+
+
+def savgol_smooth(x: np.ndarray, window: int, order: int) -> np.ndarray:
+    """ Zero phase Savitzky-Golay smoothing along the first axis,
+        the edges get evaluated using the polynomial of the first and last window. """
+    window = min(window, len(x) if len(x) % 2 else len(x) - 1)
+    if window <= order:
+        return x.copy()
+
+    half, coefficients = window // 2, savgol_coefficients(window, order)
+    out = np.empty(x.shape, dtype=np.float64)
+    windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+    out[half:len(x) - half] = windows @ coefficients[half]
+    out[:half] = np.tensordot(coefficients[:half], x[:window], axes=(1, 0))
+    out[len(x) - half:] = np.tensordot(coefficients[half + 1:], x[len(x) - window:], axes=(1, 0))
+    return out
+
+
+class SavitzkyGolayFilter(LandmarkFilter):
+    def __init__(self, window: int = 9, order: int = 2, rate: float = 30.0):
+        """ Least squares polynomial fit of the recent locations.
+            Streaming updates evaluate the fit at the latest frame, batches get smoothed zero phase.
+            window: number of frames (odd), order: polynomial order. """
+        super().__init__(rate)
+        self.window = window | 1
+        self.order = order
+
+    def init_state(self, x: np.ndarray) -> State:
+        return {'history': np.repeat(x[:, None].astype(np.float64), self.window, axis=1),
+                'count': np.ones(len(x), dtype=np.int64)}
+
+    def step(self, state: State, x: np.ndarray, dt: np.ndarray) -> Tuple[State, np.ndarray]:
+        history = np.concatenate([state['history'][:, 1:], x[:, None]], axis=1)
+        count = np.minimum(state['count'] + 1, self.window)
+
+        # fit the frames since the landmarks got detected
+        filtered = x.astype(np.float64)
+        for n in np.unique(count):
+            if n <= self.order:
+                continue
+            rows = count == n
+            filtered[rows] = np.einsum('w,nwc->nc', savgol_coefficients(n, self.order)[-1], history[rows, -n:])
+        return {'history': history, 'count': count}, filtered
+
+    def update_batch(self, data: Sequence[Any], frames: Sequence[int]) -> Tuple[List[Any], List[int]]:
+        """ Smooths the landmarks of consecutive detected frames zero phase. """
+        results = [[f.copy() for f in chunk] if isinstance(chunk, list) else chunk.copy() for chunk in data]
+        if not results:
+            return results, list(frames)
+
+        parts = zip(*results) if isinstance(results[0], list) else [results]
+        for landmark_frames in parts:
+            locations = np.stack([f.data[:, :3] for f in landmark_frames])
+            masks = np.stack([f.mask for f in landmark_frames])
+
+            # landmarks sharing their detected frames get smoothed together
+            patterns, rows = np.unique(masks.T, axis=0, return_inverse=True)
+            for idx, pattern in enumerate(patterns):
+                columns = np.flatnonzero(rows.ravel() == idx)
+                for start, end in runs(pattern):
+                    locations[start:end, columns] = savgol_smooth(
+                        locations[start:end, columns], self.window, self.order)
+
+            for landmark_frame, location in zip(landmark_frames, locations):
+                landmark_frame.data[:, :3] = location
+        return results, list(frames)
+
+
+def runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """ Start and end of consecutive True values. """
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return list(zip(edges[::2], edges[1::2]))
+
@@ -1,7 +1,28 @@
 import numpy as np
-from mathutils import Euler, Matrix, Vector, Quaternion
 from math import radians
 
+try:
+    from mathutils import Euler, Matrix, Vector, Quaternion
+except ImportError:
+    # outside of Blender (worker processes, ipc senders) rotations get calculated using numpy
+    Euler = Matrix = Vector = Quaternion = None
+
+
+# rotation backends, numpy quaternions are (w, x, y, z) arrays and eulers (x, y, z) arrays
+MATHUTILS = 'mathutils'
+NUMPY = 'numpy'
+backend = MATHUTILS if Euler is not None else NUMPY
+
+
+def set_backend(name: str):
+    """ Selects the backend creating matrices, quaternions and eulers. """
+    global backend
+    if name not in (MATHUTILS, NUMPY):
+        raise ValueError(f"Unknown rotation backend {name}")
+    if name == MATHUTILS and Euler is None:
+        raise ImportError("mathutils is only available inside of Blender")
+    backend = name
+
 
 # region vector cgt_utils
 def vector_length(vector: np.array):
@@ -135,8 +156,29 @@ def angle_between(v1: np.array, v2: np.array):
     return np.arccos(limited_dot)
 
 
+def row_dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Returns the dot products of vector arrays (..., 3) row by row. """
+    return np.einsum('...i,...i->...', a, b)
+
+
+def row_cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Cross product of the last axis, cheaper than np.cross for small arrays. """
+    a0, a1, a2 = a[..., 0], a[..., 1], a[..., 2]
+    b0, b1, b2 = b[..., 0], b[..., 1], b[..., 2]
+    return np.stack([a1 * b2 - a2 * b1, a2 * b0 - a0 * b2, a0 * b1 - a1 * b0], axis=-1)
+
+
+def angles_between(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Returns the angles in radians between vector arrays (..., 3) row by row. """
+    cos = row_dot(a, b) / (np.linalg.norm(a, axis=-1) * np.linalg.norm(b, axis=-1))
+    return np.arccos(np.clip(cos, -1.0, 1.0))
+
+
 def rotate_towards(origin, destination, track='Z', up='Y'):
     """ returns rotation from an origin to a destination. """
+    if backend == NUMPY:
+        return vector_to_track_quaternion(normalize(np.asarray(destination - origin, dtype=np.float64)), track, up)
+
     vec = Vector((destination - origin))
     vec = vec.normalized()
     quart = vec.to_track_quat(track, up)
@@ -309,39 +351,21 @@ def create_circle_around_vector(vector, center, radius, points, normal=None):
 
 
 # region rotation
+def euler_matrix(euler: list) -> np.ndarray:
+    """ Returns the matrix rotating row vectors by euler angles in degrees. """
+    x, y, z = [radians(angle) for angle in euler]
+    rx = np.array([[1, 0, 0], [0, np.cos(x), -np.sin(x)], [0, np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), -np.sin(z), 0], [np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return rx @ ry @ rz
+
+
 def rotate_point_euler(
         point: np.array = None,
         euler: list = None,
         origin: np.array = np.array([0, 0, 0])):
     """ Returns the location of a point rotated counterclockwise around an origin. """
-    point -= origin
-    phi = [radians(angle) for angle in euler]
-
-    def rx(theta):
-        return np.matrix([
-            [1, 0, 0],
-            [0, np.cos(theta), -np.sin(theta)],
-            [0, np.sin(theta), np.cos(theta)]
-        ])
-
-    def ry(theta):
-        return np.matrix([
-            [np.cos(theta), 0, np.sin(theta)],
-            [0, 1, 0],
-            [-np.sin(theta), 0, np.cos(theta)]
-        ])
-
-    def rz(theta):
-        return np.matrix([
-            [np.cos(theta), -np.sin(theta), 0],
-            [np.sin(theta), np.cos(theta), 0],
-            [0, 0, 1],
-        ])
-
-    matrix = rx(phi[0]) * ry(phi[1]) * rz(phi[2])
-    loc = point * matrix
-    loc = np.asarray(loc)[0] + origin
-    return loc
+    return (np.asarray(point) - origin) @ euler_matrix(euler) + origin
 
 
 def rotate_point(point, axis, angle):
@@ -406,6 +430,9 @@ def generate_matrix(tangent: np.array, normal: np.array, binormal: np.array):
     -> tangent = towards left and right [+X]
     -> normal = origin towards front [+Y]
     -> binormal = cross product of tanget and normal if +z1 [+Z] """
+    if backend == NUMPY:
+        return _generate_matrix(tangent, normal, binormal)
+
     return Matrix((
         [tangent[0], tangent[1], tangent[2], 0],
         [normal[0], normal[1], normal[2], 0],
@@ -414,20 +441,38 @@ def generate_matrix(tangent: np.array, normal: np.array, binormal: np.array):
     ))
 
 
-def decompose_matrix(matrix: Matrix) -> (Vector, Quaternion, Vector):
+def decompose_matrix(matrix):
     """ returns loc, quaternion, scale """
+    if isinstance(matrix, np.ndarray):
+        loc, quart, scale = _decompose_matrix(matrix)
+        return loc, quaternion_invert(quart), scale
+
     loc, quart, scale = matrix.decompose()
     quart.invert()
     return loc, quart, scale
 
 
-def to_euler(quart, combat=Euler(), space='XYZ') -> Euler:
-    """ quaternion to euler using mathutils """
+def euler_rotation(angles):
+    """ returns an euler rotation of the selected backend. """
+    if backend == NUMPY:
+        return np.array(angles, dtype=np.float64)
+    return Euler(angles)
+
+
+def to_euler(quart, combat=None, space='XYZ'):
+    """ quaternion to euler, the result is compatible to the combat rotation (zero by default) """
+    if isinstance(quart, np.ndarray):
+        return quaternion_to_euler(quart, combat, space)
+
+    if combat is None:
+        combat = Euler()
+    elif not isinstance(combat, Euler):
+        combat = Euler(combat)
     euler = quart.to_euler(space, combat)
     return euler
 
 
-def quart_to_euler_combat(quart, idx, idx_offset=0, axis='XYZ', prev_rotation=None) -> Euler:
+def quart_to_euler_combat(quart, idx, idx_offset=0, axis='XYZ', prev_rotation=None):
     """ Converts quart to euler rotation while comparing with previous rotation. """
     if prev_rotation is not None and len(prev_rotation) > 0:
         try:
@@ -439,9 +484,9 @@ def quart_to_euler_combat(quart, idx, idx_offset=0, axis='XYZ', prev_rotation=No
         return to_euler(quart)
 
 
-def offset_euler(euler, offset: []) -> Euler:
+def offset_euler(euler, offset: []):
     """ Offsets an euler rotation using euler radians *pi. """
-    rotation = Euler((
+    rotation = euler_rotation((
         euler[0] + np.pi * offset[0],
         euler[1] + np.pi * offset[1],
         euler[2] + np.pi * offset[2],
@@ -474,40 +519,130 @@ def try_get_euler(quart_rotation, offset: [], prev_rot_idx: int = -1, prev_rotat
 
 # endregion
 # region manual numpy implementation (slower than mathutils)
+# ports of blenders math_rotation.c, matrices are row major (m[row, col]) as in mathutils.Matrix((rows))
 def _generate_matrix(tangent: np.array, normal: np.array, binormal: np.array):
-    # not tested
     """ generate a numpy matrix at loc [0, 0, 0]. """
     matrix = np.array([
         [tangent[0], tangent[1], tangent[2], 0],
         [normal[0], normal[1], normal[2], 0],
         [binormal[0], binormal[1], binormal[2], 0],
-        [0, 0, 0, 1]])
+        [0, 0, 0, 1]], dtype=np.float64)
     return matrix
 
 
-def _decompose_matrix(matrix: np.matrix):
-    # not tested
-    """ manual decompose a matrix (still in development) """
+def _decompose_matrix(matrix: np.ndarray):
+    """ returns loc, quaternion (w, x, y, z) and scale of a 4x4 matrix like mathutils.Matrix.decompose. """
+    matrix = np.asarray(matrix, dtype=np.float64)
     # location -> last column of matrix
-    loc = np.array(matrix[:3, 3:4])
-
-    # scale -> length of the first the column vectors
-    sx = vector_length(np.array(matrix[:3, 0:1]))
-    sy = vector_length(np.array(matrix[:3, 1:2]))
-    sz = vector_length(np.array(matrix[:3, 2:3]))
-    sca = np.array([sx, sy, sz])
+    loc = matrix[:3, 3].copy()
+    quat, sca = decompose_rotations(matrix[:3, :3])
+    return loc, quat, sca
+
+
+def decompose_rotations(matrices: np.ndarray):
+    """ returns the quaternions (..., 4) and scales (..., 3) of 3x3 matrices (..., 3, 3). """
+    matrices = np.asarray(matrices, dtype=np.float64)
+
+    # scale -> length of the column vectors, rotation -> normalized column vectors
+    sca = np.linalg.norm(matrices, axis=-2)
+    rotations = matrices / np.where(sca == 0, 1, sca)[..., None, :]
+    flip = np.linalg.det(matrices) < 0
+    rotations = np.where(flip[..., None, None], -rotations, rotations)
+    sca = np.where(flip[..., None], -sca, sca)
+    return matrix3x3_normalized_to_quaternion(rotations), sca
+
+
+def matrix3x3_normalized_to_quaternion(matrices: np.ndarray) -> np.ndarray:
+    """ Returns the (w, x, y, z) quaternions (..., 4) of normalized 3x3 matrices (..., 3, 3) (mat3_normalized_to_quat). """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    shape = matrices.shape[:-2]
+    matrices = matrices.reshape(-1, 3, 3)
+    det = np.linalg.det(matrices)
+    matrices = np.where(~np.isfinite(det)[:, None, None], np.eye(3), matrices)
+    matrices = np.where((det < 0)[:, None, None], -matrices, matrices)
+
+    # blender stores matrices column major, mat[col][row]
+    mat = np.swapaxes(matrices, -1, -2)
+    m00, m01, m02 = mat[:, 0, 0], mat[:, 0, 1], mat[:, 0, 2]
+    m10, m11, m12 = mat[:, 1, 0], mat[:, 1, 1], mat[:, 1, 2]
+    m20, m21, m22 = mat[:, 2, 0], mat[:, 2, 1], mat[:, 2, 2]
+
+    neg_z, pos_x, neg_xy = m22 < 0, m00 > m11, m00 < -m11
+    branches = [neg_z & pos_x, neg_z & ~pos_x, ~neg_z & neg_xy, ~neg_z & ~neg_xy]
+    q = np.empty((len(mat), 4))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if branches[0].any():
+            s = 2 * np.sqrt(1 + m00 - m11 - m22)
+            s = np.where(m12 < m21, -s, s)
+            q[branches[0]] = np.stack([(m12 - m21) / s, .25 * s, (m01 + m10) / s, (m20 + m02) / s], axis=-1)[branches[0]]
+
+        if branches[1].any():
+            s = 2 * np.sqrt(1 - m00 + m11 - m22)
+            s = np.where(m20 < m02, -s, s)
+            q[branches[1]] = np.stack([(m20 - m02) / s, (m01 + m10) / s, .25 * s, (m12 + m21) / s], axis=-1)[branches[1]]
+
+        if branches[2].any():
+            s = 2 * np.sqrt(1 - m00 - m11 + m22)
+            s = np.where(m01 < m10, -s, s)
+            q[branches[2]] = np.stack([(m01 - m10) / s, (m20 + m02) / s, (m12 + m21) / s, .25 * s], axis=-1)[branches[2]]
+
+        if branches[3].any():
+            s = 2 * np.sqrt(1 + m00 + m11 + m22)
+            q[branches[3]] = np.stack([.25 * s, (m12 - m21) / s, (m20 - m02) / s, (m01 - m10) / s], axis=-1)[branches[3]]
+
+    # blender normalizes only if the matrix wasn't orthogonal enough
+    length = np.einsum('...i,...i->...', q, q)
+    q = np.where((np.abs(length - 1) >= 0.0006)[:, None], q / np.sqrt(length)[:, None], q)
+    return q.reshape(shape + (4,))
+
+
+def quaternion_to_matrix3x3(q: np.ndarray) -> np.ndarray:
+    """ Returns the 3x3 rotation matrices (..., 3, 3) of unit (w, x, y, z) quaternions (..., 4). """
+    w, x, y, z = np.moveaxis(np.asarray(q, dtype=np.float64), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def quaternion_invert(q: np.ndarray) -> np.ndarray:
+    """ Returns the inverse of (..., 4) (w, x, y, z) quaternions. """
+    q = np.asarray(q, dtype=np.float64)
+    f = row_dot(q, q)[..., None]
+    return np.where(f == 0, q, q * (1, -1, -1, -1) / np.where(f == 0, 1, f))
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Returns the quaternions a @ b (..., 4). """
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    q = np.empty(np.broadcast_shapes(a.shape, b.shape))
+    q[..., 0] = a[..., 0] * b[..., 0] - a[..., 1] * b[..., 1] - a[..., 2] * b[..., 2] - a[..., 3] * b[..., 3]
+    q[..., 1] = a[..., 0] * b[..., 1] + a[..., 1] * b[..., 0] + a[..., 2] * b[..., 3] - a[..., 3] * b[..., 2]
+    q[..., 2] = a[..., 0] * b[..., 2] + a[..., 2] * b[..., 0] + a[..., 3] * b[..., 1] - a[..., 1] * b[..., 3]
+    q[..., 3] = a[..., 0] * b[..., 3] + a[..., 3] * b[..., 0] + a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1]
+    return q
 
-    # rotation -> divide first three column vectors by the scaling factors
-    # todo: fix for negative scale and apply shear
-    c1 = matrix[:3, 0:1] / sx
-    c2 = matrix[:3, 1:2] / sy
-    c3 = matrix[:3, 2:3] / sz
 
-    # recreate matrix (loc = [0, 0, 0]
-    rotation_matrix = np.matrix([np.append(col, [v]) for col, v in
-                                 [[c1, 0], [c2, 0], [c3, 0], [loc, 1]]])
-    quat = matrix3x3_to_quaternion(rotation_matrix)
-    return [loc, quat, sca]
+def compatible_euler(euler: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    """ Wraps the euler angles by 360 degrees to match the previous rotation (compatible_eul).
+        Supports arrays of eulers (..., 3). """
+    euler = np.array(euler, dtype=np.float64)
+    prev = np.asarray(prev, dtype=np.float64)
+    deul = euler - prev
+    wrap = np.abs(deul) > np.pi
+    if not wrap.any():
+        return euler
+    euler -= np.where(wrap, np.sign(deul) * np.floor(np.abs(deul) / (2 * np.pi) + .5) * 2 * np.pi, 0)
+    deul = np.where(wrap, euler - prev, deul)
+    if not np.any(np.abs(deul) > np.pi):
+        return euler
+
+    # axis rotating more than 180 degrees while the others rotate less than 90 degrees
+    for i, j, k in [(0, 1, 2), (1, 2, 0), (2, 0, 1)]:
+        flip = (np.abs(deul[..., i]) > np.pi) & (np.abs(deul[..., j]) < np.pi / 2) & (np.abs(deul[..., k]) < np.pi / 2)
+        euler[..., i] -= np.where(flip, np.sign(deul[..., i]) * 2 * np.pi, 0)
+    return euler
 
 
 def euler_to_quaternion(yaw, pitch, roll):
@@ -530,30 +665,74 @@ def euler_to_quaternion(yaw, pitch, roll):
     return quart
 
 
-def quaternion_to_euler(q: np.array) -> np.array:
-    # not tested
-    """ Manual quaternion q (w, x, y, z) to euler conversion
-    https://en.wikipedia.org/wiki/Conversion_between_quaternions_and_Euler_angles
-    """
-    # x axis roll
-    sinr_cosp = 2 * (q[0] * q[1] + q[2] * q[3])
-    cosr_cosp = 1 - 2 * (q[1] * q[1] + q[2] * q[2])
-    roll = np.atan2(sinr_cosp, cosr_cosp)
-
-    # y axis pitch
-    sinp = 2 * (q[0] * q[1] - q[3] * q[1])
-    if abs(sinp) >= 1:
-        pitch = np.copysign(np.pi / 2, sinp)  # use 90 degrees if out of range
-    else:
-        pitch = np.asin(sinp)
-
-    # z axis yaw
-    siny_cosp = 2 * (q[0] * q[3] + q[1] * q[2])
-    cosy_cosp = 1 - 2 * (q[2] * q[2] + q[3] * q[3])
-    yaw = np.atan2(siny_cosp, cosy_cosp)
-
-    angles = np.array(pitch, yaw, roll)
-    return angles
+def quaternion_to_euler(q: np.ndarray, compat: np.ndarray = None, order: str = 'XYZ') -> np.ndarray:
+    """ Returns the euler of a (w, x, y, z) quaternion closest to the compat rotation
+        (zero by default), matching mathutils.Quaternion.to_euler(order, compat). """
+    return closest_euler(quaternion_to_euler_pairs(q, order), compat)
+
+
+def quaternions_to_eulers(quats: np.ndarray, compat: np.ndarray = None, order: str = 'XYZ') -> np.ndarray:
+    """ Converts (N, 4) or (T, N, 4) quaternions to eulers.
+        Each frame of a (T, N, 4) array gets compatible to the previous frame, the
+        first frame to the compat rotations (zero by default), so the eulers don't
+        jump by 360 degrees or between equivalent rotations over time. """
+    quats = np.asarray(quats, dtype=np.float64)
+    if quats.ndim < 3:
+        return closest_euler(quaternion_to_euler_pairs(quats, order), compat)
+
+    pairs = quaternion_to_euler_pairs(quats, order)
+    eulers = np.empty(quats.shape[:-1] + (3,))
+    for t in range(len(quats)):
+        eulers[t] = compat = closest_euler(pairs[t], compat)
+    return eulers
+
+
+# axis indices (i, j, k) and parity of the euler rotation orders (rotOrders)
+EULER_ORDERS = {
+    'XYZ': ((0, 1, 2), False),
+    'XZY': ((0, 2, 1), True),
+    'YXZ': ((1, 0, 2), True),
+    'YZX': ((1, 2, 0), False),
+    'ZXY': ((2, 0, 1), False),
+    'ZYX': ((2, 1, 0), True),
+}
+
+
+def quaternion_to_euler_pairs(quats: np.ndarray, order: str = 'XYZ') -> np.ndarray:
+    """ Returns both euler solutions (..., 2, 3) of (..., 4) quaternions (mat3_normalized_to_eulO2). """
+    if order not in EULER_ORDERS:
+        raise ValueError(f"Unknown euler order {order}, expected one of {', '.join(EULER_ORDERS)}")
+    (i, j, k), parity = EULER_ORDERS[order]
+
+    quats = np.asarray(quats, dtype=np.float64)
+    quats = quats / np.sqrt(np.einsum('...i,...i->...', quats, quats))[..., None]
+    # rotation matrix elements, indexed column major like blender mat[col][row]
+    mat = np.swapaxes(quaternion_to_matrix3x3(quats), -1, -2)
+    m_ii, m_ij, m_ik = mat[..., i, i], mat[..., i, j], mat[..., i, k]
+    m_jj, m_jk, m_kj, m_kk = mat[..., j, j], mat[..., j, k], mat[..., k, j], mat[..., k, k]
+
+    cy = np.hypot(m_ii, m_ij)
+    pairs = np.empty(cy.shape + (2, 3))
+    pairs[..., 0, i], pairs[..., 1, i] = np.arctan2(m_jk, m_kk), np.arctan2(-m_jk, -m_kk)
+    pairs[..., 0, j], pairs[..., 1, j] = np.arctan2(-m_ik, cy), np.arctan2(-m_ik, -cy)
+    pairs[..., 0, k], pairs[..., 1, k] = np.arctan2(m_ij, m_ii), np.arctan2(-m_ij, -m_ii)
+
+    # gimbal lock, both solutions are the same
+    locked = cy <= 16 * np.finfo(np.float32).eps
+    if np.any(locked):
+        pairs[locked, :, i] = np.arctan2(-m_kj, m_jj)[locked, None]
+        pairs[locked, :, j] = np.arctan2(-m_ik, cy)[locked, None]
+        pairs[locked, :, k] = 0
+    return -pairs if parity else pairs
+
+
+def closest_euler(pairs: np.ndarray, compat: np.ndarray = None) -> np.ndarray:
+    """ Returns the euler solution (..., 3) of the pairs (..., 2, 3) closest to the compat rotations. """
+    compat = np.zeros(pairs.shape[:-2] + (3,)) if compat is None else np.asarray(compat, dtype=np.float64)
+    compat = compat[..., None, :]
+    pairs = compatible_euler(pairs, compat)
+    distance = np.abs(pairs - compat).sum(axis=-1)
+    return np.where((distance[..., 0] > distance[..., 1])[..., None], pairs[..., 1, :], pairs[..., 0, :])
 
 
 def matrix3x3_to_quaternion(m: np.matrix):
@@ -581,6 +760,58 @@ def matrix3x3_to_quaternion(m: np.matrix):
     return q
 
 
+def vector_to_track_quaternion(vec: np.ndarray, track: str = 'Z', up: str = 'Y') -> np.ndarray:
+    """ Returns the (w, x, y, z) quaternions (..., 4) pointing the track axis along the vectors (..., 3)
+        while the up axis points upwards (mathutils.Vector.to_track_quat). """
+    tracks = {'X': 0, 'Y': 1, 'Z': 2, '-X': 3, '-Y': 4, '-Z': 5}
+    axis, upflag = tracks[track], tracks[up]
+    if axis % 3 == upflag:
+        raise ValueError("Can't have the up axis match the track axis")
+
+    # vec_to_quat expects the vector from the target to the tracking object
+    vec = np.asarray(vec, dtype=np.float64)
+    tvec = -vec if axis > 2 else vec
+    length = np.sqrt(np.einsum('...i,...i->...', vec, vec))
+    axis %= 3
+
+    # rotation axis perpendicular to the track axis, falls back to the next axis if parallel
+    eps = 1e-4
+    others = [(axis + 1) % 3, (axis + 2) % 3]
+    nor = np.zeros(vec.shape)
+    nor[..., others[0]] = -tvec[..., others[1]]
+    nor[..., others[1]] = tvec[..., others[0]]
+    parallel = np.abs(tvec[..., others[0]]) + np.abs(tvec[..., others[1]]) < eps
+    if parallel.any():
+        nor[parallel, others[0]] = 1.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angle = np.arccos(np.clip(tvec[..., axis] / length, -1, 1))
+        q = np.empty(vec.shape[:-1] + (4,))
+        q[..., 0] = np.cos(angle / 2)
+        q[..., 1:] = nor * (np.sin(angle / 2) / np.sqrt(np.einsum('...i,...i->...', nor, nor)))[..., None]
+
+        if axis != upflag:
+            # last column of the rotation matrix
+            w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+            if axis == 0:
+                fp1, fp2 = 2 * (y * z - w * x), 1 - 2 * (x * x + y * y)
+                angle = .5 * np.arctan2(fp2, fp1) if upflag == 1 else -.5 * np.arctan2(fp1, fp2)
+            elif axis == 1:
+                fp0, fp2 = 2 * (x * z + w * y), 1 - 2 * (x * x + y * y)
+                angle = -.5 * np.arctan2(fp2, fp0) if upflag == 0 else .5 * np.arctan2(fp0, fp2)
+            else:
+                fp0, fp1 = 2 * (x * z + w * y), 2 * (y * z - w * x)
+                angle = .5 * np.arctan2(-fp1, -fp0) if upflag == 0 else -.5 * np.arctan2(-fp0, -fp1)
+
+            q2 = np.empty(q.shape)
+            q2[..., 0] = np.cos(angle)
+            q2[..., 1:] = tvec * (np.sin(angle) / length)[..., None]
+            q = quaternion_multiply(q2, q)
+    if np.any(length == 0):
+        q[length == 0] = [1.0, 0.0, 0.0, 0.0]
+    return q
+
+
 def matrix3x3_to_euler(matrix: np.ndarray) -> np.ndarray:
     """ Returns euler x, y, z angles from 3x3 rotation matrix """
     # http://eecs.qmul.ac.uk/~gslabaugh/publications/euler.pdf
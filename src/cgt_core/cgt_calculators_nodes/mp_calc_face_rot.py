@@ -1,8 +1,6 @@
-import logging
 import numpy as np
-from mathutils import Euler
 
-from .calc_utils import ProcessorUtils, CustomData
+from .calc_utils import ProcessorUtils, CustomData, landmark_locations
 from . import cgt_math
 from ..cgt_patterns import cgt_nodes
 
@@ -19,46 +17,30 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
     def update(self, data, frame=-1):
         """ Process the landmark detection results. """
         """ Assign the data processed data to references. """
-        # remove nesting and set landmarks to custom origin
-        try:
-            if len(data[0][0]) == 0:
-                return [[], [], []], frame
-        except IndexError:
-            logging.error(f"Index Error occurred: {data}, {frame} - check face nodes")
+        # set landmarks to custom origin
+        face = data.part('face')
+        if face is None or self.is_duplicated_frame(face):
             return [[], [], []], frame
-
-        self.data = data[0]
-        if len(self.data) < 468:
-            return [[], [], []], frame
-
-        # increase the data size to hold custom data (check __init__)
-        for i in range(4):
-            self.data.append([468+i, [0., 0., 0.]])
-        self.custom_landmark_origin()
+        self.locations = self.custom_landmark_origin(landmark_locations(face))
 
         # get distances and rotations to determine movements
         self.set_rotation_driver_data()
-        if self.has_duplicated_results(self.data, "face"):
-            return [[], [], []], frame
+        self.data = [[idx, loc] for idx, loc in enumerate(self.locations)]
         return [self.data, self.rotation_data, []], frame
 
-    def get_processed_data(self):
-        """ Returns the processed data """
-        return self.data, self.rotation_data, [], self.frame, self.has_duplicated_results(self.data)
-
     def mouth_corners(self):
         """ Calculates the angle from the mouth center to the mouth corner """
         # center point of mouth corners gets projected on vector from upper to lower lip
-        corner_center = cgt_math.center_point(self.data[61][1], self.data[291][1])
-        projected_center = cgt_math.project_point_on_vector(corner_center, self.data[0][1], self.data[17][1])
+        corner_center = cgt_math.center_point(self.locations[61], self.locations[291])
+        projected_center = cgt_math.project_point_on_vector(corner_center, self.locations[0], self.locations[17])
         # center point between upper and lower lip
-        mouth_height_center = cgt_math.center_point(self.data[0][1], self.data[17][1])
+        mouth_height_center = cgt_math.center_point(self.locations[0], self.locations[17])
 
         # vectors from center points to mouth corners
-        left_vec = cgt_math.to_vector(projected_center, self.data[61][1])
-        left_hv = cgt_math.to_vector(mouth_height_center, self.data[61][1])
-        right_vec = cgt_math.to_vector(projected_center, self.data[291][1])
-        right_hv = cgt_math.to_vector(mouth_height_center, self.data[291][1])
+        left_vec = cgt_math.to_vector(projected_center, self.locations[61])
+        left_hv = cgt_math.to_vector(mouth_height_center, self.locations[61])
+        right_vec = cgt_math.to_vector(projected_center, self.locations[291])
+        right_hv = cgt_math.to_vector(mouth_height_center, self.locations[291])
 
         # angle between the vectors expecting users don't record upside down
         if mouth_height_center[2] > projected_center[2]:
@@ -76,12 +58,8 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
     def set_rotation_driver_data(self):
         """ Get face and chin rotation """
         self.face_mesh_rotation()
-        try:
-            head_rotation = self.try_get_euler(self.pivot.rot, prev_rot_idx=self.pivot.idx)
-            # head_rotation = self.quart_to_euler_combat(self.pivot.rot, self.pivot.idx, axis='XZY')
-        except AttributeError:
-            logging.warning("Exchange method in cgt_maths for other targets than blender.")
-            head_rotation = [0, 0, 0]
+        head_rotation = self.try_get_euler(self.pivot.rot, prev_rot_idx=self.pivot.idx)
+        # head_rotation = self.quart_to_euler_combat(self.pivot.rot, self.pivot.idx, axis='XZY')
 
         self.chin_rotation()
         chin_rotation = self.chin_driver.rot
@@ -95,8 +73,8 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
     def chin_rotation(self):
         """ Calculate the chin rotation. """
         # draw vector from point between eyes to mouth and chin
-        nose_dir = cgt_math.to_vector(self.data[168][1], self.data[2][1])
-        chin_dir = cgt_math.to_vector(self.data[168][1], self.data[200][1])
+        nose_dir = cgt_math.to_vector(self.locations[168], self.locations[2])
+        chin_dir = cgt_math.to_vector(self.locations[168], self.locations[200])
 
         # calculate the Z rotation
         nose_dir_z, chin_dir_z = cgt_math.null_axis([nose_dir, chin_dir], 'X')
@@ -104,19 +82,19 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
 
         # in the detection results is no X-rotation available
         # nose_dir_x, chin_dir_x = m_V.null_axis([nose_dir, chin_dir], 'Z')
-        # chin_rotation = m_V.rotate_towards(self.data[152][1], self.data[6][1], 'Y', 'Z')
+        # chin_rotation = m_V.rotate_towards(self.locations[152], self.locations[6], 'Y', 'Z')
 
         # due to the base angle it's required to offset the rotation
-        self.chin_driver.rot = Euler(((z_angle - 3.14159 * .07) * 1.175, 0, 0))
+        self.chin_driver.rot = cgt_math.euler_rotation(((z_angle - 3.14159 * .07) * 1.175, 0, 0))
 
     def face_mesh_rotation(self):
         """ Calculate face quaternion using
             points to approximate the transformation matrix. """
         origin = np.array([0, 0, 0])
 
-        forward_point = cgt_math.center_point(np.array(self.data[1][1]), np.array(self.data[4][1]))  # nose
-        right_point = cgt_math.center_point(np.array(self.data[447][1]), np.array(self.data[366][1]))  # temple.R
-        down_point = np.array(self.data[152][1])  # chin
+        forward_point = cgt_math.center_point(self.locations[1], self.locations[4])  # nose
+        right_point = cgt_math.center_point(self.locations[447], self.locations[366])  # temple.R
+        down_point = self.locations[152]  # chin
 
         # direction vectors from imaginary origin
         normal = cgt_math.normalize(cgt_math.to_vector(origin, forward_point))
@@ -124,24 +102,20 @@ class FaceRotationCalculator(cgt_nodes.CalculatorNode, ProcessorUtils):
         binormal = cgt_math.normalize(cgt_math.to_vector(origin, down_point))
 
         # generate matrix to decompose it and access quaternion rotation
-        try:
-            matrix = cgt_math.generate_matrix(tangent, normal, binormal)
-            loc, quart, scale = cgt_math.decompose_matrix(matrix)
-        except TypeError:
-            logging.warning("Exchange method in cgt_math for other targets than Blender.")
-            quart = None
+        matrix = cgt_math.generate_matrix(tangent, normal, binormal)
+        loc, quart, scale = cgt_math.decompose_matrix(matrix)
         self.pivot.rot = quart
 
     # region cgt_utils
-    def custom_landmark_origin(self):
-        """ Sets face mesh position to approximate origin """
-        self.data = [[idx, np.array([-lmrk[0], lmrk[2], -lmrk[1]])] for idx, lmrk in self.data[:468]]
+    def custom_landmark_origin(self, locations: np.ndarray) -> np.ndarray:
+        """ Returns the (468, 3) face mesh locations in blenders coordinate system relative to the approximate origin. """
+        self.locations = locations[:, [0, 2, 1]] * (-1, 1, -1)
         self.approximate_pivot_location()
-        self.data = [[idx, np.array(lmrk) - np.array(self.pivot.loc)] for idx, lmrk in self.data[:468]]
+        return self.locations - self.pivot.loc
 
     def approximate_pivot_location(self):
         """ Sets to approximate origin based on canonical face mesh geometry """
-        right = cgt_math.center_point(np.array(self.data[447][1]), np.array(self.data[366][1]))  # temple.R
-        left = cgt_math.center_point(np.array(self.data[137][1]), np.array(self.data[227][1]))  # temple.L
+        right = cgt_math.center_point(self.locations[447], self.locations[366])  # temple.R
+        left = cgt_math.center_point(self.locations[137], self.locations[227])  # temple.L
         self.pivot.loc = cgt_math.center_point(right, left)  # approximate origin
     # endregion
@@ -1,168 +1,153 @@
+from __future__ import annotations
 import numpy as np
-from mathutils import Euler
-from typing import List
+from typing import List, Optional, Sequence
 from . import calc_utils, cgt_math
 from ..cgt_patterns import cgt_nodes
+from ..cgt_patterns.cgt_landmarks import LandmarkFrame
 
 
 class PoseRotationCalculator(cgt_nodes.CalculatorNode, calc_utils.ProcessorUtils):
-    shoulder_center = None
-    hip_center = None
-
-    rotation_data = []
-    scale_data = []
-
-    def __init__(self):
-        self.shoulder_center = calc_utils.CustomData(34)
-        self.pose_offset = calc_utils.CustomData(35)
-        self.hip_center = calc_utils.CustomData(33)
-
-    def update(self, data: List, frame: int=-1):
+    """ Calculates the rotations of the limbs, feet, torso and shoulders.
+        Poses of a frame or a batch of frames get processed at once as (T, 33, 3) array. """
+    # custom landmarks appended to the pose
+    hip_center = 33
+    shoulder_center = 34
+    pose_offset = 35
+
+    # ik chain bones (parent, child) of the left and right leg, right and left arm
+    limbs = np.array([[23, 25], [25, 27], [24, 26], [26, 28],
+                      [12, 14], [14, 16], [16, 20], [11, 13], [13, 15], [15, 19]])
+    # knee, ankle and foot index of the left and right foot, rotations get stored at the ankle
+    feet = np.array([[25, 27, 31], [26, 28, 32]])
+    # left and right shoulder and hip
+    shoulders = np.array([11, 12])
+    hips = np.array([23, 24])
+
+    # rotation targets: shoulder center, torso (hip center), limbs and feet
+    rotation_targets = [shoulder_center, hip_center, *limbs[:, 0].tolist(), *feet[:, 1].tolist()]
+    # euler combat slots and offsets of the calculated rotations,
+    # the shoulder center rotation is the offset between shoulder (slot 7) and hip rotation (slot 8)
+    rotation_slots = np.array([7, 8, hip_center, *limbs[:, 0], *feet[:, 1]])
+    rotation_offsets = np.array([[0, 0, 0], [0, 0, 0], [-.5, 0, 0]] + [[0, 0, 0]] * 12)
+
+    def update(self, data: LandmarkFrame, frame: int = -1):
         """ Apply the processed data to references. """
-        if not data or len(data) < 33:
-            return [[], [], []], frame
-        self.data = data
-
-        # increase the data size to hold custom data (check __init__)
-        for i in range(2):
-            self.data.append([33 + i, [0., 0., 0.]])
-
-        self.rotation_data = []
-        self.scale_data = []
-
-        self.prepare_landmarks()
-        self.shoulder_hip_location()
-        self.set_hip_as_origin()
-        try:
-            self.calculate_rotations()
-        except AttributeError:
-            pass
-
-        if self.has_duplicated_results(self.data, "pose"):
-            return [[], [], []], frame
-        return [self.data, self.rotation_data, []], frame
-
-    def calculate_rotations(self):
-        """ Creates custom rotation data for driving the cgt_rig. """
-        self.shoulder_rotation()
-        self.torso_rotation()
-        self.limb_rotations()
-        self.foot_rotation()
-
-    def limb_rotations(self):
-        """ Calculate ik chain rotations. """
-
-        def calc_chain_rotations(data):
-            rotations = []
-            for i in range(1, len(data)):
-                quart = cgt_math.rotate_towards(data[i][1], data[i - 1][1], '-Y', 'Z')
-                euler = self.try_get_euler(quart, prev_rot_idx=data[i - 1][0])
-                rotations.append([data[i - 1][0], euler])
-            return rotations
-
-        # calculate foot rotation separately
-        left_leg = [self.data[23], self.data[25], self.data[27]]  # , self.data[31]]
-        right_leg = [self.data[24], self.data[26], self.data[28]]  # , self.data[32]]
-        left_arm = [self.data[11], self.data[13], self.data[15], self.data[19]]
-        right_arm = [self.data[12], self.data[14], self.data[16], self.data[20]]
-
-        for objs in [left_leg, right_leg, right_arm, left_arm]:
-            self.rotation_data += calc_chain_rotations(objs)
-
-    def foot_rotation(self):
-        """ Calculate foot rotations. """
-
-        def rot_from_matrix(loc: List[np.array], tar_idx: int):
-            tangent = cgt_math.normal_from_plane(loc)
-            binormal = loc[0] - loc[2]
-            normal = loc[1] - loc[2]
-
-            vectors = [tangent, normal, binormal]
-            matrix = cgt_math.generate_matrix(*[cgt_math.normalize(vec) for vec in vectors])
-            _, quart, _ = cgt_math.decompose_matrix(matrix)
-            euler = self.try_get_euler(quart, None, tar_idx)
-            return euler
-
-        # left knee, ankle & foot_index
-        left_locations = [self.data[25][1], self.data[27][1], self.data[31][1]]
-        left_foot_rot = rot_from_matrix(left_locations, self.data[27][0])
-        self.rotation_data.append([self.data[27][0], left_foot_rot])
-
-        # right knee, ankle & foot_index
-        right_locations = [self.data[26][1], self.data[28][1], self.data[32][1]]
-        right_foot_rot = rot_from_matrix(right_locations, self.data[28][0])
-        self.rotation_data.append([self.data[28][0], right_foot_rot])
-
-    def torso_rotation(self):
-        """ Calculating the torso rotation based on a plane which
-            forms a triangle connecting hips and the shoulder center. """
-        # approximate perpendicular points to origin
-        hip_center = cgt_math.center_point(np.array(self.data[23][1]), np.array(self.data[24][1]))
-        right_hip = np.array(self.data[24][1])
-        shoulder_center = cgt_math.center_point(np.array(self.data[11][1]), np.array(self.data[12][1]))
-
-        # generate triangle
-        vertices = np.array(
-            [self.data[23][1],
-             self.data[24][1],
-             shoulder_center])
-        connections = np.array([[0, 1, 2]])
-
-        # get normal from triangle
-        normal = cgt_math.normal_from_plane([self.data[23][1], self.data[24][1], shoulder_center])
-        # normal, norm = cgt_math.create_normal_array(vertices, connections)
-
-        # direction vectors from imaginary origin
-        tangent = cgt_math.normalize(cgt_math.to_vector(hip_center, right_hip))
-        normal = cgt_math.normalize(normal)  # [0])
-        binormal = cgt_math.normalize(cgt_math.to_vector(hip_center, shoulder_center))
-
-        # generate matrix to decompose it and access quaternion rotation
-        matrix = cgt_math.generate_matrix(tangent, binormal, normal)
-        loc, quart, scale = cgt_math.decompose_matrix(matrix)
-        offset = [-.5, 0, 0]
-        euler = self.try_get_euler(quart, offset, self.hip_center.idx)
-        self.rotation_data.append([self.hip_center.idx, euler])
-
-    def shoulder_rotation(self):
-        """ getting shoulder and hip rotation by rotating
-            the center points to left / right shoulder and hip. """
-        # rotation from shoulder center to shoulder.R
-        shoulder_center = cgt_math.center_point(self.data[11][1], self.data[12][1])
-        shoulder_rotation = cgt_math.rotate_towards(shoulder_center, self.data[12][1], 'Z')
-
-        # rotation from hip center to hip.R
-        hip_center = cgt_math.center_point(self.data[23][1], self.data[24][1])
-        hip_rotation = cgt_math.rotate_towards(hip_center, self.data[24][1], 'Z')
-
-        # chance to offset result / rotation may not be keyframed
-        offset = [0, 0, 0]
-        shoulder_rot = self.try_get_euler(shoulder_rotation, offset, 7)
-        hip_rot = self.try_get_euler(hip_rotation, offset, 8)
+        return self.update_poses([self.pose_landmarks(data)])[0], frame
+
+    def update_batch(self, data: Sequence[LandmarkFrame], frames: Sequence[int]):
+        """ Processes the poses of all frames at once. """
+        return self.update_poses([self.pose_landmarks(chunk) for chunk in data]), list(frames)
+
+    def pose_landmarks(self, data: LandmarkFrame) -> Optional[np.ndarray]:
+        """ Returns the pose locations, duplicated poses get skipped before calculating. """
+        pose = data.part('pose')
+        if pose is None or self.is_duplicated_frame(pose):
+            return None
+        return calc_utils.landmark_locations(pose)
+
+    def update_poses(self, poses: List[Optional[np.ndarray]]) -> list:
+        """ Returns [locations, rotations, scale] per frame. """
+        results = [[[], [], []] for _ in poses]
+        detected = [idx for idx, pose in enumerate(poses) if pose is not None]
+        if not detected:
+            return results
+
+        locations = self.prepare_landmarks(np.array([poses[idx] for idx in detected]))
+        rotations = self.calculate_rotations(locations)
+        for idx, frame_locations, frame_rotations in zip(detected, locations, rotations):
+            results[idx][0] = [[landmark_idx, loc] for landmark_idx, loc in enumerate(frame_locations)]
+            results[idx][1] = [[target, euler] for target, euler in zip(self.rotation_targets, frame_rotations)]
+        return results
+
+    def prepare_landmarks(self, poses: np.ndarray) -> np.ndarray:
+        """ Changes the x-y-z order to match blenders coordinate system and sets the hip center as origin.
+            Appends the hip center, shoulder center and pose offset, returns (T, 36, 3) locations. """
+        poses = poses[..., [0, 2, 1]] * (-1, 1, -1)
+        hip_center = (poses[:, self.hips[0]] + poses[:, self.hips[1]]) * .5
+        shoulder_center = (poses[:, self.shoulders[0]] + poses[:, self.shoulders[1]]) * .5
+
+        locations = np.empty((len(poses), 36, 3))
+        locations[:, :33] = poses - hip_center[:, None]
+        locations[:, self.hip_center] = 0
+        locations[:, self.shoulder_center] = shoulder_center - hip_center
+        locations[:, self.pose_offset] = hip_center
+        return locations
+
+    def calculate_rotations(self, locations: np.ndarray) -> np.ndarray:
+        """ Creates custom rotation data (T, 14, 3) for driving the cgt_rig. """
+        if len(locations) == 1 and cgt_math.backend == cgt_math.MATHUTILS:
+            return self.frame_rotations(locations[0])[None]
+
+        shoulders, hips = locations[:, self.shoulders], locations[:, self.hips]
+        shoulder_center, hip_center = (shoulders[:, 0] + shoulders[:, 1]) * .5, (hips[:, 0] + hips[:, 1]) * .5
+
+        # rotations from shoulder and hip center to shoulder.R and hip.R
+        centers = np.stack([shoulder_center, hip_center], axis=1)
+        targets = np.stack([shoulders[:, 1], hips[:, 1]], axis=1)
+        center_quarts = cgt_math.vector_to_track_quaternion(targets - centers, 'Z', 'Y')
+
+        # torso matrix based on a triangle connecting hips and the shoulder center
+        tangent = hips[:, 1] - hip_center
+        normal = cgt_math.row_cross(hips[:, 1] - hips[:, 0], shoulder_center - hips[:, 0])
+        binormal = shoulder_center - hip_center
+        torso = np.stack([tangent, binormal, normal], axis=1)
+
+        # ik chain rotations from the child towards the parent
+        limbs = locations[:, self.limbs]
+        limb_quarts = cgt_math.vector_to_track_quaternion(limbs[:, :, 0] - limbs[:, :, 1], '-Y', 'Z')
+
+        # foot matrices based on the triangle of knee, ankle and foot index
+        knee, ankle, foot_index = [locations[:, self.feet[:, idx]] for idx in range(3)]
+        tangent = cgt_math.row_cross(ankle - knee, foot_index - knee)
+        feet = np.stack([tangent, ankle - foot_index, knee - foot_index], axis=2)
+
+        matrices = np.concatenate([torso[:, None], feet], axis=1)
+        matrices /= np.linalg.norm(matrices, axis=-1, keepdims=True)
+        matrix_quarts = cgt_math.quaternion_invert(cgt_math.decompose_rotations(matrices)[0])
+
+        quarts = np.concatenate([center_quarts, matrix_quarts[:, :1], limb_quarts, matrix_quarts[:, 1:]], axis=1)
+        eulers = self.try_get_eulers(quarts, self.rotation_slots, self.rotation_offsets)
+
+        # offset between hip & shoulder rot = real shoulder rot
+        eulers[:, 1] = eulers[:, 0] - eulers[:, 1]
+        return eulers[:, 1:]
+
+    def frame_rotations(self, locations: np.ndarray) -> np.ndarray:
+        """ Creates the rotation data (14, 3) of a single frame using mathutils.
+            Streams process one pose per update, where the array operations cost more than they save. """
+        Vector, Matrix, Euler = cgt_math.Vector, cgt_math.Matrix, cgt_math.Euler
+        vectors = [Vector(location) for location in locations.tolist()]
+        l_shoulder, r_shoulder = [vectors[idx] for idx in self.shoulders]
+        l_hip, r_hip = [vectors[idx] for idx in self.hips]
+        shoulder_center, hip_center = (l_shoulder + r_shoulder) * .5, (l_hip + r_hip) * .5
+
+        # rotations from shoulder and hip center to shoulder.R and hip.R
+        quarts = [(r_shoulder - shoulder_center).to_track_quat('Z', 'Y'), (r_hip - hip_center).to_track_quat('Z', 'Y')]
+
+        # torso matrix based on a triangle connecting hips and the shoulder center
+        normal = (r_hip - l_hip).cross(shoulder_center - l_hip)
+        torso = [r_hip - hip_center, shoulder_center - hip_center, normal]
+        quarts.append(Matrix([vec.normalized() for vec in torso]).to_quaternion().inverted())
+
+        # ik chain rotations from the child towards the parent
+        quarts += [(vectors[parent] - vectors[child]).to_track_quat('-Y', 'Z') for parent, child in self.limbs.tolist()]
+
+        # foot matrices based on the triangle of knee, ankle and foot index
+        for knee, ankle, foot_index in self.feet.tolist():
+            knee, ankle, foot_index = vectors[knee], vectors[ankle], vectors[foot_index]
+            foot = [(ankle - knee).cross(foot_index - knee), ankle - foot_index, knee - foot_index]
+            quarts.append(Matrix([vec.normalized() for vec in foot]).to_quaternion().inverted())
+
+        # eulers compatible to the previous rotations of the slots
+        self.reserve_rotation_slots(int(self.rotation_slots.max()) + 1)
+        offsets = np.pi * self.rotation_offsets
+        compat = self.prev_rotation[self.rotation_slots] - offsets
+        has_prev = self.has_prev_rotation[self.rotation_slots].tolist()
+        eulers = np.array([quart.to_euler('XYZ', Euler(prev) if valid else Euler())
+                           for quart, prev, valid in zip(quarts, compat.tolist(), has_prev)]) + offsets
+        self.prev_rotation[self.rotation_slots] = eulers
+        self.has_prev_rotation[self.rotation_slots] = True
 
         # offset between hip & shoulder rot = real shoulder rot
-        euler = Euler((shoulder_rot[0] - hip_rot[0],
-                       shoulder_rot[1] - hip_rot[1],
-                       shoulder_rot[2] - hip_rot[2]))
-        self.rotation_data.append([self.shoulder_center.idx, euler])
-
-    def shoulder_hip_location(self):
-        """ Appending custom location data for driving the cgt_rig. """
-        self.shoulder_center.loc = cgt_math.center_point(self.data[11][1], self.data[12][1])
-        self.data.append([self.shoulder_center.idx, self.shoulder_center.loc])
-
-        self.hip_center.loc = cgt_math.center_point(self.data[23][1], self.data[24][1])
-        self.data.append([self.hip_center.idx, self.hip_center.loc])
-
-    def prepare_landmarks(self):
-        """ Prepare landmark orientation. """
-        self.data = [[idx, np.array([-landmark[0], landmark[2], -landmark[1]])]
-                     for idx, landmark in self.data]
-
-    def set_hip_as_origin(self):
-        self.pose_offset.loc = self.hip_center.loc
-        self.data = [[idx, np.array([landmark[0] - self.hip_center.loc[0],
-                                     landmark[1] - self.hip_center.loc[1],
-                                     landmark[2] - self.hip_center.loc[2]])]
-                     for idx, landmark in self.data]
-        self.data.append([self.pose_offset.idx, self.pose_offset.loc])
+        eulers[1] = eulers[0] - eulers[1]
+        return eulers[1:]
@@ -0,0 +1,88 @@
+import bpy
+from bpy_extras.io_utils import ExportHelper
+
+from . import cgt_core_panel
+from ..cgt_utils import cgt_metrics, cgt_tracing
+
+
+class WM_CGT_toggle_node_metrics(bpy.types.Operator):
+    bl_idname = "wm.cgt_toggle_node_metrics"
+    bl_label = "Node Metrics"
+    bl_description = "Record the runtime statistics of every node update"
+    bl_options = {"REGISTER", "INTERNAL"}
+
+    def execute(self, context):
+        cgt_metrics.REGISTRY.enable(not cgt_metrics.REGISTRY.enabled)
+        return {"FINISHED"}
+
+
+class WM_CGT_toggle_node_tracing(bpy.types.Operator):
+    bl_idname = "wm.cgt_toggle_node_tracing"
+    bl_label = "Node Tracing"
+    bl_description = "Record trace events of every node update in a ring buffer"
+    bl_options = {"REGISTER", "INTERNAL"}
+
+    def execute(self, context):
+        cgt_tracing.TRACER.enable(not cgt_tracing.TRACER.enabled)
+        return {"FINISHED"}
+
+
+class WM_CGT_dump_node_metrics(bpy.types.Operator, ExportHelper):
+    bl_idname = "wm.cgt_dump_node_metrics"
+    bl_label = "Save Metrics"
+    bl_description = "Save the node runtime statistics as json"
+    bl_options = {"REGISTER", "INTERNAL"}
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        cgt_metrics.REGISTRY.to_json(self.filepath)
+        self.report({'INFO'}, f"Saved metrics to {self.filepath}")
+        return {"FINISHED"}
+
+
+class WM_CGT_dump_node_trace(bpy.types.Operator, ExportHelper):
+    bl_idname = "wm.cgt_dump_node_trace"
+    bl_label = "Save Trace"
+    bl_description = "Save the recorded trace events as Chrome Trace json (chrome://tracing, ui.perfetto.dev)"
+    bl_options = {"REGISTER", "INTERNAL"}
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        cgt_tracing.TRACER.dump(self.filepath)
+        self.report({'INFO'}, f"Saved {len(cgt_tracing.TRACER.events)} trace events to {self.filepath}")
+        return {"FINISHED"}
+
+
+def draw(self, context):
+    box = self.layout.box()
+    box.label(text="Profiling")
+    row = box.row()
+    row.operator(WM_CGT_toggle_node_metrics.bl_idname, depress=cgt_metrics.REGISTRY.enabled)
+    row.operator(WM_CGT_dump_node_metrics.bl_idname, icon="FILE_TICK")
+    row = box.row()
+    row.operator(WM_CGT_toggle_node_tracing.bl_idname, depress=cgt_tracing.TRACER.enabled)
+    row.operator(WM_CGT_dump_node_trace.bl_idname, icon="FILE_TICK")
+
+
+classes = [
+    WM_CGT_toggle_node_metrics,
+    WM_CGT_toggle_node_tracing,
+    WM_CGT_dump_node_metrics,
+    WM_CGT_dump_node_trace,
+]
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    cgt_core_panel.addon_prefs.add(draw)
+
+
+def unregister():
+    cgt_core_panel.addon_prefs.discard(draw)
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -1,7 +1,8 @@
-from . import cgt_core_panel
+from . import cgt_core_panel, cgt_core_profiling
 
 classes = [
-    cgt_core_panel
+    cgt_core_panel,
+    cgt_core_profiling,
 ]
 
 
@@ -9,7 +9,8 @@ class MPFaceOutputNode(mp_out_utils.BpyOutputNode):
     col_name = COLLECTIONS.face
     parent_col = COLLECTIONS.drivers
 
-    def __init__(self):
+    def __init__(self, buffered: bool = False):
+        """ buffered: records the take and inserts the keyframes once the node gets closed. """
         data = cgt_defaults
 
         references = {}
@@ -25,6 +26,9 @@ class MPFaceOutputNode(mp_out_utils.BpyOutputNode):
         cgt_collection.add_list_to_collection(self.col_name, self.face[468:], self.parent_col)
         cgt_collection.add_list_to_collection(self.col_name+"_DATA", self.face[:468], self.col_name)
 
+        if buffered:
+            self.record_take(self.face)
+
     def update(self, data, frame):
         loc, rot, sca = data
         for data, method in zip([loc, rot, sca], [self.translate, self.euler_rotate, self.scale]):
@@ -10,7 +10,8 @@ class CgtMPHandOutNode(mp_out_utils.BpyOutputNode):
     col_name = COLLECTIONS.hands
     parent_col = COLLECTIONS.drivers
 
-    def __init__(self):
+    def __init__(self, buffered: bool = False):
+        """ buffered: records the take and inserts the keyframes once the node gets closed. """
         data = cgt_defaults
         references = data.hand
         self.left_hand = cgt_bpy_utils.add_empties(references, 0.005, prefix=".L", suffix='cgt_')
@@ -25,6 +26,9 @@ class CgtMPHandOutNode(mp_out_utils.BpyOutputNode):
         cgt_collection.add_list_to_collection(self.col_name+".L", self.left_hand, self.parent_col)
         cgt_collection.add_list_to_collection(self.col_name+".R", self.right_hand, self.parent_col)
 
+        if buffered:
+            self.record_take(self.left_hand, self.right_hand)
+
     def split(self, data):
         left_hand_data, right_hand_data = data
         return [[self.left_hand, left_hand_data], [self.right_hand, right_hand_data]]
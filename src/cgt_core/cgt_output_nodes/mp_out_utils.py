@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Dict, Optional
 import logging
 from abc import abstractmethod
 
@@ -8,34 +8,55 @@ import bpy.types
 from ..cgt_naming import COLLECTIONS
 from mathutils import Vector, Quaternion, Euler
 from ..cgt_patterns import cgt_nodes
+from ..cgt_bpy import cgt_take_buffer
 
 
 class BpyOutputNode(cgt_nodes.OutputNode):
     parent_col = COLLECTIONS.drivers
-    prev_rotation = {}
+    # records the transforms instead of inserting keyframes, see record_take
+    take: Optional[cgt_take_buffer.TakeBuffer] = None
+    take_offsets: Dict[int, int] = None
 
     @abstractmethod
     def update(self, data, frame):
         pass
 
-    @staticmethod
-    def translate(target: List[bpy.types.Object], data, frame: int):
-        """ Translates and keyframes bpy empty objects. """
+    def record_take(self, *targets: List[bpy.types.Object]):
+        """ Records the transforms of the targets into a take buffer,
+            the keyframes get inserted at once when the node gets closed. """
+        objects, self.take_offsets = [], {}
+        for target in targets:
+            self.take_offsets[id(target)] = len(objects)
+            objects += target
+        self.take = cgt_take_buffer.TakeBuffer(objects)
+
+    def keyframe(self, target: List[bpy.types.Object], data_path: str, data, frame: int):
+        """ Sets the data path of the targets and keyframes it or records it to the take. """
+        indices, values = [], []
         try:
             for landmark in data:
-                target[landmark[0]].location = Vector((landmark[1]))
-                target[landmark[0]].keyframe_insert(data_path="location", frame=frame)
+                ob = target[landmark[0]]
+                setattr(ob, data_path, landmark[1])
+                if self.take is None:
+                    ob.keyframe_insert(data_path=data_path, frame=frame)
+                else:
+                    indices.append(landmark[0])
+                    values.append(landmark[1])
+        finally:
+            if indices:
+                self.take.write(data_path, frame, indices, values, self.take_offsets[id(target)])
 
+    def translate(self, target: List[bpy.types.Object], data, frame: int):
+        """ Translates and keyframes bpy empty objects. """
+        try:
+            self.keyframe(target, "location", data, frame)
         except IndexError:
             logging.debug(f"missing translation index at {frame}")
             pass
 
-    @staticmethod
-    def scale(target, data, frame):
+    def scale(self, target, data, frame):
         try:
-            for landmark in data:
-                target[landmark[0]].scale = Vector((landmark[1]))
-                target[landmark[0]].keyframe_insert(data_path="scale", frame=frame)
+            self.keyframe(target, "scale", data, frame)
         except IndexError:
             logging.debug(f"missing scale index at {data}, {frame}")
             pass
@@ -51,13 +72,15 @@ class BpyOutputNode(cgt_nodes.OutputNode):
             logging.debug(f"missing quat_euler_rotate index {data}, {frame}")
             pass
 
-    def euler_rotate(self, target, data, frame, idx_offset=0):
+    def euler_rotate(self, target, data, frame):
         """ Translates and keyframes bpy empty objects. """
         try:
-            for landmark in data:
-                target[landmark[0]].rotation_euler = landmark[1]
-                target[landmark[0]].keyframe_insert(data_path="rotation_euler", frame=frame)
-                self.prev_rotation[landmark[0] + idx_offset] = landmark[1]
+            self.keyframe(target, "rotation_euler", data, frame)
         except IndexError:
             logging.debug(f"missing euler_rotate index at {data}, {frame}")
-            pass
\ No newline at end of file
+            pass
+
+    def close(self):
+        """ Inserts the keyframes of the recorded take. """
+        if self.take is not None:
+            self.take.flush()
@@ -9,7 +9,8 @@ class MPPoseOutputNode(mp_out_utils.BpyOutputNode):
     col_name = COLLECTIONS.pose
     parent_col = COLLECTIONS.drivers
 
-    def __init__(self):
+    def __init__(self, buffered: bool = False):
+        """ buffered: records the take and inserts the keyframes once the node gets closed. """
         data = cgt_defaults
         references = {}
         for k, v in data.pose.items():
@@ -21,6 +22,9 @@ class MPPoseOutputNode(mp_out_utils.BpyOutputNode):
 
         cgt_collection.add_list_to_collection(self.col_name, self.pose, self.parent_col)
 
+        if buffered:
+            self.record_take(self.pose)
+
     def update(self, data, frame):
         loc, rot, sca = data
         for data, method in zip([loc, rot, sca], [self.translate, self.euler_rotate, self.scale]):
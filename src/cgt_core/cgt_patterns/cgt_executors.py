@@ -0,0 +1,148 @@
+""" Executors evaluating independent nodes concurrently.
+    Threads share the nodes and their state but are limited by the GIL for pure python nodes.
+    Processes keep a copy of their node alive in a dedicated worker, so stateful nodes
+    receive every frame in order. Their data gets pickled for every update. """
+from __future__ import annotations
+import sys
+import pickle
+import copyreg
+import logging
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Optional
+
+
+SEQUENTIAL = 'sequential'
+THREAD = 'thread'
+PROCESS = 'process'
+
+
+def register_pickling():
+    """ mathutils types don't support pickling, results of calculators contain them. """
+    try:
+        import mathutils
+    except ImportError:
+        return
+
+    copyreg.pickle(mathutils.Euler, lambda e: (mathutils.Euler, (tuple(e), e.order)))
+    copyreg.pickle(mathutils.Quaternion, lambda q: (mathutils.Quaternion, (tuple(q),)))
+    copyreg.pickle(mathutils.Vector, lambda v: (mathutils.Vector, (tuple(v),)))
+
+
+@contextmanager
+def detached_main():
+    """ Spawned processes import the __main__ module of the parent.
+        Hide it, so workers don't re-run Blender's or the calling script. """
+    main = sys.modules['__main__']
+    attrs = {attr: main.__dict__.pop(attr) for attr in ['__file__', '__spec__'] if attr in main.__dict__}
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        del main.__spec__
+        main.__dict__.update(attrs)
+
+
+def update(node, data: Any, frame: int) -> Any:
+    """ Nodes which got split away pass their data through. """
+    if node is None:
+        return data
+    return node.update(data, frame)[0]
+
+
+class ThreadExecutor:
+    def __init__(self, nodes: List[Any]):
+        self.nodes = nodes
+        self.pool = ThreadPoolExecutor(max_workers=len(nodes), thread_name_prefix="cgt_node")
+
+    def map(self, chunks: List[Any], frame: int) -> List[Any]:
+        futures = [self.pool.submit(update, node, chunk, frame) for node, chunk in zip(self.nodes, chunks)]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def serve(conn, payload: bytes):
+    """ Worker process loop, updates the node with the received data until None is received. """
+    register_pickling()
+
+    try:
+        node = pickle.loads(payload)
+        conn.send(True)
+    except Exception as err:
+        conn.send(err)
+        return
+
+    while True:
+        item = conn.recv()
+        if item is None:
+            break
+        data, frame = item
+        try:
+            conn.send(update(node, data, frame))
+        except Exception as err:
+            conn.send(err)
+    conn.close()
+
+
+class ProcessExecutor:
+    """ Every node lives in its own worker process. """
+    def __init__(self, nodes: List[Any]):
+        self.connections, self.processes = [], []
+        register_pickling()
+        # spawn as forking a process with loaded mediapipe graphs or blender is unsafe
+        context = multiprocessing.get_context('spawn')
+        with detached_main():
+            for node in nodes:
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(target=serve, args=(child_conn, pickle.dumps(node)), daemon=True)
+                process.start()
+                self.connections.append(parent_conn)
+                self.processes.append(process)
+
+        for conn in self.connections:
+            res = conn.recv()
+            if isinstance(res, Exception):
+                self.close()
+                raise res
+
+    def map(self, chunks: List[Any], frame: int) -> List[Any]:
+        for conn, chunk in zip(self.connections, chunks):
+            conn.send((chunk, frame))
+
+        results = [conn.recv() for conn in self.connections]
+        for res in results:
+            if isinstance(res, Exception):
+                raise res
+        return results
+
+    def close(self):
+        for conn, process in zip(self.connections, self.processes):
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.connections, self.processes = [], []
+
+
+EXECUTORS = {
+    THREAD: ThreadExecutor,
+    PROCESS: ProcessExecutor,
+}
+
+
+def create_executor(executor: str, nodes: List[Any]) -> Optional[Any]:
+    """ Returns an executor for the nodes, None if they should run sequentially. """
+    if executor == SEQUENTIAL or executor not in EXECUTORS:
+        return None
+
+    try:
+        return EXECUTORS[executor](nodes)
+    except Exception as err:
+        logging.error(f"Cannot start the {executor} executor, running the nodes sequentially: {err}")
+        return None
@@ -0,0 +1,101 @@
+""" Landmark payload of node chains.
+    A LandmarkFrame holds the landmarks of all parts of a solution in one contiguous
+    float32 (N, 4) [x, y, z, visibility] array. Parts are fixed row ranges (see LAYOUTS),
+    the mask marks the rows which have been detected. """
+from __future__ import annotations
+from typing import Dict, Optional, Tuple, Iterable
+
+import numpy as np
+
+
+def _layout(*parts: Tuple[str, int]) -> Dict[str, slice]:
+    layout, start = {}, 0
+    for name, size in parts:
+        layout[name] = slice(start, start + size)
+        start += size
+    return layout
+
+
+# rows of the parts per source (detection type)
+LAYOUTS: Dict[str, Dict[str, slice]] = {
+    'HAND': _layout(('left', 21), ('right', 21)),
+    'FACE': _layout(('face', 468)),
+    'POSE': _layout(('pose', 33)),
+}
+
+
+class LandmarkFrame:
+    __slots__ = ('data', 'mask', 'frame', 'source')
+
+    def __init__(self, source: str, data: Optional[np.ndarray] = None,
+                 mask: Optional[np.ndarray] = None, frame: int = -1):
+        """ source: detection type the layout of the landmarks depends on. """
+        size = self.size(source)
+        self.source = source
+        self.data = np.zeros((size, 4), dtype=np.float32) if data is None else data
+        self.mask = np.zeros(size, dtype=bool) if mask is None else mask
+        self.frame = frame
+
+    @staticmethod
+    def size(source: str) -> int:
+        return max(rows.stop for rows in LAYOUTS[source].values())
+
+    @classmethod
+    def from_parts(cls, source: str, frame: int = -1, **parts: Optional[Iterable]) -> LandmarkFrame:
+        """ Frame from [x, y, z(, visibility)] landmarks per part, empty parts remain invalid. """
+        landmark_frame = cls(source, frame=frame)
+        for name, landmarks in parts.items():
+            if landmarks is None or len(landmarks) == 0:
+                continue
+            landmarks = np.asarray(landmarks, dtype=np.float32)
+            rows = LAYOUTS[source][name]
+            if len(landmarks) < rows.stop - rows.start:
+                continue
+            landmark_frame.set_part(name, landmarks[:rows.stop - rows.start])
+        return landmark_frame
+
+    def part(self, name: str) -> Optional[np.ndarray]:
+        """ View of the landmarks of a part, None if the part hasn't been detected. """
+        rows = LAYOUTS[self.source][name]
+        if not self.mask[rows].all():
+            return None
+        return self.data[rows]
+
+    def rows(self, name: str) -> np.ndarray:
+        """ View of the landmarks of a part to write to, mark it valid using set_part. """
+        return self.data[LAYOUTS[self.source][name]]
+
+    def set_part(self, name: str, landmarks: Optional[np.ndarray] = None):
+        """ Writes the [x, y, z(, visibility)] landmarks of a part (if given) and marks the part valid. """
+        rows = LAYOUTS[self.source][name]
+        if landmarks is not None:
+            columns = landmarks.shape[1]
+            self.data[rows, :columns] = landmarks
+            self.data[rows, columns:] = 0.0
+        self.mask[rows] = True
+
+    def clear(self, name: Optional[str] = None):
+        """ Marks a part or all parts invalid. """
+        if name is None:
+            self.mask[:] = False
+        else:
+            self.mask[LAYOUTS[self.source][name]] = False
+
+    def any(self) -> bool:
+        return bool(self.mask.any())
+
+    def copy(self) -> LandmarkFrame:
+        return LandmarkFrame(self.source, self.data.copy(), self.mask.copy(), self.frame)
+
+    def smooth(self, other: LandmarkFrame):
+        """ Averages the landmarks detected in both frames, adopts landmarks only detected in the other frame. """
+        both = self.mask & other.mask
+        self.data[both] += other.data[both]
+        self.data[both] /= 2
+        adopt = ~self.mask & other.mask
+        self.data[adopt] = other.data[adopt]
+        self.mask |= other.mask
+
+    def __repr__(self):
+        parts = [name for name in LAYOUTS[self.source] if self.part(name) is not None]
+        return f"LandmarkFrame({self.source}, frame={self.frame}, parts={parts})"
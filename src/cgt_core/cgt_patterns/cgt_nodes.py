@@ -1,26 +1,91 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Any, Optional
-from ..cgt_utils.cgt_timers import timeit
+from typing import List, Tuple, Any, Optional, Sequence, Callable, Iterable, Iterator
+from functools import wraps
+from ..cgt_utils import cgt_metrics, cgt_tracing
+from . import cgt_executors
+import threading
 import logging
+import queue
+import time
+import copy
+
+
+def instrument(update: Callable) -> Callable:
+    """ Reports the runtime of node updates to the metrics registry and tracer while they are enabled. """
+    @wraps(update)
+    def wrap(node, *args, **kwargs):
+        if not (cgt_metrics.REGISTRY.enabled or cgt_tracing.TRACER.enabled):
+            return update(node, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return update(node, *args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            if cgt_metrics.REGISTRY.enabled:
+                cgt_metrics.REGISTRY.record(node, end - start)
+            if cgt_tracing.TRACER.enabled:
+                frame = args[1] if len(args) > 1 else kwargs.get('frame')
+                cgt_tracing.TRACER.complete(node.__class__.__name__, start, end, node.category, frame)
+
+    wrap.instrumented = True
+    return wrap
 
 
 class Node(ABC):
+    # nodes accessing bpy have to run on blenders main thread
+    main_thread: bool = False
+    # nodes overwriting their previous results on update
+    reuses_data: bool = False
+    # node kind in the metrics and traces
+    category: str = 'node'
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # report the runtime of every update to the metrics registry and tracer
+        update = cls.__dict__.get('update')
+        if update is not None and not getattr(update, '__isabstractmethod__', False) \
+                and not getattr(update, 'instrumented', False):
+            cls.update = instrument(update)
+
     @abstractmethod
     def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
         pass
 
+    def update_batch(self, data: Sequence[Any], frames: Sequence[int]) -> Tuple[List[Optional[Any]], List[int]]:
+        """ Processes multiple frames at once, returns the results and frames in input order.
+            Updates frame by frame by default, nodes may override it with vectorized implementations. """
+        results, result_frames = [], []
+        for chunk, frame in zip(data, frames):
+            chunk, frame = self.update(chunk, frame)
+            results.append(chunk)
+            result_frames.append(frame)
+        return results, result_frames
+
+    def stream(self, source: Iterable[Tuple[Optional[Any], int]]) -> Iterator[Tuple[Optional[Any], int]]:
+        """ Lazily updates the (data, frame) items of the source, frames without data pass through. """
+        for data, frame in source:
+            if data is None:
+                yield None, frame
+                continue
+            yield self.update(data, frame)
+
+    def close(self):
+        """ Releases resources held by the node. """
+        pass
+
     def __str__(self):
         return self.__class__.__name__
 
 
 class NodeChain(Node):
     nodes: List[Node]
+    category = 'chain'
 
     def __init__(self):
         self.nodes = list()
 
-    # @timeit
     def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
         """ Nodes executed inside a chain. """
         for node in self.nodes:
@@ -31,10 +96,43 @@ class NodeChain(Node):
             data, frame = node.update(data, frame)
         return data, frame
 
+    def update_batch(self, data: Sequence[Any], frames: Sequence[int]) -> Tuple[List[Optional[Any]], List[int]]:
+        """ Pushes the batch through the chain, frames without data skip the remaining nodes. """
+        data, frames = list(data), list(frames)
+        for node in self.nodes:
+            valid = [idx for idx, chunk in enumerate(data) if chunk is not None]
+            if not valid:
+                break
+
+            results, result_frames = node.update_batch([data[idx] for idx in valid], [frames[idx] for idx in valid])
+            for idx, chunk, frame in zip(valid, results, result_frames):
+                data[idx], frames[idx] = chunk, frame
+        return data, frames
+
+    def stream(self, source: Optional[Iterable[Tuple[Optional[Any], int]]] = None,
+               frame: int = 0, frame_step: int = 1) -> Iterator[Tuple[Optional[Any], int]]:
+        """ Lazily pushes the (data, frame) items of the source through the chain.
+            Without source, the leading input node gets iterated starting at frame. """
+        nodes = self.nodes
+        if source is None:
+            assert nodes and isinstance(nodes[0], InputNode), "Streaming without source requires an input node"
+            source, nodes = nodes[0].iterate(frame, frame_step), nodes[1:]
+
+        for data, frame in source:
+            for node in nodes:
+                if data is None:
+                    break
+                data, frame = node.update(data, frame)
+            yield data, frame
+
     def append(self, node: Node):
         """ Appends node to the chain, order does matter. """
         self.nodes.append(node)
 
+    def close(self):
+        for node in self.nodes:
+            node.close()
+
     def __str__(self):
         s = ""
         for node in self.nodes:
@@ -46,17 +144,39 @@ class NodeChain(Node):
 class NodeChainGroup(Node):
     """ Node containing multiple node chains.
         Chains and input got to match
-        Input == Output. """
+        Input == Output.
+        The chains may be evaluated concurrently using threads or processes,
+        their main thread nodes (outputs) run afterwards on the calling thread. """
     nodes: List[NodeChain]
+    category = 'chain'
+    main_nodes: Optional[List[Optional[Node]]] = None
+    executor = None
 
-    def __init__(self):
+    def __init__(self, executor: str = cgt_executors.SEQUENTIAL):
         self.nodes = list()
+        self.executor_type = executor
+
+    def start_executor(self):
+        """ Splits the chains and starts the executor running their worker parts. """
+        parts = [split_main_thread(node_chain) for node_chain in self.nodes]
+        self.executor = cgt_executors.create_executor(self.executor_type, [worker for worker, _ in parts])
+        if self.executor is None:
+            self.executor_type = cgt_executors.SEQUENTIAL
+            return
+        self.main_nodes = [main for _, main in parts]
 
-    # @timeit
     def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
         """ Push data in their designed node chains. """
         assert len(data) == len(self.nodes)
 
+        if self.executor_type != cgt_executors.SEQUENTIAL and self.executor is None:
+            self.start_executor()
+
+        if self.executor is not None:
+            data = self.executor.map(data, frame)
+            return [cgt_executors.update(node, chunk, frame)
+                    for node, chunk in zip(self.main_nodes, data)], frame
+
         updated_data = []
         for node_chain, chunk in zip(self.nodes, data):
             c, f = node_chain.update(chunk, frame)
@@ -64,6 +184,21 @@ class NodeChainGroup(Node):
 
         return updated_data, frame
 
+    def update_batch(self, data: Sequence[Any], frames: Sequence[int]) -> Tuple[List[Optional[Any]], List[int]]:
+        """ Pushes the chunks of every frame as batch in their designed node chains. """
+        assert all(len(chunks) == len(self.nodes) for chunks in data)
+
+        results = [node_chain.update_batch([chunks[idx] for chunks in data], frames)[0]
+                   for idx, node_chain in enumerate(self.nodes)]
+        return [list(chunks) for chunks in zip(*results)], list(frames)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.close()
+            self.executor = None
+        for node_chain in self.nodes:
+            node_chain.close()
+
     def __str__(self):
         s = ""
         for node_chain in self.nodes:
@@ -72,15 +207,211 @@ class NodeChainGroup(Node):
         return s
 
 
+def split_main_thread(node: Node) -> Tuple[Optional[Node], Optional[Node]]:
+    """ Splits a node into a leading part which may run on a worker thread
+        and a trailing part which has to run on the main thread. """
+    if isinstance(node, NodeChainGroup):
+        parts = [split_main_thread(node_chain) for node_chain in node.nodes]
+        if all(main is None for _, main in parts):
+            return node, None
+        if all(worker is None for worker, _ in parts):
+            return None, node
+
+        # empty chains pass their chunk through, the main thread part runs sequentially
+        worker_group, main_group = NodeChainGroup(node.executor_type), NodeChainGroup()
+        for worker, main in parts:
+            worker_group.nodes.append(worker or NodeChain())
+            main_group.nodes.append(main or NodeChain())
+        return worker_group, main_group
+
+    if isinstance(node, NodeChain):
+        worker_chain, main_chain = NodeChain(), NodeChain()
+        for idx, sub_node in enumerate(node.nodes):
+            worker, main = split_main_thread(sub_node)
+            if worker is not None:
+                worker_chain.append(worker)
+            if main is not None:
+                main_chain.nodes = [main] + node.nodes[idx + 1:]
+                break
+        return worker_chain if worker_chain.nodes else None, main_chain if main_chain.nodes else None
+
+    return (None, node) if node.main_thread else (node, None)
+
+
+def reuses_data(node: Node) -> bool:
+    """ Whether the results of a node may get overwritten by its next update. """
+    if isinstance(node, NodeChainGroup):
+        return any(reuses_data(node_chain) for node_chain in node.nodes)
+    if isinstance(node, NodeChain):
+        return bool(node.nodes) and reuses_data(node.nodes[-1])
+    return node.reuses_data
+
+
+def copy_data(data: Any) -> Any:
+    """ Copies the results of a node, landmark frames copy their arrays. """
+    if isinstance(data, list):
+        return [copy_data(chunk) for chunk in data]
+    if hasattr(data, 'copy'):
+        return data.copy()
+    return copy.deepcopy(data)
+
+
+class PipelinedNodeChain(NodeChain):
+    """ Runs the nodes of the chain as stages on worker threads, connected by bounded queues,
+        so capturing, detecting and calculating consecutive frames overlaps.
+        Nodes which have to run on the main thread get executed when draining the results.
+        The first node produces the data, None data ends the pipeline. """
+    main_nodes: NodeChain
+    stages: List[Node]
+    threads: List[threading.Thread]
+    queues: List[queue.Queue]
+
+    def __init__(self, frame_step: int = 1, maxsize: int = 2):
+        super().__init__()
+        self.frame_step = frame_step
+        self.maxsize = maxsize
+        self.main_nodes = NodeChain()
+        self.stages = list()
+        self.threads = list()
+        self.queues = list()
+        self.running = threading.Event()
+        self.started = False
+        self.finished = False
+
+    def start(self, frame: int):
+        """ Starts the worker stages, the first stage produces data starting at frame. """
+        self.stages, self.main_nodes = list(), NodeChain()
+        for idx, node in enumerate(self.nodes):
+            worker, main = split_main_thread(node)
+            if worker is not None:
+                self.stages.append(worker)
+            if main is not None:
+                self.main_nodes.nodes = [main] + self.nodes[idx + 1:]
+                break
+
+        self.queues = [queue.Queue(self.maxsize) for _ in self.stages]
+        self.running.set()
+        self.started = True
+        for idx, stage in enumerate(self.stages):
+            source = self.queues[idx - 1] if idx > 0 else None
+            thread = threading.Thread(
+                target=self.run_stage, args=(stage, source, self.queues[idx], frame, reuses_data(stage)),
+                name=f"{self.__class__.__name__}.{stage.__class__.__name__}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"Pipeline stages: {' | '.join(map(str, self.stages))} | main thread: {self.main_nodes}")
+
+    def put(self, target: queue.Queue, item: Tuple[Optional[Any], int]) -> bool:
+        """ Blocks while the target is full, returns False if the pipeline stopped meanwhile. """
+        while self.running.is_set():
+            try:
+                target.put(item, timeout=.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, source: queue.Queue) -> Optional[Tuple[Optional[Any], int]]:
+        """ Blocks while the source is empty, returns None if the pipeline stopped meanwhile. """
+        while self.running.is_set():
+            try:
+                return source.get(timeout=.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def run_stage(self, node: Node, source: Optional[queue.Queue], target: queue.Queue, frame: int,
+                  copy_results: bool = False):
+        try:
+            while self.running.is_set():
+                if source is None:
+                    data, _ = node.update([], frame)
+                else:
+                    item = self.get(source)
+                    if item is None:
+                        return
+                    data, frame = item
+                    if data is not None:
+                        data, frame = node.update(data, frame)
+
+                # nodes reusing their results (detectors, filters) get copied before handing them over
+                if copy_results and data is not None:
+                    data = copy_data(data)
+                if not self.put(target, (data, frame)) or data is None:
+                    return
+                if source is None:
+                    frame += self.frame_step
+        except Exception:
+            logging.exception(f"Pipeline stage {node} failed")
+            self.put(target, (None, frame))
+
+    def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
+        """ Starts the pipeline on the first call, afterwards the finished frames
+            get pushed through the main thread nodes. Returns the last drained data,
+            an empty list if no frame is ready and None once the pipeline finished. """
+        if not self.started:
+            self.start(frame)
+        if not self.stages:
+            return self.main_nodes.update(data, frame)
+
+        if self.finished:
+            return None, frame
+
+        result = [], frame
+        while True:
+            try:
+                data, frame = self.queues[-1].get_nowait()
+            except queue.Empty:
+                return result
+            if data is None:
+                self.finished = True
+                return None, frame
+
+            result = self.main_nodes.update(data, frame)
+
+    def stop(self):
+        """ Stops the worker stages. """
+        self.running.clear()
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        self.threads = list()
+
+    def close(self):
+        """ Stops the workers and closes the stages and main thread nodes,
+            split node chain groups run their own executors. """
+        self.stop()
+        if not self.started:
+            super().close()
+            return
+
+        for stage in self.stages:
+            stage.close()
+        self.main_nodes.close()
+
+
 class InputNode(Node):
     """ Returns data on call. """
+    category = 'input'
+
     @abstractmethod
     def update(self, data: None, frame: int) -> Tuple[Optional[Any], int]:
         pass
 
+    def iterate(self, frame: int = 0, frame_step: int = 1) -> Iterator[Tuple[Any, int]]:
+        """ Yields the data of consecutive updates until the input returns None,
+            inputs may reuse their data between updates. """
+        while True:
+            data, _frame = self.update([], frame)
+            if data is None:
+                return
+            yield data, frame
+            frame += frame_step
+
 
 class CalculatorNode(Node):
     """ Calculate new data and changes the input shape. """
+    category = 'calculator'
+
     @abstractmethod
     def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
         pass
@@ -88,6 +419,9 @@ class CalculatorNode(Node):
 
 class OutputNode(Node):
     """ Outputs and returns the data without changing values nor shape. """
+    category = 'output'
+    main_thread = True
+
     @abstractmethod
     def update(self, data: Any, frame: int) -> Tuple[Optional[Any], int]:
         pass
@@ -0,0 +1,95 @@
+""" Latency metrics of node updates.
+    Every node reports its update runtime to the registry (see cgt_nodes.instrument).
+    Recording is disabled by default, while disabled updates only check a flag.
+
+    Usage (from blenders python console):
+    from BlendArMocap.src.cgt_core.cgt_utils import cgt_metrics
+    cgt_metrics.REGISTRY.enable()
+    print(cgt_metrics.REGISTRY.to_json()) """
+from __future__ import annotations
+import json
+import weakref
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class NodeStats:
+    """ Runtimes of a node instance, percentiles refer to the latest window of updates. """
+    def __init__(self, node, window: int):
+        self.node = weakref.ref(node)
+        self.name = node.__class__.__name__
+        self.category = getattr(node, 'category', 'node')
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window = deque(maxlen=window)
+
+    def add(self, runtime: float):
+        self.count += 1
+        self.total += runtime
+        self.window.append(runtime)
+        if runtime > self.max:
+            self.max = runtime
+
+    def snapshot(self) -> dict:
+        window = np.array(self.window) * 1000
+        return {
+            'category': self.category,
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': float(window.mean()) if len(window) else 0.0,
+            'p50_ms': float(np.percentile(window, 50)) if len(window) else 0.0,
+            'p95_ms': float(np.percentile(window, 95)) if len(window) else 0.0,
+            'max_ms': self.max * 1000,
+        }
+
+
+class MetricsRegistry:
+    enabled: bool = False
+
+    def __init__(self, window: int = 256):
+        """ window: amount of recent updates used for the rolling statistics. """
+        self.window = window
+        self.stats: Dict[int, NodeStats] = {}
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.stats = {}
+
+    def record(self, node, runtime: float):
+        stats = self.stats.get(id(node))
+        if stats is None or stats.node() is not node:
+            stats = self.stats[id(node)] = NodeStats(node, self.window)
+        stats.add(runtime)
+
+    def snapshot(self) -> dict:
+        """ Statistics per node instance and the total runtime per node category,
+            the runtime of chains includes their nodes. """
+        nodes, categories = {}, {}
+        for stats in list(self.stats.values()):
+            name, idx = stats.name, 2
+            while name in nodes:
+                name, idx = f"{stats.name} ({idx})", idx + 1
+
+            nodes[name] = stats.snapshot()
+            categories[stats.category] = categories.get(stats.category, 0.0) + nodes[name]['total_ms']
+        return {'nodes': nodes, 'categories_total_ms': categories}
+
+    def to_json(self, path: Optional[str] = None, indent: int = 2) -> str:
+        """ Returns the snapshot as json, writes it to the path if given. """
+        text = json.dumps(self.snapshot(), indent=indent)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+
+REGISTRY = MetricsRegistry()
+
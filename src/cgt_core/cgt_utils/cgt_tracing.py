@@ -0,0 +1,81 @@
+""" Chrome trace events of node updates.
+    Events get recorded into a ring buffer while tracing is enabled and may be dumped
+    as Chrome Trace Event json, which can be opened in chrome://tracing or ui.perfetto.dev.
+
+    Usage (from blenders python console):
+    from BlendArMocap.src.cgt_core.cgt_utils import cgt_tracing
+    cgt_tracing.TRACER.enable()
+    cgt_tracing.TRACER.dump("/tmp/trace.json") """
+from __future__ import annotations
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict
+
+
+class Tracer:
+    enabled: bool = False
+
+    def __init__(self, capacity: int = 100000):
+        """ capacity: amount of events kept, the oldest events get dropped. """
+        self.events = deque(maxlen=capacity)
+        self.thread_names: Dict[int, str] = {}
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.events.clear()
+
+    def complete(self, name: str, start: float, end: float, category: str = 'node', frame: Optional[int] = None):
+        """ Records a complete event (begin and duration), start and end are perf counter timestamps. """
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.events.append((name, category, start, end, tid, frame))
+
+    def to_chrome(self) -> dict:
+        """ Returns the recorded events in the Chrome Trace Event format. """
+        pid = os.getpid()
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        for name, category, start, end, tid, frame in list(self.events):
+            event = {
+                'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': start * 1e6, 'dur': (end - start) * 1e6,
+            }
+            if frame is not None:
+                event['args'] = {'frame': frame}
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path: str) -> str:
+        """ Writes the recorded events as Chrome Trace Event json. """
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome(), f)
+        return path
+
+
+TRACER = Tracer()
+
+
+@contextmanager
+def trace_scope(name: str, category: str = 'scope', frame: Optional[int] = None):
+    """ Records the runtime of the scope while tracing is enabled. """
+    if not TRACER.enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TRACER.complete(name, start, time.perf_counter(), category, frame)
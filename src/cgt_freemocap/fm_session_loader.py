@@ -1,9 +1,10 @@
 import logging
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Iterator, Tuple
 import numpy as np
 from . import fm_paths
 from ..cgt_core.cgt_core_chains import HolisticNodeChainGroup
+from ..cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
 from ..cgt_core.cgt_bpy import cgt_fc_actions, cgt_bpy_utils
 from ..cgt_core.cgt_calculators_nodes import mp_calc_face_rot, mp_calc_pose_rot, mp_calc_hand_rot
 from ..cgt_core.cgt_utils.cgt_timers import timeit
@@ -21,6 +22,8 @@ class FreemocapLoader:
     first_right_hand_point: int = 54
     first_face_point: int = 75
 
+    stream: Iterator = None
+
     def __init__(self, session_path: str, modal_operation=True, raw=False):
         """ Load the 3d mediapipe skeleton data from a freemocap session
             (not implemented) `reprojection_error_threshold:float` = filter data 
@@ -57,19 +60,22 @@ class FreemocapLoader:
         if modal_operation:
             self.node_chain = HolisticNodeChainGroup()
 
-    def update(self):
-        """ Provides holistic data for each (prerecorded) frame.
-            Gets called on modal operation whenever blenders window manager updates. """
-        if self.frame < self.number_of_frames:
+    def frames(self) -> Iterator[Tuple[List[LandmarkFrame], int]]:
+        """ Yields the holistic data of the remaining (prerecorded) frames. """
+        while self.frame < self.number_of_frames:
             holistic_data = self.get_freemocap_session_data(self.frame)
             if holistic_data is None:
-                return False
+                return
 
             self.frame += 1
-            self.node_chain.update(holistic_data, self.frame)
+            yield holistic_data, self.frame
 
-            return True
-        return False
+    def update(self):
+        """ Provides holistic data for each (prerecorded) frame.
+            Gets called on modal operation whenever blenders window manager updates. """
+        if self.stream is None:
+            self.stream = self.node_chain.stream(self.frames())
+        return next(self.stream, None) is not None
 
     @timeit
     def quickload_raw(self):
@@ -124,16 +130,13 @@ class FreemocapLoader:
         # calc rotations and additional locations
         logging.info(
             "Calculating additional rotations and locations for hands.")
-        hand_results = np.array([calc_hand.update(data, frame)
-                                for data, frame in zip(hand_data, frames)], dtype=object)
+        hand_results = list(zip(*calc_hand.update_batch(hand_data, frames)))
         logging.info(
             "Calculating additional rotations and locations for pose.")
-        pose_results = np.array([calc_pose.update(data, frame)
-                                for data, frame in zip(pose_data, frames)], dtype=object)
+        pose_results = list(zip(*calc_pose.update_batch(pose_data, frames)))
         logging.info(
             "Calculating additional rotations and locations for face.")
-        face_results = np.array([calc_face.update(data, frame)
-                                for data, frame in zip(face_data, frames)], dtype=object)
+        face_results = list(zip(*calc_face.update_batch(face_data, frames)))
 
         def split_transform_data(transform, m_frame):
             """ Returns locs and rots [[n (objs)], [x, y, z, idx, frame]] """
@@ -237,19 +240,14 @@ class FreemocapLoader:
 
         tracked_points = self.mediapipe3d_frames_trackedPoints_xyz[frame, :, :]
 
-        this_frame_body_data = tracked_points[0:self.first_left_hand_point]
-        this_frame_left_hand_data = tracked_points[self.first_left_hand_point:self.first_right_hand_point]
-        this_frame_right_hand_data = tracked_points[self.first_right_hand_point:self.first_face_point]
-        this_frame_face_data = tracked_points[self.first_face_point:]
-
-        this_frame_body_data = list(enumerate(this_frame_body_data))
-        this_frame_left_hand_data = list(enumerate(this_frame_left_hand_data))
-        this_frame_right_hand_data = list(
-            enumerate(this_frame_right_hand_data))
-        this_frame_face_data = list(enumerate(this_frame_face_data))
+        body = tracked_points[0:self.first_left_hand_point]
+        left_hand = tracked_points[self.first_left_hand_point:self.first_right_hand_point]
+        right_hand = tracked_points[self.first_right_hand_point:self.first_face_point]
+        face = tracked_points[self.first_face_point:]
 
-        holistic_data = [[[this_frame_left_hand_data], [this_frame_right_hand_data]],
-                         [this_frame_face_data], this_frame_body_data]
+        holistic_data = [LandmarkFrame.from_parts('HAND', frame, left=left_hand, right=right_hand),
+                         LandmarkFrame.from_parts('FACE', frame, face=face),
+                         LandmarkFrame.from_parts('POSE', frame, pose=body)]
         return holistic_data
 
 
@@ -0,0 +1 @@
+""" Detector throughput benchmarks, run without Blender (see __main__). """
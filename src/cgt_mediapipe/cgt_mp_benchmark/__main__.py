@@ -0,0 +1,92 @@
+""" Detector throughput benchmark, runs without Blender.
+
+    Usage (from blenders addon directory):
+    python -m BlendArMocap.src.cgt_mediapipe.cgt_mp_benchmark -d HAND POSE -o results.json
+    python -m BlendArMocap.src.cgt_mediapipe.cgt_mp_benchmark clip.mp4 --compare results.json """
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from typing import List
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from . import fixtures, runner
+from ..cgt_mp_core.mp_offline_engine import DETECTORS
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata() -> dict:
+    return {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'mediapipe': mp.__version__,
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Measures the detector throughput on recorded or generated clips.")
+    parser.add_argument('clips', nargs='*', help="Recorded clips, a generated fixture is used if none are given.")
+    parser.add_argument('-f', '--fixture', default='synthetic', choices=['synthetic', 'image'])
+    parser.add_argument('--image', help="Image to generate the 'image' fixture from.")
+    parser.add_argument('--size', default='640x480', help="Fixture size, i.e. 1920x1080.")
+    parser.add_argument('--count', type=int, default=90, help="Fixture frame count.")
+    parser.add_argument('-d', '--detectors', nargs='+', default=list(DETECTORS.keys()), choices=list(DETECTORS.keys()))
+    parser.add_argument('-m', '--modes', nargs='+', default=['tracking'], choices=runner.MODES)
+    parser.add_argument('-n', '--max-frames', type=int, default=0, help="0 detects every frame.")
+    parser.add_argument('--draw', action='store_true', help="Draw the results on the preview image.")
+    parser.add_argument('-o', '--output', help="Path to write the json results to.")
+    parser.add_argument('--compare', help="Json results of a previous run to compare with.")
+    args = parser.parse_args(argv)
+
+    clips = args.clips
+    if not clips:
+        width, height = map(int, args.size.lower().split('x'))
+        clips = [str(fixtures.fixture(args.fixture, args.count, (width, height), args.image))]
+
+    results = []
+    for clip in clips:
+        for detector_type in args.detectors:
+            for mode in args.modes:
+                res = runner.run(clip, detector_type, mode, args.draw, args.max_frames)
+                results.append(res)
+                stages = ", ".join(f"{stage} {res['stages'][stage]['mean_ms']:.2f}" for stage in runner.STAGES)
+                print(f"{res['clip']} {detector_type:>8} {mode:>9}: {res['fps']:6.1f} fps, "
+                      f"detected {res['detected']}/{res['frames']}, init {res['init_sec']:.2f} sec | ms: {stages}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': metadata(), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared to {baseline['meta'].get('revision')} ({baseline['meta'].get('date')}):")
+        for line in runner.compare(results, baseline['results']):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+""" Fixture videos for the detector benchmarks.
+    Fixtures get generated once and are stored in the temp directory. """
+from __future__ import annotations
+import tempfile
+from pathlib import Path
+from typing import Tuple, Optional
+
+import cv2
+import numpy as np
+
+
+FIXTURE_DIR = Path(tempfile.gettempdir()) / "BlendArMocap" / "fixtures"
+
+
+def write_clip(path: Path, frames, fps: int = 30):
+    """ Writes bgr frames to a mp4 file. """
+    writer = None
+    for frame in frames:
+        if writer is None:
+            height, width = frame.shape[:2]
+            writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            if not writer.isOpened():
+                raise IOError(f"Cannot write fixture {path}")
+        writer.write(frame)
+
+    if writer is not None:
+        writer.release()
+
+
+def synthetic_frames(count: int, size: Tuple[int, int], seed: int = 0):
+    """ Moving blobs on a noisy gradient, mostly exercises the detection (not the tracking) models. """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)[None, :, None].repeat(height, 0).repeat(3, 2)
+    blobs = rng.uniform((0, 0, 20, 0), (width, height, height / 4, 255), size=(6, 4))
+    velocities = rng.normal(0, 4, size=(6, 2))
+
+    for idx in range(count):
+        frame = gradient + rng.normal(0, 8, size=gradient.shape).astype(np.float32)
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        for (x, y, radius, color), velocity in zip(blobs, velocities):
+            center = (int((x + velocity[0] * idx) % width), int((y + velocity[1] * idx) % height))
+            cv2.circle(frame, center, int(radius), (int(color), 255 - int(color), 128), -1)
+        yield frame
+
+
+def image_frames(image_path: str, count: int, size: Tuple[int, int]):
+    """ Slowly pans and zooms a still image, e.g. a photo of a person. """
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise IOError(f"Cannot read image {image_path}")
+
+    width, height = size
+    img_h, img_w = image.shape[:2]
+    for idx in range(count):
+        t = idx / max(count - 1, 1)
+        zoom = 1.0 - .15 * np.sin(t * np.pi)
+        crop_w, crop_h = int(img_w * zoom), int(img_h * zoom)
+        x0 = int((img_w - crop_w) * t)
+        y0 = int((img_h - crop_h) * .5)
+        yield cv2.resize(image[y0:y0 + crop_h, x0:x0 + crop_w], (width, height), interpolation=cv2.INTER_AREA)
+
+
+def fixture(name: str = 'synthetic', count: int = 90, size: Tuple[int, int] = (640, 480),
+            image_path: Optional[str] = None) -> Path:
+    """ Returns the path to a generated fixture clip, generates it if missing.
+        name: 'synthetic' or 'image' (requires an image path). """
+    width, height = size
+    if name == 'synthetic':
+        path = FIXTURE_DIR / f"synthetic_{width}x{height}_{count}.mp4"
+        frames = synthetic_frames(count, size)
+    elif name == 'image':
+        if image_path is None:
+            raise ValueError("Image fixtures require an image path.")
+        path = FIXTURE_DIR / f"{Path(image_path).stem}_{width}x{height}_{count}.mp4"
+        frames = image_frames(image_path, count, size)
+    else:
+        raise KeyError(f"Unknown fixture: {name}")
+
+    if not path.is_file():
+        FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+        write_clip(path, frames)
+    return path
@@ -0,0 +1,124 @@
+""" Runs a detector on a clip and records the time spent in each stage of the detection.
+    Stages follow DetectorNode.exec_detection:
+    - capture: reading (decoding) the frame
+    - convert: bgr to mirrored rgb conversion
+    - inference: mediapipe solution
+    - landmarks: conversion of the results to landmark arrays
+    - draw: drawing the results on the preview image (without showing it) """
+from __future__ import annotations
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..cgt_mp_core import cv_stream
+from ..cgt_mp_core.mp_offline_engine import DETECTORS
+
+
+STAGES = ['capture', 'convert', 'inference', 'landmarks', 'draw']
+# per frame: solution gets constructed for every frame (legacy behaviour)
+# static: persistent solution, static_image_mode=True
+# tracking: persistent solution, static_image_mode=False
+MODES = ['per_frame', 'static', 'tracking']
+
+
+def summarize(runtimes: List[float]) -> Dict[str, float]:
+    """ Statistics of runtimes in milliseconds. """
+    if not runtimes:
+        return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+    ms = np.array(runtimes) * 1000
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'max_ms': float(ms.max()),
+    }
+
+
+def run(clip: str, detector_type: str, mode: str = 'tracking', draw: bool = False,
+        max_frames: int = 0, detector_kwargs: Optional[dict] = None) -> dict:
+    """ Detects every frame of the clip (up to max_frames) and returns the stage timings. """
+    kwargs = dict(detector_kwargs or {})
+    kwargs['static_image_mode'] = mode != 'tracking'
+
+    stream = cv_stream.Stream(str(clip), "Benchmark", preview=cv_stream.PREVIEW_NONE)
+    start = time.perf_counter()
+    detector = DETECTORS[detector_type](stream, **kwargs)
+    init = time.perf_counter() - start
+
+    timings = {stage: [] for stage in STAGES}
+    frames = detected = 0
+    while not max_frames or frames < max_frames:
+        t0 = time.perf_counter()
+        updated, frame, stream.position = stream.sampler.read(stream.capture_frame)
+        if not updated:
+            break
+        stream.capture_frame = frame
+
+        t1 = time.perf_counter()
+        stream.frame = cv_stream.to_rgb(frame, stream.frame)
+        stream.frame.flags.writeable = False
+
+        t2 = time.perf_counter()
+        if mode == 'per_frame':
+            detector.close()
+            detector.open()
+        mp_res = detector.process(stream.frame)
+
+        t3 = time.perf_counter()
+        contains_features = detector.contains_features(mp_res)
+        if contains_features:
+            detector.detected_data(mp_res)
+            detected += 1
+        else:
+            detector.empty_data()
+
+        t4 = time.perf_counter()
+        if draw:
+            stream.update_preview()
+            if contains_features:
+                detector.draw_result(stream, mp_res, detector.drawing_utils)
+
+        t5 = time.perf_counter()
+        for stage, runtime in zip(STAGES, [t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4]):
+            timings[stage].append(runtime)
+        frames += 1
+
+    detector.close()
+    total = sum(sum(runtimes) for runtimes in timings.values())
+    return {
+        'detector': detector_type,
+        'clip': Path(clip).name,
+        'mode': mode,
+        'draw': draw,
+        'frames': frames,
+        'detected': detected,
+        'init_sec': init,
+        'fps': frames / total if total > 0 else 0.0,
+        'stages': {stage: summarize(runtimes) for stage, runtimes in timings.items()},
+    }
+
+
+def result_key(result: dict) -> tuple:
+    return result['detector'], result['clip'], result['mode'], result['draw']
+
+
+def compare(results: List[dict], baseline: List[dict]) -> List[str]:
+    """ Describes the fps and stage changes compared to the baseline results. """
+    baseline = {result_key(result): result for result in baseline}
+    lines = []
+    for result in results:
+        prev = baseline.get(result_key(result))
+        if prev is None or prev['fps'] == 0:
+            continue
+
+        change = (result['fps'] / prev['fps'] - 1) * 100
+        stages = ", ".join(
+            f"{stage} {result['stages'][stage]['mean_ms'] - prev['stages'][stage]['mean_ms']:+.2f} ms"
+            for stage in STAGES if stage in prev['stages']
+        )
+        lines.append(f"{' / '.join(map(str, result_key(result)))}: "
+                     f"{prev['fps']:.1f} -> {result['fps']:.1f} fps ({change:+.1f}%), {stages}")
+    return lines
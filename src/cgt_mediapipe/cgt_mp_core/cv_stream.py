@@ -1,27 +1,230 @@
 from __future__ import annotations
-from typing import Union, Tuple
+from typing import Union, Tuple, Optional, List
+from collections import deque
+import threading
 import time
 import cv2
 import logging
 import numpy as np
 
 
+DROP_OLDEST = 'drop'
+BLOCK = 'block'
+
+PREVIEW_DRAW = 'draw'
+PREVIEW_THROTTLED = 'throttled'
+PREVIEW_NONE = 'none'
+
+
+class FrameBuffer:
+    """ Ring of preallocated frames shared by a capture thread (producer) and the detection (consumer).
+        drop: the producer overwrites the oldest unread frame, the consumer receives the newest frame.
+        block: the producer waits for a free slot, the consumer receives every frame in order. """
+    frames: Optional[List[np.ndarray]] = None
+
+    def __init__(self, size: int = 3, policy: str = DROP_OLDEST):
+        # one slot for the producer, one for the consumer and at least one filled frame
+        self.size = max(size, 3)
+        self.policy = policy
+        self.timestamps = [0.0] * self.size
+        self.positions = [0] * self.size
+        self.free = deque(range(self.size))
+        self.filled = deque()
+        self.reading = None
+        self.eof = False
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def allocate(self, frame: np.ndarray):
+        """ Allocates the ring based on the first captured frame. """
+        self.frames = [np.empty_like(frame) for _ in range(self.size)]
+
+    def acquire(self) -> Optional[int]:
+        """ Returns the index of a slot to write to, None if the buffer got closed. """
+        with self.condition:
+            while not self.closed:
+                if self.free:
+                    return self.free.popleft()
+                if self.policy == DROP_OLDEST and self.filled:
+                    return self.filled.popleft()
+                self.condition.wait()
+            return None
+
+    def commit(self, idx: int, timestamp: float, position: int = 0):
+        """ Marks the slot as readable. """
+        with self.condition:
+            self.timestamps[idx] = timestamp
+            self.positions[idx] = position
+            self.filled.append(idx)
+            self.condition.notify_all()
+
+    def release(self, idx: int):
+        """ Returns an unused slot. """
+        with self.condition:
+            self.free.append(idx)
+            self.condition.notify_all()
+
+    def finish(self):
+        """ Flags the end of the input, remaining frames can still be read. """
+        with self.condition:
+            self.eof = True
+            self.condition.notify_all()
+
+    def get(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float, int]:
+        """ Returns a frame, its capture timestamp and position in the input.
+            The frame stays valid until the next call. """
+        with self.condition:
+            if self.reading is not None:
+                self.free.append(self.reading)
+                self.reading = None
+                self.condition.notify_all()
+
+            if not self.filled and not self.eof and not self.closed:
+                self.condition.wait_for(lambda: self.filled or self.eof or self.closed, timeout)
+            if not self.filled:
+                return None, 0.0, -1
+
+            if self.policy == DROP_OLDEST:
+                idx = self.filled.pop()
+                self.free.extend(self.filled)
+                self.filled.clear()
+                self.condition.notify_all()
+            else:
+                idx = self.filled.popleft()
+
+            self.reading = idx
+            return self.frames[idx], self.timestamps[idx], self.positions[idx]
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FrameSampler:
+    """ Reads frames of a capture while skipping frames which don't get keyed.
+        Only windows of frames ending at every step-th frame get decoded (retrieved),
+        small gaps get skipped using grab(), larger gaps by seeking. """
+    def __init__(self, capture: cv2.VideoCapture, step: int = 1, window: int = 1, offset: int = 0,
+                 seek_threshold: int = 30):
+        self.capture = capture
+        self.step = max(step, 1)
+        self.window = min(max(window, 1), self.step)
+        self.offset = offset % self.step
+        self.seek_threshold = seek_threshold
+        # position of the next frame in the capture
+        self.position = 0
+
+    def next_position(self) -> int:
+        """ Position of the next frame to decode. """
+        if self.window == self.step:
+            return self.position
+        sample = self.position + (self.offset - self.position) % self.step
+        return max(self.position, sample - self.window + 1)
+
+    def skip(self, count: int) -> bool:
+        """ Skips frames without retrieving them. """
+        if count <= 0:
+            return True
+
+        if count >= self.seek_threshold:
+            self.position += count
+            return self.capture.set(cv2.CAP_PROP_POS_FRAMES, self.position)
+
+        for _ in range(count):
+            if not self.capture.grab():
+                return False
+            self.position += 1
+        return True
+
+    def read(self, dst: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray], int]:
+        """ Returns whether the read succeeded, the frame and its position. """
+        if not self.skip(self.next_position() - self.position):
+            return False, None, -1
+
+        updated, frame = self.capture.read(dst)
+        self.position += 1
+        return updated, frame, self.position - 1
+
+
+class CaptureThread(threading.Thread):
+    """ Continuously reads frames from the capture into the frame buffer. """
+    def __init__(self, sampler: FrameSampler, buffer: FrameBuffer, is_movie: bool = False):
+        threading.Thread.__init__(self, daemon=True)
+        self.sampler = sampler
+        self.buffer = buffer
+        self.is_movie = is_movie
+
+    def run(self):
+        while not self.buffer.closed:
+            idx = self.buffer.acquire()
+            if idx is None:
+                return
+
+            if self.buffer.frames is None:
+                # the first frame determines the shape of the ring
+                updated, frame, position = self.sampler.read()
+                if updated:
+                    self.buffer.allocate(frame)
+                    self.buffer.frames[idx][:] = frame
+            else:
+                updated, _, position = self.sampler.read(self.buffer.frames[idx])
+
+            if updated:
+                self.buffer.commit(idx, time.perf_counter(), position)
+                continue
+
+            self.buffer.release(idx)
+            if self.is_movie:
+                self.buffer.finish()
+                return
+            time.sleep(.001)
+
+
+def to_rgb(frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Converts a bgr capture frame to a mirrored rgb frame.
+        Conversion and flip happen in dst, which gets allocated if missing or not matching. """
+    if dst is None or dst.shape != frame.shape:
+        dst = np.empty_like(frame)
+    dst.flags.writeable = True
+    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst)
+    cv2.flip(dst, 1, dst=dst)
+    return dst
+
+
 class Stream:
     updated: bool = None
+    # mirrored rgb frame used for detection
     frame: np.ndarray = None
+    # bgr copy of the frame, only gets created when the preview is drawn
+    preview_image: np.ndarray = None
+    capture_frame: np.ndarray = None
     input_type: int = None
-    color_spaces = {
-        'rgb': cv2.COLOR_BGR2RGB,
-        'bgr': cv2.COLOR_RGB2BGR
-    }
     dim: Tuple[int, int]
     is_movie: bool = False
     frame_configured: bool = False
+    timestamp: float = 0.0
+    # position of the current frame in the input
+    position: int = -1
+    sampler: FrameSampler = None
+    buffer: Optional[FrameBuffer] = None
+    capture_thread: Optional[CaptureThread] = None
+    last_preview: float = 0.0
 
     def __init__(self, capture_input: Union[str, int], title: str = "Stream Detection",
-                 width: int = 640, height: int = 480, backend: int = 0):
-        """ Generates a video stream for webcam or opens a movie file using cv2 """
+                 width: int = 640, height: int = 480, backend: int = 0,
+                 threaded: bool = False, buffer_size: int = 3, policy: str = DROP_OLDEST,
+                 preview: str = PREVIEW_DRAW, preview_rate: float = 10.0,
+                 sample_step: int = 1, sample_window: int = 1, sample_offset: int = 0):
+        """ Generates a video stream for webcam or opens a movie file using cv2.
+            If threaded, frames get captured in a background thread into a ring buffer
+            using the drop (newest frame) or block (every frame) policy.
+            The preview gets drawn every frame, throttled to preview_rate (Hz) or not at all.
+            Movies may get sampled, only sample_window frames ending at every
+            sample_step-th frame (starting at sample_offset) get decoded. """
         self.set_capture(capture_input, backend)
+        self.preview = preview
+        self.preview_rate = max(preview_rate, 0.1)
 
         self.dim = (width, height)
         self.frame_configured = False
@@ -39,16 +242,39 @@ class Stream:
                 raise IOError("Cannot open webcam")
         self.title = title
 
+        if self.is_movie:
+            self.sampler = FrameSampler(self.capture, sample_step, sample_window, sample_offset)
+        else:
+            self.sampler = FrameSampler(self.capture)
+
+        if threaded:
+            self.buffer = FrameBuffer(buffer_size, policy)
+            self.capture_thread = CaptureThread(self.sampler, self.buffer, self.is_movie)
+            self.capture_thread.start()
+
     def update(self):
-        self.updated, frame = self.capture.read()
-        self.frame = cv2.flip(frame, 1)
+        if self.buffer is not None:
+            frame, self.timestamp, self.position = self.buffer.get()
+            self.updated = frame is not None
+        else:
+            self.updated, frame, self.position = self.sampler.read(self.capture_frame)
+            self.capture_frame = frame
+            self.timestamp = time.perf_counter()
 
-    def set_color_space(self, space):
-        self.frame = cv2.cvtColor(self.frame, self.color_spaces[space])
+        if not self.updated:
+            self.frame = None
+            return
+        self.frame = to_rgb(frame, self.frame)
+
+    def update_preview(self):
+        """ Converts the current frame to the bgr preview image. """
+        if self.preview_image is None or self.preview_image.shape != self.frame.shape:
+            self.preview_image = np.empty_like(self.frame)
+        cv2.cvtColor(self.frame, cv2.COLOR_RGB2BGR, dst=self.preview_image)
 
     def resize_movie_frame(self):
         if not self.frame_configured:
-            (h, w) = self.frame.shape[:2]
+            (h, w) = self.preview_image.shape[:2]
             (tar_w, tar_h) = self.dim
 
             if h < w:   # landscape
@@ -62,10 +288,22 @@ class Stream:
 
             self.frame_configured = True
 
-        return cv2.resize(self.frame, self.dim, interpolation=cv2.INTER_AREA)
+        return cv2.resize(self.preview_image, self.dim, interpolation=cv2.INTER_AREA)
+
+    def preview_due(self) -> bool:
+        """ True if the preview should be drawn for the current frame. """
+        if self.preview == PREVIEW_NONE:
+            return False
+
+        if self.preview == PREVIEW_THROTTLED:
+            now = time.perf_counter()
+            if now - self.last_preview < 1.0 / self.preview_rate:
+                return False
+            self.last_preview = now
+        return True
 
     def draw(self):
-        f = self.frame
+        f = self.preview_image
         if self.is_movie:
             f = self.resize_movie_frame()
         cv2.imshow(self.title, f)
@@ -96,8 +334,16 @@ class Stream:
         self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
         self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
+    def stop_capture_thread(self):
+        if self.capture_thread is None:
+            return
+        self.buffer.close()
+        self.capture_thread.join(timeout=1.0)
+        self.capture_thread = None
+
     def __del__(self):
         logging.debug("DEL STREAM")
+        self.stop_capture_thread()
         self.capture.release()
         cv2.destroyAllWindows()
 
@@ -106,8 +352,9 @@ def main():
     stream = Stream(0)
     while stream.capture.isOpened():
         stream.update()
-        stream.set_color_space('rgb')
-        stream.set_color_space('bgr')
+        if stream.frame is None:
+            continue
+        stream.update_preview()
         stream.draw()
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
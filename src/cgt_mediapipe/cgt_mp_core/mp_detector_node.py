@@ -1,25 +1,106 @@
 from __future__ import annotations
+import sys
 
+import numpy as np
 from mediapipe import solutions
 from abc import abstractmethod
 
 from . import cv_stream
 from ...cgt_core.cgt_patterns import cgt_nodes
+from ...cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
+from ...cgt_core.cgt_utils import cgt_tracing
+
+
+# wire format tags of the fixed32 fields x, y, z, visibility and presence of a NormalizedLandmark
+LANDMARK_FIELD_TAGS = np.array([0x0d, 0x15, 0x1d, 0x25, 0x2d], dtype=np.uint8)
+
+
+def parse_landmark_list(landmark_list, dst: np.ndarray) -> bool:
+    """ Reads the first len(dst) landmarks of a serialized landmark list directly into dst (N, 4).
+        Landmarks are stored as equally sized messages of float fields, returns False
+        if the message doesn't match the expected layout. """
+    raw = np.frombuffer(landmark_list.SerializeToString(), dtype=np.uint8)
+    if len(raw) < 2:
+        return False
+
+    # tag and length of every landmark message followed by n fields (tag + float32)
+    stride = int(raw[1]) + 2
+    n_fields = (stride - 2) // 5
+    if len(raw) % stride != 0 or len(raw) // stride < len(dst) or n_fields < 3 or (stride - 2) % 5 != 0:
+        return False
+
+    messages = raw[:stride * len(dst)].reshape(len(dst), stride)
+    fields = messages[:, 2:].reshape(len(dst), n_fields, 5)
+    if (messages[:, 0] != 0x0a).any() or (messages[:, 1] != stride - 2).any() \
+            or (fields[:, :, 0] != LANDMARK_FIELD_TAGS[:n_fields]).any():
+        return False
+
+    values = np.ascontiguousarray(fields[:, :, 1:]).view('<f4').reshape(len(dst), n_fields)
+    dst[:, :min(n_fields, 4)] = values[:, :4]
+    dst[:, n_fields:] = 0.0
+    return True
 
 
 class DetectorNode(cgt_nodes.InputNode):
+    # the landmark frame gets reused every frame
+    reuses_data = True
     stream: cv_stream.Stream = None
     solution = None
-
-    def __init__(self, stream: cv_stream.Stream = None):
+    mp_lib = None
+    # layout of the detection results, see cgt_landmarks.LAYOUTS
+    source: str = None
+
+    def __init__(self, stream: cv_stream.Stream = None, static_image_mode: bool = False,
+                 min_tracking_confidence: float = 0.5):
+        """ Detector owning a long-lived mediapipe solution instance.
+            static_image_mode=False enables mediapipe's tracking (video) mode,
+            which skips the palm / person detection while landmarks are tracked. """
         self.stream = stream
+        self.static_image_mode = static_image_mode
+        self.min_tracking_confidence = min_tracking_confidence
         self.drawing_utils = solutions.drawing_utils
         self.drawing_style = solutions.drawing_styles
+        # landmark frame reused every frame
+        self.landmarks = self.new_landmarks()
+
+    def new_landmarks(self):
+        """ Returns the landmark frame(s) the detection results get written to. """
+        return LandmarkFrame(self.source)
 
     @abstractmethod
-    def update(self, *args):
+    def init_solution(self):
+        """ Returns a new mediapipe solution instance. """
         pass
 
+    def open(self):
+        """ Creates the mediapipe solution, the graph and models get loaded once. """
+        if self.mp_lib is None:
+            self.mp_lib = self.init_solution()
+
+    def close(self):
+        """ Releases the mediapipe graph. """
+        if self.mp_lib is not None:
+            self.mp_lib.close()
+            self.mp_lib = None
+
+    def process(self, frame: np.ndarray):
+        """ Runs the mediapipe solution on a rgb frame. """
+        return self.mp_lib.process(frame)
+
+    def update(self, data, frame):
+        if self.mp_lib is None:
+            self.open()
+        self.set_frame(frame)
+        return self.exec_detection(self.mp_lib), frame
+
+    def set_frame(self, frame: int):
+        self.landmarks.frame = frame
+
+    @property
+    def position(self) -> int:
+        """ Position of the current frame in the input. """
+        return self.stream.position
+
     @abstractmethod
     def contains_features(self, mp_res):
         pass
@@ -28,9 +109,9 @@ class DetectorNode(cgt_nodes.InputNode):
     def draw_result(self, s, mp_res, mp_drawings):
         pass
 
-    @abstractmethod
     def empty_data(self):
-        pass
+        self.landmarks.clear()
+        return self.landmarks
 
     @abstractmethod
     def detected_data(self, mp_res):
@@ -41,7 +122,8 @@ class DetectorNode(cgt_nodes.InputNode):
             -> detected_data: Detection Results.
             -> empty_data: No features detected.
             -> None: EOF or Finish. """
-        self.stream.update()
+        with cgt_tracing.trace_scope("capture"):
+            self.stream.update()
         updated = self.stream.updated
 
         if not updated and self.stream.input_type == 0:
@@ -56,33 +138,42 @@ class DetectorNode(cgt_nodes.InputNode):
             # ignore frame if not available
             return self.empty_data()
 
-        # detect features in frame
+        # detect features in the rgb frame
         self.stream.frame.flags.writeable = False
-        self.stream.set_color_space('rgb')
-        mp_res = mp_lib.process(self.stream.frame)
-        self.stream.set_color_space('bgr')
+        with cgt_tracing.trace_scope("inference"):
+            mp_res = self.process(self.stream.frame)
+
+        contains_features = self.contains_features(mp_res)
+
+        # the preview may be disabled or throttled, exit keys only get polled while drawing
+        if self.stream.preview_due():
+            with cgt_tracing.trace_scope("preview"):
+                self.stream.update_preview()
+                if contains_features:
+                    self.draw_result(self.stream, mp_res, self.drawing_utils)
+                self.stream.draw()
 
-        # proceed if contains features
-        if not self.contains_features(mp_res):
-            self.stream.draw()
             if self.stream.exit_stream():
                 return None
-            return self.empty_data()
-
-        # draw results
-        self.draw_result(self.stream, mp_res, self.drawing_utils)
-        self.stream.draw()
 
-        # exit stream
-        if self.stream.exit_stream():
-            return None
+        if not contains_features:
+            return self.empty_data()
 
         return self.detected_data(mp_res)
 
-    def cvt2landmark_array(self, landmark_list):
-        """landmark_list: A normalized landmark list proto message to be annotated on the image."""
-        return [[idx, [landmark.x, landmark.y, landmark.z]] for idx, landmark in enumerate(landmark_list.landmark)]
+    @staticmethod
+    def write_landmarks(landmark_frame: LandmarkFrame, part: str, landmark_list):
+        """ Writes the landmarks of a landmark list proto message into a part of the frame.
+            The frame gets reused every frame, copy it to retain results. """
+        dst = landmark_frame.rows(part)
+        if not parse_landmark_list(landmark_list, dst):
+            landmarks = landmark_list.landmark[:len(dst)]
+            dst[:] = [(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in landmarks]
+        landmark_frame.set_part(part)
 
     def __del__(self):
+        # closing the graph while the interpreter shuts down blocks
+        if self.mp_lib is not None and sys is not None and not sys.is_finalizing():
+            self.close()
         if self.stream is not None:
             del self.stream
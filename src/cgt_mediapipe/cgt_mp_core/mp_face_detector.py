@@ -6,25 +6,28 @@ from mediapipe.python.solutions.drawing_utils import DrawingSpec
 
 
 class FaceDetector(DetectorNode):
-    def __init__(self, stream, refine_face_landmarks: bool = False, min_detection_confidence: float = 0.7):
-        DetectorNode.__init__(self, stream)
+    source = 'FACE'
+
+    def __init__(self, stream, refine_face_landmarks: bool = False, min_detection_confidence: float = 0.7,
+                 static_image_mode: bool = False, min_tracking_confidence: float = 0.5):
+        DetectorNode.__init__(self, stream, static_image_mode, min_tracking_confidence)
         self.solution = mp.solutions.face_mesh
         self.refine_face_landmarks = refine_face_landmarks
         self.min_detection_confidence = min_detection_confidence
+        self.open()
 
-    def update(self, data, frame):
-        with self.solution.FaceMesh(
-                max_num_faces=1,
-                static_image_mode=False,
-                refine_landmarks=self.refine_face_landmarks,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
-
-    def empty_data(self):
-        return [[[]]]
+    def init_solution(self):
+        return self.solution.FaceMesh(
+            max_num_faces=1,
+            static_image_mode=self.static_image_mode,
+            refine_landmarks=self.refine_face_landmarks,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence)
 
     def detected_data(self, mp_res):
-        return [self.cvt2landmark_array(landmark) for landmark in mp_res.multi_face_landmarks]
+        # refined landmarks (irises) exceeding the face layout get ignored
+        self.write_landmarks(self.landmarks, 'face', mp_res.multi_face_landmarks[0])
+        return self.landmarks
 
     def contains_features(self, mp_res):
         if not mp_res.multi_face_landmarks:
@@ -63,7 +66,7 @@ class FaceDetector(DetectorNode):
         """Draws the landmarks and the connections on the image."""
         for face_landmarks in mp_res.multi_face_landmarks:
             self.drawing_utils.draw_landmarks(
-                image=self.stream.frame,
+                image=s.preview_image,
                 landmark_list=face_landmarks,
                 connections=self.solution.FACEMESH_CONTOURS,
                 connection_drawing_spec=self.get_custom_face_mesh_contours_style(),
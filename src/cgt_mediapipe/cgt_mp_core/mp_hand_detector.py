@@ -1,48 +1,46 @@
 import mediapipe as mp
-from mediapipe.framework.formats import classification_pb2
 
 from .mp_detector_node import DetectorNode
-from . import cv_stream
+from . import cv_stream, mp_hand_roi
 from ...cgt_core.cgt_utils import cgt_timers
 
 
 class HandDetector(DetectorNode):
-    def __init__(self, stream, hand_model_complexity: int = 1, min_detection_confidence: float = .7):
-        DetectorNode.__init__(self, stream)
+    source = 'HAND'
+
+    def __init__(self, stream, hand_model_complexity: int = 1, min_detection_confidence: float = .7,
+                 static_image_mode: bool = False, min_tracking_confidence: float = .5,
+                 roi_cropping: bool = False):
+        DetectorNode.__init__(self, stream, static_image_mode, min_tracking_confidence)
         self.solution = mp.solutions.hands
         self.hand_model_complexity = hand_model_complexity
         self.min_detection_confidence = min_detection_confidence
+        # detect hands in a crop around the hands of the previous frame
+        self.roi = mp_hand_roi.HandROI(reset_tracking=not static_image_mode) if roi_cropping else None
+        self.open()
 
     # https://google.github.io/mediapipe/solutions/hands#python-solution-api
-    def update(self, data, frame):
-        with self.solution.Hands(
-                static_image_mode=True,
-                max_num_hands=2,
-                model_complexity=self.hand_model_complexity,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
-
-    @staticmethod
-    def separate_hands(hand_data):
-        left_hand = [data[0] for data in hand_data if data[1][1] is False]
-        right_hand = [data[0] for data in hand_data if data[1][1] is True]
-        return left_hand, right_hand
-
-    @staticmethod
-    def cvt_hand_orientation(orientation: classification_pb2):
-        if not orientation:
-            return None
-
-        return [[idx, "Right" in str(o)] for idx, o in enumerate(orientation)]
-
-    def empty_data(self):
-        return [[], []]
+    def init_solution(self):
+        return self.solution.Hands(
+            static_image_mode=self.static_image_mode,
+            max_num_hands=2,
+            model_complexity=self.hand_model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence)
+
+    def process(self, frame):
+        if self.roi is None:
+            return self.mp_lib.process(frame)
+        return self.roi.process(self.mp_lib, frame)
 
     def detected_data(self, mp_res):
-        data = [self.cvt2landmark_array(hand) for hand in mp_res.multi_hand_world_landmarks]
-        left_hand_data, right_hand_data = self.separate_hands(
-            list(zip(data, self.cvt_hand_orientation(mp_res.multi_handedness))))
-        return [left_hand_data, right_hand_data]
+        self.landmarks.clear()
+        for hand, handedness in zip(mp_res.multi_hand_world_landmarks, mp_res.multi_handedness):
+            part = 'right' if "Right" in str(handedness) else 'left'
+            # only the first hand of each side gets used
+            if self.landmarks.part(part) is None:
+                self.write_landmarks(self.landmarks, part, hand)
+        return self.landmarks
 
     def contains_features(self, mp_res):
         if not mp_res.multi_hand_landmarks and not mp_res.multi_handedness:
@@ -51,7 +49,7 @@ class HandDetector(DetectorNode):
 
     def draw_result(self, s, mp_res, mp_drawings):
         for hand in mp_res.multi_hand_landmarks:
-            mp_drawings.draw_landmarks(s.frame, hand, self.solution.HAND_CONNECTIONS)
+            mp_drawings.draw_landmarks(s.preview_image, hand, self.solution.HAND_CONNECTIONS)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+""" Region of interest cropping for hand detection.
+    The hands of the previous frame determine a padded, square crop of the current frame.
+    The hand solution only receives the crop, the image landmarks get mapped back to the full
+    frame afterwards. World landmarks are relative to the hand and don't depend on the crop.
+    If no hand is found in the crop, the full frame gets detected instead. """
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+Roi = Tuple[int, int, int, int]
+
+
+class HandROI:
+    roi: Optional[Roi] = None
+    tracked_hands: int = 0
+
+    def __init__(self, padding: float = .75, min_size: int = 128, margin: float = .1,
+                 full_frame_interval: int = 30, max_hands: int = 2, reset_tracking: bool = True):
+        """ padding: added to each side of the hand bounds relative to their size.
+            margin: the roi gets kept while the hands stay this far (relative to its size) inside.
+            full_frame_interval: frames between full frame detections while less than max_hands got tracked.
+            reset_tracking: reset the solution when the roi changes, required in tracking mode
+            as the tracked hand regions refer to the previous crop. """
+        self.padding = padding
+        self.min_size = min_size
+        self.margin = margin
+        self.full_frame_interval = full_frame_interval
+        self.max_hands = max_hands
+        self.reset_tracking = reset_tracking
+        self.frames_since_full_frame = 0
+
+    @staticmethod
+    def landmark_bounds(landmark_lists, width: int, height: int) -> Optional[np.ndarray]:
+        """ Pixel bounds [x0, y0, x1, y1] of normalized landmark lists. """
+        points = [(lm.x, lm.y) for landmark_list in landmark_lists for lm in landmark_list.landmark]
+        if not points:
+            return None
+
+        points = np.array(points) * (width, height)
+        return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+    def fit(self, bounds: np.ndarray, width: int, height: int) -> Roi:
+        """ Square roi around the padded bounds, shifted to fit into the frame. """
+        center = (bounds[:2] + bounds[2:]) / 2
+        size = max(bounds[2] - bounds[0], bounds[3] - bounds[1]) * (1 + 2 * self.padding)
+        size = int(min(max(size, self.min_size), width, height))
+
+        x0 = int(np.clip(center[0] - size / 2, 0, width - size))
+        y0 = int(np.clip(center[1] - size / 2, 0, height - size))
+        return x0, y0, x0 + size, y0 + size
+
+    def contains(self, bounds: np.ndarray) -> bool:
+        """ True if the bounds are inside the current roi minus its margin and fill it reasonably. """
+        if self.roi is None:
+            return False
+
+        x0, y0, x1, y1 = self.roi
+        margin = (x1 - x0) * self.margin
+        inside = bounds[0] >= x0 + margin and bounds[1] >= y0 + margin \
+            and bounds[2] <= x1 - margin and bounds[3] <= y1 - margin
+        fills = max(bounds[2] - bounds[0], bounds[3] - bounds[1]) * (1 + 2 * self.padding) > (x1 - x0) / 2
+        return inside and fills
+
+    def update(self, landmark_lists, width: int, height: int) -> bool:
+        """ Updates the roi using full frame landmarks, returns True if the roi changed. """
+        bounds = self.landmark_bounds(landmark_lists or [], width, height)
+        self.tracked_hands = len(landmark_lists or [])
+        if bounds is None:
+            changed, self.roi = self.roi is not None, None
+            return changed
+
+        if self.contains(bounds):
+            return False
+        self.roi = self.fit(bounds, width, height)
+        return True
+
+    @staticmethod
+    def crop(frame: np.ndarray, roi: Roi) -> np.ndarray:
+        x0, y0, x1, y1 = roi
+        return np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+    @staticmethod
+    def remap(landmark_list, roi: Roi, width: int, height: int):
+        """ Maps normalized landmarks of the crop to the full frame. """
+        x0, y0, x1, y1 = roi
+        sx, sy = (x1 - x0) / width, (y1 - y0) / height
+        for lm in landmark_list.landmark:
+            lm.x = lm.x * sx + x0 / width
+            lm.y = lm.y * sy + y0 / height
+            # z uses roughly the same scale as x
+            lm.z = lm.z * sx
+
+    def full_frame_due(self) -> bool:
+        """ Detect the full frame once in a while to find hands entering the frame. """
+        if self.tracked_hands >= self.max_hands:
+            return False
+        return self.frames_since_full_frame >= self.full_frame_interval
+
+    def process(self, solution, frame: np.ndarray):
+        """ Runs the hand solution on the roi of the frame or the full frame. """
+        height, width = frame.shape[:2]
+        if self.roi is not None and not self.full_frame_due():
+            roi = self.roi
+            mp_res = solution.process(self.crop(frame, roi))
+            self.frames_since_full_frame += 1
+            if mp_res.multi_hand_landmarks:
+                for hand in mp_res.multi_hand_landmarks:
+                    self.remap(hand, roi, width, height)
+                if self.update(mp_res.multi_hand_landmarks, width, height):
+                    self.reset(solution)
+                return mp_res
+
+            # tracking lost, fall back to the full frame
+            self.roi = None
+            self.reset(solution)
+
+        mp_res = solution.process(frame)
+        self.frames_since_full_frame = 0
+        if self.update(mp_res.multi_hand_landmarks, width, height):
+            self.reset(solution)
+        return mp_res
+
+    def reset(self, solution):
+        """ Restarts the solutions graph (expensive), its tracking state refers to the previous crop. """
+        if self.reset_tracking:
+            solution.reset()
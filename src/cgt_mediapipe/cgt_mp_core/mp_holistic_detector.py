@@ -1,45 +1,58 @@
 import mediapipe as mp
 
 from . import cv_stream, mp_detector_node
+from ...cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
 import ssl
 ssl._create_default_https_context = ssl._create_unverified_context
 
 
 class HolisticDetector(mp_detector_node.DetectorNode):
     def __init__(self, stream, model_complexity: int = 1,
-                 min_detection_confidence: float = .7, refine_face_landmarks: bool = False):
+                 min_detection_confidence: float = .7, refine_face_landmarks: bool = False,
+                 static_image_mode: bool = False, min_tracking_confidence: float = .5):
 
         self.solution = mp.solutions.holistic
-        mp_detector_node.DetectorNode.__init__(self, stream)
+        mp_detector_node.DetectorNode.__init__(self, stream, static_image_mode, min_tracking_confidence)
         self.model_complexity = model_complexity
         self.min_detection_confidence = min_detection_confidence
         self.refine_face_landmarks = refine_face_landmarks
+        self.open()
 
     # https://google.github.io/mediapipe/solutions/holistic#python-solution-api
-    def update(self, data, frame):
-        with self.solution.Holistic(
-                refine_face_landmarks=self.refine_face_landmarks,
-                model_complexity=self.model_complexity,
-                min_detection_confidence=self.min_detection_confidence,
-                static_image_mode=True,
-        ) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+    def init_solution(self):
+        return self.solution.Holistic(
+            refine_face_landmarks=self.refine_face_landmarks,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+            static_image_mode=self.static_image_mode,
+        )
+
+    def new_landmarks(self):
+        # hand, face and pose frames of the holistic node chain group
+        return [LandmarkFrame('HAND'), LandmarkFrame('FACE'), LandmarkFrame('POSE')]
+
+    def set_frame(self, frame: int):
+        for landmarks in self.landmarks:
+            landmarks.frame = frame
 
     def empty_data(self):
-        return [[[], []], [[[]]], []]
+        for landmarks in self.landmarks:
+            landmarks.clear()
+        return self.landmarks
 
     def detected_data(self, mp_res):
-        face, pose, l_hand, r_hand = [], [], [], []
+        hands, face, pose = self.empty_data()
         if mp_res.pose_landmarks:
-            pose = self.cvt2landmark_array(mp_res.pose_landmarks)
+            self.write_landmarks(pose, 'pose', mp_res.pose_landmarks)
         if mp_res.face_landmarks:
-            face = self.cvt2landmark_array(mp_res.face_landmarks)
+            self.write_landmarks(face, 'face', mp_res.face_landmarks)
+        # TODO: recheck every update, mp hands are flipped while detecting holistic.
         if mp_res.left_hand_landmarks:
-            l_hand = [self.cvt2landmark_array(mp_res.left_hand_landmarks)]
+            self.write_landmarks(hands, 'right', mp_res.left_hand_landmarks)
         if mp_res.right_hand_landmarks:
-            r_hand = [self.cvt2landmark_array(mp_res.right_hand_landmarks)]
-        # TODO: recheck every update, mp hands are flipped while detecting holistic.
-        return [[r_hand, l_hand], [face], pose]
+            self.write_landmarks(hands, 'left', mp_res.right_hand_landmarks)
+        return self.landmarks
 
     def contains_features(self, mp_res):
         if not mp_res.pose_landmarks:
@@ -48,22 +61,22 @@ class HolisticDetector(mp_detector_node.DetectorNode):
 
     def draw_result(self, s, mp_res, mp_drawings):
         mp_drawings.draw_landmarks(
-            s.frame,
+            s.preview_image,
             mp_res.face_landmarks,
             self.solution.FACEMESH_CONTOURS,
             landmark_drawing_spec=None,
             connection_drawing_spec=self.drawing_style
                 .get_default_face_mesh_contours_style())
         mp_drawings.draw_landmarks(
-            s.frame,
+            s.preview_image,
             mp_res.pose_landmarks,
             self.solution.POSE_CONNECTIONS,
             landmark_drawing_spec=self.drawing_style
                 .get_default_pose_landmarks_style())
         mp_drawings.draw_landmarks(
-            s.frame, mp_res.left_hand_landmarks, self.solution.HAND_CONNECTIONS)
+            s.preview_image, mp_res.left_hand_landmarks, self.solution.HAND_CONNECTIONS)
         mp_drawings.draw_landmarks(
-            s.frame, mp_res.right_hand_landmarks, self.solution.HAND_CONNECTIONS)
+            s.preview_image, mp_res.right_hand_landmarks, self.solution.HAND_CONNECTIONS)
 
 
 if __name__ == '__main__':
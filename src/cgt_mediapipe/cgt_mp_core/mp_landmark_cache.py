@@ -0,0 +1,207 @@
+""" On-disk cache of raw detection results.
+    Entries are keyed by a fingerprint of the movie file and the detector settings, so re-running
+    the detection with another key step or transfer target replays the landmarks instead of
+    decoding the movie. Old entries get evicted (lru) once the cache exceeds its size. """
+from __future__ import annotations
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Any, Tuple, Callable
+
+import numpy as np
+
+from ...cgt_core.cgt_patterns import cgt_nodes
+from ...cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
+
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "BlendArMocap" / "landmarks"
+MAX_CACHE_SIZE = 1024 ** 3
+# increase when the stored data changes
+CACHE_VERSION = 3
+
+
+def file_fingerprint(path: str, sample_size: int = 4 * 1024 ** 2) -> str:
+    """ Cheap hash of the file, based on its path, size, modification time
+        and the content of the first and last few MB. """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_size))
+        if stat.st_size > sample_size:
+            f.seek(max(sample_size, stat.st_size - sample_size))
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+def cache_key(path: str, detector_type: str, detector_kwargs: dict) -> str:
+    """ Key based on the movie file, detector type and settings. """
+    settings = json.dumps({'version': CACHE_VERSION, 'detector': detector_type, **detector_kwargs}, sort_keys=True)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(file_fingerprint(path).encode())
+    digest.update(settings.encode())
+    return digest.hexdigest()
+
+
+# landmark frames per detector type
+SOURCES = {
+    'HAND': ['HAND'],
+    'FACE': ['FACE'],
+    'POSE': ['POSE'],
+    'HOLISTIC': ['HAND', 'FACE', 'POSE'],
+}
+
+
+# region packing
+def frames(data: Any) -> List[LandmarkFrame]:
+    """ Landmark frames of detection results, holistic results consist of a hand, face and pose frame. """
+    return data if isinstance(data, list) else [data]
+
+
+def unpack(landmarks: List[np.ndarray], masks: List[np.ndarray], sources: List[str]) -> Any:
+    """ Restores the detection results, the frames are views of the cached arrays. """
+    data = [LandmarkFrame(source, landmark, mask) for landmark, mask, source in zip(landmarks, masks, sources)]
+    return data if len(data) > 1 else data[0]
+
+
+def split(detector_type: str, array: np.ndarray) -> List[np.ndarray]:
+    """ Splits the cached (frames, landmarks, ...) array into the landmark frames of the detector type. """
+    offsets = np.cumsum([LandmarkFrame.size(source) for source in SOURCES[detector_type]])[:-1]
+    return np.split(array, offsets, axis=1)
+# endregion
+
+
+class LandmarkCacheWriter:
+    """ Gathers copies of the detection results and stores them as cache entry. """
+    def __init__(self, detector_type: str):
+        if detector_type not in SOURCES:
+            raise KeyError(f"Unknown detector type: {detector_type}")
+        self.detector_type = detector_type
+        self.landmarks: List[np.ndarray] = []
+        self.masks: List[np.ndarray] = []
+
+    def append(self, data: Any):
+        landmark_frames = frames(data)
+        self.landmarks.append(np.concatenate([landmark_frame.data for landmark_frame in landmark_frames]))
+        self.masks.append(np.concatenate([landmark_frame.mask for landmark_frame in landmark_frames]))
+
+    def extend(self, results: List[Any]):
+        for data in results:
+            self.append(data)
+
+    def save(self, key: str, cache_dir: Path = CACHE_DIR, max_size: int = MAX_CACHE_SIZE):
+        """ Stores the frames as (frames, landmarks, 4) float32 and (frames, landmarks) bool mask array. """
+        if not self.landmarks:
+            return
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        path = cache_dir / f"{key}.npz"
+        np.savez_compressed(
+            path, landmarks=np.stack(self.landmarks), mask=np.stack(self.masks), detector_type=self.detector_type)
+        logging.info(f"Cached {len(self.landmarks)} frames: {path}")
+        evict(cache_dir, max_size)
+
+
+def load(key: str, cache_dir: Path = CACHE_DIR) -> Optional[Tuple[str, np.ndarray, np.ndarray]]:
+    """ Returns the detector type, landmarks and mask of a cache entry or None. """
+    path = cache_dir / f"{key}.npz"
+    if not path.is_file():
+        return None
+
+    try:
+        with np.load(path) as entry:
+            detector_type, landmarks, mask = str(entry['detector_type']), entry['landmarks'], entry['mask']
+    except (OSError, ValueError, KeyError) as err:
+        logging.warning(f"Removing invalid cache entry {path}: {err}")
+        path.unlink()
+        return None
+
+    # mark entry as recently used
+    os.utime(path)
+    return detector_type, landmarks, mask
+
+
+def evict(cache_dir: Path = CACHE_DIR, max_size: int = MAX_CACHE_SIZE):
+    """ Removes the least recently used entries until the cache fits max size. """
+    entries = sorted(cache_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+    while entries and total > max_size:
+        path = entries.pop(0)
+        total -= path.stat().st_size
+        path.unlink()
+        logging.debug(f"Evicted cache entry {path}")
+
+
+class CachedLandmarkInput(cgt_nodes.InputNode):
+    """ Replays cached detection results instead of decoding the movie.
+        Like sampled movie streams, only windows of sample_window frames ending at every
+        sample_step-th frame (starting at sample_offset) may get replayed. """
+    def __init__(self, detector_type: str, landmarks: np.ndarray, mask: np.ndarray,
+                 sample_step: int = 1, sample_window: int = 1, sample_offset: int = 0):
+        self.detector_type = detector_type
+        self.sources = SOURCES[detector_type]
+        self.landmarks = split(detector_type, landmarks)
+        self.masks = split(detector_type, mask)
+        self.step = max(sample_step, 1)
+        self.window = min(max(sample_window, 1), self.step)
+        self.offset = sample_offset % self.step
+        self.idx = 0
+        # position of the last replayed frame in the movie
+        self.position = -1
+
+    def __len__(self):
+        return len(self.masks[0])
+
+    def frame_data(self, idx: int, frame: int = -1) -> Any:
+        data = unpack([landmarks[idx] for landmarks in self.landmarks], [mask[idx] for mask in self.masks], self.sources)
+        for landmark_frame in frames(data):
+            landmark_frame.frame = frame
+        return data
+
+    def next_position(self) -> int:
+        """ Position of the next frame to replay. """
+        if self.window == self.step:
+            return self.idx
+        sample = self.idx + (self.offset - self.idx) % self.step
+        return max(self.idx, sample - self.window + 1)
+
+    def update(self, data, frame):
+        self.idx = self.next_position()
+        if self.idx >= len(self):
+            return None, frame
+
+        data = self.frame_data(self.idx, frame)
+        self.position = self.idx
+        self.idx += 1
+        return data, frame
+
+    def results(self) -> List[Any]:
+        """ Returns all cached frames. """
+        return [self.frame_data(idx, idx) for idx in range(len(self))]
+
+    def close(self):
+        pass
+
+
+def cached_chain(key: str, chain_template: Callable[[], Optional[cgt_nodes.Node]], sample_step: int = 1,
+                 sample_window: int = 1, sample_offset: int = 0,
+                 cache_dir: Path = CACHE_DIR) -> Optional[cgt_nodes.NodeChain]:
+    """ Chain replaying the cached landmarks through the nodes created by chain_template,
+        None if there is no cache entry or template. The template only gets created for existing entries. """
+    entry = load(key, cache_dir)
+    if entry is None:
+        return None
+    template = chain_template()
+    if template is None:
+        return None
+
+    logging.info(f"Replaying cached landmarks: {key}")
+    node_chain = cgt_nodes.NodeChain()
+    node_chain.append(CachedLandmarkInput(
+        *entry, sample_step=sample_step, sample_window=sample_window, sample_offset=sample_offset))
+    node_chain.append(template)
+    return node_chain
@@ -0,0 +1,75 @@
+""" Smoothing and keying of detected movie frames.
+    Movies get detected every frame but only keyed every key step, the frames in between get
+    averaged or run through a landmark filter. The operator keeps the state between the frames,
+    the functions only depend on their arguments. """
+from __future__ import annotations
+from typing import Any, List, Optional, Tuple
+
+from ...cgt_core.cgt_patterns import cgt_nodes
+
+
+def landmark_filter(user, rate: float) -> Optional[cgt_nodes.Node]:
+    """ Temporal filter of the detected landmarks, None if the key steps get averaged. """
+    from ...cgt_core.cgt_calculators_nodes import cgt_landmark_filters
+    if user.landmark_filter == 'one_euro':
+        return cgt_landmark_filters.OneEuroFilter(user.filter_min_cutoff, user.filter_beta, rate=rate)
+    elif user.landmark_filter == 'kalman':
+        return cgt_landmark_filters.KalmanFilter(
+            user.filter_measurement_noise, user.filter_process_noise, rate=rate)
+    elif user.landmark_filter == 'savgol':
+        return cgt_landmark_filters.SavitzkyGolayFilter(user.filter_window, user.filter_polyorder, rate=rate)
+    return None
+
+
+def simple_smoothing(memo, cur):
+    """ Expects a landmark frame or a list of landmark frames (holistic).
+    Averages the landmarks of cur into the memo, returns the memo. """
+    if memo is None:
+        # detection results get reused by the detector
+        return [frame.copy() for frame in cur] if isinstance(cur, list) else cur.copy()
+
+    if isinstance(cur, list):
+        for memo_frame, cur_frame in zip(memo, cur):
+            memo_frame.smooth(cur_frame)
+    else:
+        memo.smooth(cur)
+    return memo
+
+
+def smooth_movie_frame(memo, data, frame: int, key_step: int,
+                       filter_node: Optional[cgt_nodes.Node] = None) -> Tuple[Any, Optional[Tuple[Any, int]]]:
+    """ Smooths the gathered movie frames, returns the memo and the smoothed data and frame every key step.
+        Landmark filters get updated every frame, the filtered frame gets keyed. """
+    if filter_node is not None:
+        memo, _ = filter_node.update(data, frame)
+    else:
+        memo = simple_smoothing(memo, data)
+    if frame % key_step == 0:
+        return None, (memo, frame)
+    return memo, None
+
+
+def next_movie_frame(input_node: cgt_nodes.Node, frame: int, start_frame: int,
+                     sample_frames: bool = False) -> Tuple[Any, int]:
+    """ Reads the next frame of the movie input, returns the data and the frame to key it at.
+        Sampled inputs skip frames, their data gets keyed at the position of the frame in the movie. """
+    data, _ = input_node.update([], frame)
+    if data is not None and sample_frames:
+        frame = start_frame + input_node.position
+    return data, frame
+
+
+def key_movie(results: List[Any], start_frame: int, key_step: int,
+              filter_node: Optional[cgt_nodes.Node] = None) -> List[Tuple[Any, int]]:
+    """ Returns the smoothed (data, frame) of every key step of entirely detected movies. """
+    frames = range(start_frame, start_frame + len(results))
+    if filter_node is not None:
+        results, frames = filter_node.update_batch(results, frames)
+        return [(data, frame) for data, frame in zip(results, frames) if frame % key_step == 0]
+
+    keyed, memo = [], None
+    for data, frame in zip(results, frames):
+        memo, key = smooth_movie_frame(memo, data, frame, key_step)
+        if key is not None:
+            keyed.append(key)
+    return keyed
@@ -0,0 +1,146 @@
+""" Headless movie detection.
+    The movie gets split into frame ranges which are detected in a process pool,
+    the results get merged in frame order. Neither drawing nor Blender is involved,
+    only the final keyframe insertion has to happen in Blender. """
+from __future__ import annotations
+import os
+import copy
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple, Any, Optional, Callable
+
+import cv2
+import numpy as np
+
+from ...cgt_core.cgt_patterns.cgt_executors import detached_main
+from . import cv_stream, mp_detector_node, mp_hand_detector, mp_face_detector, mp_pose_detector, mp_holistic_detector
+
+
+DETECTORS = {
+    'HAND': mp_hand_detector.HandDetector,
+    'FACE': mp_face_detector.FaceDetector,
+    'POSE': mp_pose_detector.PoseDetector,
+    'HOLISTIC': mp_holistic_detector.HolisticDetector,
+}
+
+
+def frame_count(path: str) -> int:
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Cannot open movie {path}")
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    return count
+
+
+def split_frame_ranges(count: int, chunks: int, min_chunk_size: int = 30) -> List[Tuple[int, int]]:
+    """ Splits [0, count) into at most n chunks of similar size. """
+    chunks = max(1, min(chunks, count // min_chunk_size))
+    bounds = np.linspace(0, count, chunks + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def detect(detector: mp_detector_node.DetectorNode, frame: np.ndarray) -> Any:
+    """ Detects features in a rgb frame, returns detected or empty data. """
+    frame.flags.writeable = False
+    mp_res = detector.process(frame)
+    if not detector.contains_features(mp_res):
+        return detector.empty_data()
+    return detector.detected_data(mp_res)
+
+
+def seek(capture: cv2.VideoCapture, frame: int) -> bool:
+    """ Moves the capture to the frame. Some codecs seek to a nearby keyframe instead,
+        the remaining frames get grabbed from there or from the start of the movie. """
+    if frame <= 0:
+        return True
+
+    capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+    position = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+    if not 0 <= position <= frame:
+        logging.debug(f"Seeking frame {frame} landed at {position}, grabbing from the start.")
+        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        position = 0
+
+    for _ in range(frame - position):
+        if not capture.grab():
+            return False
+    return True
+
+
+def merge_chunks(chunks: List[List[Any]], ranges: List[Tuple[int, Optional[int]]], empty: Any) -> List[Any]:
+    """ Concatenates the detection results of the frame ranges. Chunks which read less frames
+        than their range get padded with empty data, so the results stay aligned with the frames. """
+    results = []
+    for chunk, (start, end) in zip(chunks, ranges):
+        results.extend(chunk)
+        if end is not None and len(chunk) < end - start:
+            logging.warning(f"Read {len(chunk)} of the frames [{start}, {end}), padding the missing frames.")
+            results.extend(copy.deepcopy(empty) for _ in range(end - start - len(chunk)))
+    return results
+
+
+def detect_range(path: str, detector_type: str, start: int, end: Optional[int],
+                 detector_kwargs: dict) -> List[Any]:
+    """ Detects the frames [start, end) of a movie, runs in the worker processes.
+        If end is None, the detection runs until the end of the movie. """
+    capture = cv2.VideoCapture(path)
+    if not seek(capture, start):
+        capture.release()
+        return []
+    detector = DETECTORS[detector_type](None, **detector_kwargs)
+
+    results, frame, rgb = [], None, None
+    while end is None or start + len(results) < end:
+        updated, frame = capture.read(frame)
+        if not updated:
+            break
+        rgb = cv_stream.to_rgb(frame, rgb)
+        # the detector reuses its landmark arrays
+        results.append(copy.deepcopy(detect(detector, rgb)))
+
+    detector.close()
+    capture.release()
+    return results
+
+
+def detect_movie(path: str, detector_type: str, detector_kwargs: Optional[dict] = None,
+                 processes: int = 0, chunks_per_process: int = 4,
+                 progress: Optional[Callable[[int, int], None]] = None) -> List[Any]:
+    """ Returns the detection results for every frame of the movie in frame order.
+        processes: worker count, 0 uses the cpu count.
+        progress: gets called with the count of finished and total chunks. """
+    if detector_kwargs is None:
+        detector_kwargs = {}
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+
+    count = frame_count(path)
+    ranges: List[Tuple[int, Optional[int]]] = split_frame_ranges(count, processes * chunks_per_process)
+    # the frame count of the container may be inaccurate, the last chunk reads until the end
+    if ranges:
+        ranges[-1] = (ranges[-1][0], None)
+    else:
+        ranges = [(0, None)]
+    logging.info(f"Detecting {count} frames of {path} in {len(ranges)} chunks using {processes} processes.")
+
+    start = time.time()
+    results: List[Optional[List[Any]]] = [None] * len(ranges)
+    # spawn as forking a process with loaded mediapipe graphs or blender is unsafe
+    context = multiprocessing.get_context('spawn')
+    with detached_main(), ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        futures = {
+            executor.submit(detect_range, path, detector_type, s, e, detector_kwargs): idx
+            for idx, (s, e) in enumerate(ranges)
+        }
+        for finished, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            logging.debug(f"Detected chunk {finished}/{len(ranges)}")
+            if progress is not None:
+                progress(finished, len(ranges))
+
+    logging.info(f"Detected {count} frames in {round(time.time() - start, 3)} sec.")
+    empty = DETECTORS[detector_type](None, **detector_kwargs).empty_data()
+    return merge_chunks(results, ranges, empty)
@@ -4,26 +4,28 @@ from . import cv_stream, mp_detector_node
 
 
 class PoseDetector(mp_detector_node.DetectorNode):
-    def __init__(self, stream, pose_model_complexity: int = 1, min_detection_confidence: float = 0.7):
-        mp_detector_node.DetectorNode.__init__(self, stream)
+    source = 'POSE'
+
+    def __init__(self, stream, pose_model_complexity: int = 1, min_detection_confidence: float = 0.7,
+                 static_image_mode: bool = False, min_tracking_confidence: float = 0.5):
+        mp_detector_node.DetectorNode.__init__(self, stream, static_image_mode, min_tracking_confidence)
         self.pose_model_complexity = pose_model_complexity
         self.min_detection_confidence = min_detection_confidence
         self.solution = mp.solutions.pose
+        self.open()
 
     # https://google.github.io/mediapipe/solutions/pose#python-solution-api
-    def update(self, data, frame):
+    def init_solution(self):
         # BlazePose GHUM 3D
-        with self.solution.Pose(
-                static_image_mode=True,
-                model_complexity=self.pose_model_complexity,
-                min_detection_confidence=self.min_detection_confidence) as mp_lib:
-            return self.exec_detection(mp_lib), frame
+        return self.solution.Pose(
+            static_image_mode=self.static_image_mode,
+            model_complexity=self.pose_model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence)
 
     def detected_data(self, mp_res):
-        return self.cvt2landmark_array(mp_res.pose_world_landmarks)
-
-    def empty_data(self):
-        return []
+        self.write_landmarks(self.landmarks, 'pose', mp_res.pose_world_landmarks)
+        return self.landmarks
 
     def contains_features(self, mp_res):
         if not mp_res.pose_world_landmarks:
@@ -32,7 +34,7 @@ class PoseDetector(mp_detector_node.DetectorNode):
 
     def draw_result(self, s, mp_res, mp_drawings):
         mp_drawings.draw_landmarks(
-            s.frame,
+            s.preview_image,
             mp_res.pose_landmarks,
             self.solution.POSE_CONNECTIONS,
             landmark_drawing_spec=self.drawing_style.get_default_pose_landmarks_style())
@@ -1,6 +1,7 @@
 import bpy
+import sys
 import logging
-from typing import Optional
+from typing import Optional, Any
 from pathlib import Path
 from ..cgt_core.cgt_patterns import cgt_nodes
 
@@ -13,44 +14,70 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
     _timer: Optional[bpy.types.Timer] = None
     node_chain: Optional[cgt_nodes.NodeChain] = None
     frame: int = 1
+    start_frame: int = 1
     key_step: int = 1
-    memo: list
+    sample_frames: bool = False
+    memo: Optional[Any] = None
+    landmark_filter: Optional[cgt_nodes.Node] = None
+    cache_key: Optional[str] = None
+    cache_writer = None
+
+    def get_detector_kwargs(self) -> dict:
+        """ Detector arguments based on the user settings. """
+        kwargs = {
+            'min_detection_confidence': self.user.min_detection_confidence,
+            'static_image_mode': self.user.static_image_mode,
+            'min_tracking_confidence': self.user.min_tracking_confidence,
+        }
 
-    def get_chain(self, stream) -> Optional[cgt_nodes.NodeChain]:
-        from ..cgt_core import cgt_core_chains
-        from .cgt_mp_core import mp_hand_detector, mp_face_detector, mp_pose_detector, mp_holistic_detector
-
-        # create new node chain
-        node_chain = cgt_nodes.NodeChain()
+        if self.user.enum_detection_type == 'HAND':
+            kwargs['hand_model_complexity'] = self.user.hand_model_complexity
+            kwargs['roi_cropping'] = self.user.hand_roi_cropping
+        elif self.user.enum_detection_type == 'POSE':
+            kwargs['pose_model_complexity'] = self.user.pose_model_complexity
+        elif self.user.enum_detection_type == 'FACE':
+            kwargs['refine_face_landmarks'] = self.user.refine_face_landmarks
+        elif self.user.enum_detection_type == 'HOLISTIC':
+            kwargs['model_complexity'] = self.user.holistic_model_complexity
+            kwargs['refine_face_landmarks'] = self.user.refine_face_landmarks
+        return kwargs
 
-        input_node = None
-        chain_template = None
+    def get_chain_template(self) -> Optional[cgt_nodes.Node]:
+        """ Calculator and output nodes for the detection type,
+            the outputs record the take and insert the keyframes once the chain gets closed. """
+        from ..cgt_core import cgt_core_chains
+        templates = {
+            'HAND': cgt_core_chains.HandNodeChain,
+            'POSE': cgt_core_chains.PoseNodeChain,
+            'FACE': cgt_core_chains.FaceNodeChain,
+            'HOLISTIC': cgt_core_chains.HolisticNodeChainGroup,
+        }
+        template = templates.get(self.user.enum_detection_type)
+        if template is None:
+            return None
+        if self.user.enum_detection_type == 'HOLISTIC':
+            return template(self.user.chain_executor, buffered=True)
+        return template(buffered=True)
 
-        logging.debug(f"{self.user.enum_detection_type}")
-        if self.user.enum_detection_type == 'HAND':
-            input_node = mp_hand_detector.HandDetector(
-                stream, self.user.hand_model_complexity, self.user.min_detection_confidence
-            )
-            chain_template = cgt_core_chains.HandNodeChain()
+    def use_pipeline(self) -> bool:
+        """ Webcam detection may run in worker threads, movies get smoothed and keyed per frame. """
+        return self.user.detection_input_type == 'stream' and self.user.execution_mode == 'pipelined'
 
-        elif self.user.enum_detection_type == 'POSE':
-            input_node = mp_pose_detector.PoseDetector(
-                stream, self.user.pose_model_complexity, self.user.min_detection_confidence
-            )
-            chain_template = cgt_core_chains.PoseNodeChain()
+    def get_chain(self, stream) -> Optional[cgt_nodes.NodeChain]:
+        from .cgt_mp_core import mp_offline_engine
 
-        elif self.user.enum_detection_type == 'FACE':
-            input_node = mp_face_detector.FaceDetector(
-                stream, self.user.refine_face_landmarks, self.user.min_detection_confidence
-            )
-            chain_template = cgt_core_chains.FaceNodeChain()
+        # create new node chain
+        if self.use_pipeline():
+            node_chain = cgt_nodes.PipelinedNodeChain(frame_step=self.key_step)
+        else:
+            node_chain = cgt_nodes.NodeChain()
 
-        elif self.user.enum_detection_type == 'HOLISTIC':
-            input_node = mp_holistic_detector.HolisticDetector(
-                stream, self.user.holistic_model_complexity,
-                self.user.min_detection_confidence, self.user.refine_face_landmarks
-            )
-            chain_template = cgt_core_chains.HolisticNodeChainGroup()
+        logging.debug(f"{self.user.enum_detection_type}")
+        input_node = None
+        detector = mp_offline_engine.DETECTORS.get(self.user.enum_detection_type)
+        if detector is not None:
+            input_node = detector(stream, **self.get_detector_kwargs())
+        chain_template = self.get_chain_template()
 
         if input_node is None or chain_template is None:
             self.report(
@@ -58,16 +85,44 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
             return None
 
         node_chain.append(input_node)
+        if self.landmark_filter is not None and self.user.detection_input_type == 'stream':
+            node_chain.append(self.landmark_filter)
         node_chain.append(chain_template)
 
         logging.info(f"{node_chain}")
         return node_chain
 
+    def get_cache_key(self) -> Optional[str]:
+        """ Landmark cache key of the movie and detector settings, None if caching isn't used. """
+        from .cgt_mp_core import mp_landmark_cache
+        if self.user.detection_input_type != 'movie' or not self.user.use_landmark_cache:
+            return None
+
+        mov_path = bpy.path.abspath(self.user.mov_data_path)
+        if not Path(mov_path).is_file():
+            return None
+        return mp_landmark_cache.cache_key(
+            str(mov_path), self.user.enum_detection_type, self.get_detector_kwargs())
+
+    def get_cached_chain(self) -> Optional[cgt_nodes.NodeChain]:
+        """ Chain replaying cached landmarks, None if there is no cache entry.
+            Sampled movies only replay the frames around keyed frames. """
+        from .cgt_mp_core import mp_landmark_cache
+        sample_step = self.key_step if self.sample_frames else 1
+        return mp_landmark_cache.cached_chain(
+            self.cache_key, self.get_chain_template, sample_step=sample_step,
+            sample_window=self.user.sample_window, sample_offset=-self.start_frame)
+
+    def save_cache(self):
+        """ Stores the recorded landmarks once the whole movie got detected. """
+        from .cgt_mp_core import mp_landmark_cache
+        if self.cache_writer is None:
+            return
+        self.cache_writer.save(self.cache_key, max_size=self.user.landmark_cache_size * 1024 ** 2)
+        self.cache_writer = None
+
     def get_stream(self):
         from .cgt_mp_core import cv_stream
-        self.key_step = self.user.key_frame_step
-
-        self.frame = bpy.context.scene.frame_current
         if self.user.detection_input_type == 'movie':
             mov_path = bpy.path.abspath(self.user.mov_data_path)
             logging.info(f"Path to mov: {mov_path}")
@@ -76,7 +131,15 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
                 logging.error(f"GIVEN PATH IS NOT VALID {mov_path}")
                 return {'FINISHED'}
 
-            stream = cv_stream.Stream(str(mov_path), "Movie Detection")
+            # decode only the frames around keyed frames (frame % key_step == 0)
+            sample_step = self.key_step if self.sample_frames else 1
+            stream = cv_stream.Stream(
+                str(mov_path), "Movie Detection",
+                threaded=self.user.threaded_capture, policy=cv_stream.BLOCK,
+                preview=self.user.preview_mode, preview_rate=self.user.preview_rate,
+                sample_step=sample_step, sample_window=self.user.sample_window,
+                sample_offset=-self.start_frame
+            )
 
         else:
             camera_index = self.user.webcam_input_device
@@ -88,9 +151,17 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
             }
             backend = int(self.user.enum_stream_type)
 
+            preview = self.user.preview_mode
+            if self.use_pipeline() and sys.platform == 'darwin':
+                # cv2 windows can only be drawn from the main thread on macOS
+                logging.warning("Preview isn't supported in pipelined execution on macOS.")
+                preview = cv_stream.PREVIEW_NONE
+
             stream = cv_stream.Stream(
                 capture_input=camera_index, backend=backend,
                 width=dimensions[dim][0], height=dimensions[dim][1],
+                threaded=self.user.threaded_capture, policy=self.user.capture_buffer_policy,
+                preview=preview, preview_rate=self.user.preview_rate
             )
         return stream
 
@@ -107,9 +178,29 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
         else:
             self.user.modal_active = True
 
-        # init stream and chain
-        stream = self.get_stream()
-        self.node_chain = self.get_chain(stream)
+        self.key_step = self.user.key_frame_step
+        self.frame = context.scene.frame_current
+        self.start_frame = self.frame
+        self.sample_frames = self.user.skip_unkeyed_frames and self.key_step > 1
+        self.cache_key = self.get_cache_key()
+        self.cache_writer = None
+        from .cgt_mp_core import mp_movie_keying
+        rate = context.scene.render.fps / context.scene.render.fps_base
+        self.landmark_filter = mp_movie_keying.landmark_filter(self.user, rate)
+
+        if self.user.detection_input_type == 'movie' and self.user.offline_detection:
+            return self.execute_offline(context)
+
+        # init stream and chain, movies may be replayed from the landmark cache
+        self.node_chain = self.get_cached_chain() if self.cache_key else None
+        if self.node_chain is None:
+            stream = self.get_stream()
+            self.node_chain = self.get_chain(stream)
+            # only entirely detected movies get cached
+            if self.cache_key and not self.sample_frames:
+                from .cgt_mp_core import mp_landmark_cache
+                self.cache_writer = mp_landmark_cache.LandmarkCacheWriter(self.user.enum_detection_type)
+
         if self.node_chain is None:
             self.user.modal_active = False
             return {'FINISHED'}
@@ -120,75 +211,85 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
         context.window_manager.modal_handler_add(self)
 
         # memo skipped frames
-        self.memo = []
+        self.memo = None
         self.report(
             {'INFO'}, f"Running {self.user.enum_detection_type} as modal.")
         return {'RUNNING_MODAL'}
 
+    def execute_offline(self, context):
+        """ Detects the movie in background processes and keys the results afterwards. """
+        from .cgt_mp_core import mp_offline_engine, mp_landmark_cache, mp_movie_keying
+        mov_path = bpy.path.abspath(self.user.mov_data_path)
+        if not Path(mov_path).is_file():
+            self.user.modal_active = False
+            self.report({'ERROR'}, f"Given path is not valid {mov_path}")
+            return {'FINISHED'}
+
+        entry = mp_landmark_cache.load(self.cache_key) if self.cache_key else None
+        if entry is not None:
+            logging.info(f"Replaying cached landmarks: {self.cache_key}")
+            results = mp_landmark_cache.CachedLandmarkInput(*entry).results()
+        else:
+            # blender is blocked meanwhile, report the progress of the detected chunks
+            wm = context.window_manager
+            wm.progress_begin(0, 100)
+            try:
+                results = mp_offline_engine.detect_movie(
+                    str(mov_path), self.user.enum_detection_type,
+                    self.get_detector_kwargs(), self.user.detection_processes,
+                    progress=lambda finished, total: wm.progress_update(int(100 * finished / total))
+                )
+            finally:
+                wm.progress_end()
+            if self.cache_key:
+                self.cache_writer = mp_landmark_cache.LandmarkCacheWriter(self.user.enum_detection_type)
+                self.cache_writer.extend(results)
+                self.save_cache()
+
+        # filter or smooth every key step and push the keyed frames at once
+        keyed = mp_movie_keying.key_movie(results, self.frame, self.key_step, self.landmark_filter)
+        chain_template = self.get_chain_template()
+        if keyed:
+            data, frames = zip(*keyed)
+            chain_template.update_batch(data, frames)
+        chain_template.close()
+
+        self.user.modal_active = False
+        self.report({'INFO'}, f"Detected {len(results)} frames.")
+        return {'FINISHED'}
+
     @classmethod
     def poll(cls, context):
         return context.mode in {'OBJECT', 'POSE'}
 
-    @staticmethod
-    def simple_smoothing(memo, cur):
-        """ Expects list with sub-lists containing [int, [float, float, float]].
-        Smooths the float part of the sub-lists. """
-        def smooth_by_add_divide(x, y):
-            for i, *_ in enumerate(zip(x, y)):
-                x[i] += y[i]
-                x[i] /= 2
-
-        def addable(x, y):
-            # check if [int, [float, float float]]
-            if not isinstance(x, list) or not isinstance(y, list):
-                print("CATCHED NOT LIST ERR")
-                return False
-
-            if not len(x) == 2 or not len(y) == 2:
-                return False
-
-            if not len(x[1]) == 3 or not len(y[1]) == 3:
-                return False
-
-            smooth_by_add_divide(x[1], y[1])
-            return True
-
-        def smooth_memo_contents(x, y):
-            # checks if addable contents, else splits into sub-arrays
-            # and retries. y may get added to x, if x is empty.
-            if not isinstance(y, list):
-                return
-            if not isinstance(x, list):
-                x = y
-            if len(x) == 0 and len(y) != 0:
-                x += y
-
-            for l1, l2 in zip(x, y):
-                if not addable(l1, l2):
-                    smooth_memo_contents(l1, l2)
-
-        smooth_memo_contents(memo, cur)
-        return memo
+    def key_movie_frame(self, nodes, data):
+        """ Smooths the gathered movie frames and pushes them to the nodes every key step. """
+        from .cgt_mp_core import mp_movie_keying
+        self.memo, keyed = mp_movie_keying.smooth_movie_frame(
+            self.memo, data, self.frame, self.key_step, self.landmark_filter)
+        self.frame += 1
+        if keyed is not None:
+            for node in nodes:
+                node.update(*keyed)
 
     def modal(self, context, event):
         """ Run detection as modal operation, finish with 'Q', 'ESC' or 'RIGHT MOUSE'. """
         assert self.node_chain is not None
         if event.type == "TIMER" and self.user.modal_active:
             if self.user.detection_input_type == 'movie':
-                # get data
-                data, _frame = self.node_chain.nodes[0].update([], self.frame)
+                # get data, sampled movies get keyed at the position of the frame in the movie
+                from .cgt_mp_core import mp_movie_keying
+                data, self.frame = mp_movie_keying.next_movie_frame(
+                    self.node_chain.nodes[0], self.frame, self.start_frame, self.sample_frames)
                 if data is None:
+                    self.save_cache()
                     return self.cancel(context)
 
-                # smooth gathered data
-                self.simple_smoothing(self.memo, data)
-                if self.frame % self.key_step == 0:
-                    for node in self.node_chain.nodes[1:]:
-                        node.update(self.memo, self.frame)
-                    self.memo.clear()
-
-                self.frame += 1
+                if self.cache_writer is not None:
+                    self.cache_writer.append(data)
+                self.key_movie_frame(self.node_chain.nodes[1:], data)
             else:
+                # pipelined chains key the frames which finished meanwhile
                 data, _ = self.node_chain.update([], self.frame)
                 if data is None:
                     return self.cancel(context)
@@ -202,6 +303,8 @@ class WM_CGT_MP_modal_detection_operator(bpy.types.Operator):
     def cancel(self, context):
         """ Upon finishing detection clear the handlers. """
         self.user.modal_active = False  # noqa
+        # release the mediapipe graph of the input node and stops workers
+        self.node_chain.close()
         del self.node_chain
         wm = context.window_manager
         if self._timer:
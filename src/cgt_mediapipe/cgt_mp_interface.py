@@ -19,6 +19,16 @@ class CGT_PT_MP_Detection(cgt_core_panel.DefaultPanel, bpy.types.Panel):
         layout.row().prop(user, "mov_data_path")
         layout.row().prop(user, "key_frame_step")
         layout.row().prop(user, "enum_detection_type")
+        layout.row().prop(user, "offline_detection")
+        if user.offline_detection:
+            layout.row().prop(user, "detection_processes")
+        else:
+            layout.row().prop(user, "skip_unkeyed_frames")
+            if user.skip_unkeyed_frames:
+                layout.row().prop(user, "sample_window")
+        layout.row().prop(user, "use_landmark_cache")
+        if user.use_landmark_cache:
+            layout.row().prop(user, "landmark_cache_size")
         if user.modal_active:
             layout.row().operator("wm.cgt_feature_detection_operator", text="Stop Detection", icon='CANCEL')
         else:
@@ -57,6 +67,7 @@ class CGT_PT_MP_DetectorProperties(cgt_core_panel.DefaultPanel, bpy.types.Panel)
 
         if user.enum_detection_type == 'HAND':
             layout.row().prop(user, "hand_model_complexity")
+            layout.row().prop(user, "hand_roi_cropping")
         elif user.enum_detection_type == 'FACE':
             # layout.row().prop(user, "refine_face_landmarks")
             pass
@@ -64,8 +75,33 @@ class CGT_PT_MP_DetectorProperties(cgt_core_panel.DefaultPanel, bpy.types.Panel)
             layout.row().prop(user, "pose_model_complexity")
         elif user.enum_detection_type == 'HOLISTIC':
             layout.row().prop(user, "holistic_model_complexity")
+            layout.row().prop(user, "chain_executor")
 
         layout.row().prop(user, "min_detection_confidence", slider=True)
+        layout.row().prop(user, "static_image_mode")
+        if not user.static_image_mode:
+            layout.row().prop(user, "min_tracking_confidence", slider=True)
+
+        layout.row().prop(user, "threaded_capture")
+        if user.threaded_capture and user.detection_input_type == 'stream':
+            layout.row().prop(user, "capture_buffer_policy")
+        if user.detection_input_type == 'stream':
+            layout.row().prop(user, "execution_mode")
+
+        layout.row().prop(user, "landmark_filter")
+        if user.landmark_filter == 'one_euro':
+            layout.row().prop(user, "filter_min_cutoff")
+            layout.row().prop(user, "filter_beta")
+        elif user.landmark_filter == 'kalman':
+            layout.row().prop(user, "filter_measurement_noise")
+            layout.row().prop(user, "filter_process_noise")
+        elif user.landmark_filter == 'savgol':
+            layout.row().prop(user, "filter_window")
+            layout.row().prop(user, "filter_polyorder")
+
+        layout.row().prop(user, "preview_mode")
+        if user.preview_mode == 'throttled':
+            layout.row().prop(user, "preview_rate")
 
 
 class CGT_PT_MP_Warning(cgt_core_panel.DefaultPanel, bpy.types.Panel):
@@ -29,6 +29,11 @@ class MP_PG_Properties(bpy.types.PropertyGroup):
                     "latency generally go up with the model complexity. "
                     "Default to 1.")
 
+    hand_roi_cropping: bpy.props.BoolProperty(
+        name="Hand ROI Cropping", default=False,
+        description="Detect hands in a crop around the hands of the previous frame, "
+                    "falls back to the full frame if the hands got lost.")
+
     # downloading during session seem inappropriate (therefor max 1)
     pose_model_complexity: bpy.props.IntProperty(
         name="Model Complexity", default=1, min=0, max=1,
@@ -48,6 +53,18 @@ class MP_PG_Properties(bpy.types.PropertyGroup):
         name="Min Tracking Confidence", default=0.5, min=0.0, max=1.0,
         description="Minimum confidence value ([0.0, 1.0]) from the detection "
                     "model for the detection to be considered successful. Default to 0.5.")
+
+    static_image_mode: bpy.props.BoolProperty(
+        name="Static Image Mode", default=False,
+        description="Whether to treat the input images as a batch of static and possibly unrelated "
+                    "images, or a video stream. If disabled, landmarks get tracked across frames and "
+                    "the detection model only runs when the tracking gets lost. Default to false.")
+
+    min_tracking_confidence: bpy.props.FloatProperty(
+        name="Min Landmark Tracking Confidence", default=0.5, min=0.0, max=1.0,
+        description="Minimum confidence value ([0.0, 1.0]) from the landmark-tracking model "
+                    "for the landmarks to be considered tracked successfully. Ignored if "
+                    "static image mode is enabled. Default to 0.5.")
     # endregion
 
     # region stream props
@@ -88,6 +105,122 @@ class MP_PG_Properties(bpy.types.PropertyGroup):
         )
     )
 
+    skip_unkeyed_frames: bpy.props.BoolProperty(
+        name="Skip Unkeyed Frames", default=False,
+        description="Only decode and detect frames which get keyed, "
+                    "detection time scales with the key step.")
+
+    sample_window: bpy.props.IntProperty(
+        name="Smoothing Window", default=1, min=1, max=120,
+        description="Number of frames up to each keyed frame which get detected and averaged "
+                    "while skipping unkeyed frames.")
+
+    offline_detection: bpy.props.BoolProperty(
+        name="Headless Detection", default=False,
+        description="Detect the movie in background processes without preview. "
+                    "Keyframes get inserted when the detection finished. (Freezes Blender)")
+
+    detection_processes: bpy.props.IntProperty(
+        name="Processes", default=0, min=0, max=64,
+        description="Number of processes used for headless detection, 0 uses all cpu cores.")
+
+    use_landmark_cache: bpy.props.BoolProperty(
+        name="Landmark Cache", default=True,
+        description="Store the detection results of movies on disk and replay them "
+                    "when the movie gets detected again using the same settings.")
+
+    landmark_cache_size: bpy.props.IntProperty(
+        name="Cache Size (MB)", default=1024, min=16,
+        description="Maximum disk space of the landmark cache, "
+                    "least recently used entries get removed first.")
+
+    threaded_capture: bpy.props.BoolProperty(
+        name="Threaded Capture", default=False,
+        description="Capture frames in a background thread so the camera cadence "
+                    "doesn't depend on Blenders UI loop.")
+
+    capture_buffer_policy: bpy.props.EnumProperty(
+        name="Buffer Policy",
+        description="Frame handling of the threaded webcam capture. "
+                    "Movies always process every frame.",
+        items=(
+            ("drop", "Newest Frame", "Drops older frames and detects the newest frame"),
+            ("block", "Every Frame", "Waits until every captured frame got detected"),
+        )
+    )
+
+    execution_mode: bpy.props.EnumProperty(
+        name="Execution",
+        description="Execution of the webcam detection nodes",
+        items=(
+            ("sequential", "Sequential", "Captures, detects, calculates and keys every frame in Blenders UI loop"),
+            ("pipelined", "Pipelined", "Captures, detects and calculates consecutive frames in parallel worker "
+                                       "threads, only keyframing runs in Blenders UI loop"),
+        )
+    )
+
+    chain_executor: bpy.props.EnumProperty(
+        name="Calculators",
+        description="Evaluation of the hand, face and pose calculators in holistic detection",
+        items=(
+            ("sequential", "Sequential", "Calculates hand, face and pose one after another"),
+            ("thread", "Threads", "Calculates hand, face and pose in parallel threads"),
+            ("process", "Processes", "Calculates hand, face and pose in parallel worker processes"),
+        )
+    )
+
+    landmark_filter: bpy.props.EnumProperty(
+        name="Filter",
+        description="Temporal filter of the detected landmarks",
+        items=(
+            ("average", "Average", "Averages the landmarks of the frames within a key step"),
+            ("one_euro", "One Euro", "Low pass filter which adapts to the speed of the landmarks"),
+            ("kalman", "Kalman", "Constant velocity kalman filter"),
+            ("savgol", "Savitzky-Golay", "Polynomial fit of the recent frames, "
+                                         "headless detection smooths the whole movie"),
+        )
+    )
+
+    filter_min_cutoff: bpy.props.FloatProperty(
+        name="Min Cutoff (Hz)", default=1.0, min=0.01, max=30.0,
+        description="Cutoff frequency of resting landmarks, lower values reduce jitter.")
+
+    filter_beta: bpy.props.FloatProperty(
+        name="Speed Coefficient", default=10.0, min=0.0, max=1000.0,
+        description="Increase of the cutoff frequency with the speed of the landmarks, "
+                    "higher values reduce lag.")
+
+    filter_measurement_noise: bpy.props.FloatProperty(
+        name="Measurement Noise", default=0.01, min=0.0001, max=1.0, precision=4,
+        description="Standard deviation of the detected landmarks.")
+
+    filter_process_noise: bpy.props.FloatProperty(
+        name="Process Noise", default=5.0, min=0.001, max=1000.0,
+        description="Standard deviation of the landmarks acceleration, higher values reduce lag.")
+
+    filter_window: bpy.props.IntProperty(
+        name="Window", default=9, min=3, max=61,
+        description="Frames fitted by the polynomial, even values get increased by one.")
+
+    filter_polyorder: bpy.props.IntProperty(
+        name="Polynomial Order", default=2, min=1, max=5,
+        description="Order of the polynomial, has to be smaller than the window.")
+
+    preview_mode: bpy.props.EnumProperty(
+        name="Preview",
+        description="Drawing of the detection preview window. "
+                    "Without preview, stop the detection using 'Q', 'ESC' or the stop button in Blender.",
+        items=(
+            ("draw", "Every Frame", "Draws the detection results on every frame"),
+            ("throttled", "Throttled", "Draws the detection results at the preview rate"),
+            ("none", "None", "Doesn't open a preview window"),
+        )
+    )
+
+    preview_rate: bpy.props.IntProperty(
+        name="Preview Rate (Hz)", default=10, min=1, max=60,
+        description="Maximum preview updates per second while throttled.")
+
     webcam_input_device: bpy.props.IntProperty(
         name="Webcam Device Slot",
         description="Select Webcam device.",
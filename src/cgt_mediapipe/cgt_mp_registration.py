@@ -19,8 +19,30 @@ MP_ATTRS = {
     "enum_detection_type": "HAND",
     "enum_stream_dim": "sd",
     "enum_stream_type": "0",
+    "skip_unkeyed_frames": False,
+    "sample_window": 1,
+    "offline_detection": False,
+    "detection_processes": 0,
+    "use_landmark_cache": True,
+    "landmark_cache_size": 1024,
+    "threaded_capture": False,
+    "capture_buffer_policy": "drop",
+    "execution_mode": "sequential",
+    "chain_executor": "sequential",
+    "landmark_filter": "average",
+    "filter_min_cutoff": 1.0,
+    "filter_beta": 10.0,
+    "filter_measurement_noise": 0.01,
+    "filter_process_noise": 5.0,
+    "filter_window": 9,
+    "filter_polyorder": 2,
+    "preview_mode": "draw",
+    "preview_rate": 10,
     "min_detection_confidence": 0.5,
+    "static_image_mode": False,
+    "min_tracking_confidence": 0.5,
     "hand_model_complexity": 1,
+    "hand_roi_cropping": False,
     "pose_model_complexity": 1,
     "holistic_model_complexity": 1,
     "refine_face_landmarks": False
@@ -1,7 +1,8 @@
-from typing import Optional
+from typing import Optional, Iterable, Iterator, Tuple, Any
 from ..cgt_core.cgt_core_chains import (
     FaceNodeChain, PoseNodeChain, HandNodeChain, HolisticNodeChainGroup
 )
+from ..cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
 from .BlendPyNet.b3dnet.src.b3dnet.connection import CACHE
 
 
@@ -19,6 +20,41 @@ HAND_FN_ID = "PERSISTENT_FN_HAND"
 HOLI_FN_ID = "PERSISTENT_FN_HOLISTIC"
 
 
+def holistic_landmarks(data: list, frame: int) -> list:
+    pose, face, lhand, rhand = data
+    return [LandmarkFrame.from_parts('HAND', frame, left=lhand, right=rhand),
+            LandmarkFrame.from_parts('FACE', frame, face=face),
+            LandmarkFrame.from_parts('POSE', frame, pose=pose)]
+
+
+def pose_landmarks(data: list, frame: int) -> LandmarkFrame:
+    return LandmarkFrame.from_parts('POSE', frame, pose=data)
+
+
+def hand_landmarks(data: list, frame: int) -> LandmarkFrame:
+    left, right = data
+    return LandmarkFrame.from_parts('HAND', frame, left=left, right=right)
+
+
+def face_landmarks(data: list, frame: int) -> LandmarkFrame:
+    return LandmarkFrame.from_parts('FACE', frame, face=data)
+
+
+# landmark conversion and node chain per detection type
+CHAINS = {
+    'HOLISTIC': (holistic_landmarks, HolisticNodeChainGroup),
+    'POSE': (pose_landmarks, PoseNodeChain),
+    'HAND': (hand_landmarks, HandNodeChain),
+    'FACE': (face_landmarks, FaceNodeChain),
+}
+
+
+def stream_messages(detection_type: str, messages: Iterable[Tuple[Optional[list], int]]) -> Iterator[Tuple[Any, int]]:
+    """ Lazily processes (data, frame) messages, for example recorded sessions, using a new node chain. """
+    to_landmarks, chain = CHAINS[detection_type]
+    return chain().stream((to_landmarks(data, frame), frame) for data, frame in messages if data)
+
+
 def process_holisitic(data: Optional[list], frame: int):
     # Input -> data: List[List[pose], List[face], List[l_hand], List[r_hand]], int
     if not data:
@@ -27,10 +63,7 @@ def process_holisitic(data: Optional[list], frame: int):
     if CACHE.get(HOLI_CHAIN_ID) is None:
         CACHE[HOLI_CHAIN_ID] = HolisticNodeChainGroup()
 
-    data = [[[i, p] for i, p in enumerate(model)] for model in data]
-    pose, face, lhand, rhand = data
-    hands = [[lhand], [rhand]]
-    CACHE[HOLI_CHAIN_ID].update([hands, [face], pose], frame)
+    CACHE[HOLI_CHAIN_ID].update(holistic_landmarks(data, frame), frame)
     return True
 
 
@@ -42,8 +75,7 @@ def process_pose(data: Optional[list], frame: int):
     if CACHE.get(POSE_CHAIN_ID) is None:
         CACHE[POSE_CHAIN_ID] = PoseNodeChain()
 
-    data = [[i, p] for i, p in enumerate(data)]
-    CACHE[POSE_CHAIN_ID].update(data, frame)
+    CACHE[POSE_CHAIN_ID].update(pose_landmarks(data, frame), frame)
     return True
 
 
@@ -55,8 +87,7 @@ def process_hand(data: Optional[list], frame: int):
     if CACHE.get(HAND_CHAIN_ID) is None:
         CACHE[HAND_CHAIN_ID] = HandNodeChain()
 
-    data = [[[[i, p] for i, p in enumerate(hand)]] for hand in data]
-    CACHE[HAND_CHAIN_ID].update(data, frame)
+    CACHE[HAND_CHAIN_ID].update(hand_landmarks(data, frame), frame)
     return True
 
 
@@ -68,6 +99,5 @@ def process_face(data: Optional[list], frame: int):
     if CACHE.get(FACE_CHAIN_ID) is None:
         CACHE[FACE_CHAIN_ID] = FaceNodeChain()
 
-    data = [[i, p] for i, p in enumerate(data)]
-    CACHE[FACE_CHAIN_ID].update([data], frame)
+    CACHE[FACE_CHAIN_ID].update(face_landmarks(data, frame), frame)
     return True
@@ -0,0 +1,100 @@
+from ..cgt_core.cgt_calculators_nodes import mp_calc_pose_rot, mp_calc_hand_rot, cgt_math
+from ..cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
+from pathlib import Path
+import unittest
+import numpy as np
+
+
+class TestCalculators(unittest.TestCase):
+    def test_duplicated_frames(self):
+        rng = np.random.default_rng(0)
+        pose = LandmarkFrame.from_parts('POSE', pose=rng.normal(size=(33, 3)))
+        calculator = mp_calc_pose_rot.PoseRotationCalculator()
+        self.assertTrue(calculator.update(pose, 0)[0][1])
+        self.assertEqual(calculator.update(pose, 1)[0], [[], [], []])
+        # fingerprints are stored per instance
+        self.assertTrue(mp_calc_pose_rot.PoseRotationCalculator().update(pose, 1)[0][1])
+
+        hands = LandmarkFrame.from_parts('HAND', left=rng.normal(size=(21, 3)), right=rng.normal(size=(21, 3)))
+        calculator = mp_calc_hand_rot.HandRotationCalculator()
+        self.assertTrue(all(calculator.update(hands, 0)[0][0]))
+        hands.rows('right')[:] = rng.normal(size=(21, 4))
+        locations, _, _ = calculator.update(hands, 1)[0]
+        self.assertEqual((len(locations[0]), len(locations[1])), (0, 21))
+
+    def test_prev_rotation(self):
+        quart = np.array([0.0, 1.0, 0.0, 0.0])
+        calculator = mp_calc_pose_rot.PoseRotationCalculator()
+        calculator.try_get_eulers(np.array([quart, quart]), [2, 5])
+        calculator.set_prev_rotation(2, [2.5 * np.pi, 0, 0])
+        # eulers stay close to the previous rotation of their slot
+        eulers = calculator.try_get_eulers(np.array([quart, quart]), [2, 5])
+        np.testing.assert_allclose(eulers[:, 0], [3 * np.pi, np.pi])
+        np.testing.assert_allclose(calculator.prev_rotation[[2, 5]], eulers)
+        # rotations are stored per instance
+        self.assertIsNone(mp_calc_pose_rot.PoseRotationCalculator().get_prev_rotation(2))
+
+    def test_z_angles(self):
+        # hand landmarks and z-angles of the previous implementation, which sampled
+        # 20 points on a circle around the mcp to find the closest point to the pip
+        fixture = np.load(Path(__file__).parent / 'data' / 'hand_z_angles.npz')
+        calculator = mp_calc_hand_rot.HandRotationCalculator()
+        hands = np.array([calculator.set_global_origin(hand) for hand in fixture['landmarks']])
+        z_angles, expected = calculator.get_z_angles(hands), fixture['z_angles']
+
+        np.testing.assert_allclose(z_angles[:, 1], expected[:, 1], atol=1e-9)
+        # the sampled angle deviates by up to half a circle step of ~19 degrees and never undershoots
+        fingers = [5, 9, 13, 17]
+        np.testing.assert_allclose(z_angles[:, fingers], expected[:, fingers], atol=np.pi / 19)
+        np.testing.assert_array_equal(np.sign(z_angles[:, fingers]), np.sign(expected[:, fingers]))
+        self.assertTrue(np.all(np.abs(z_angles[:, fingers]) <= np.abs(expected[:, fingers]) + 1e-9))
+        self.assertFalse(np.delete(z_angles, [1] + fingers, axis=1).any())
+
+    def test_hand_batch(self):
+        fixture = np.load(Path(__file__).parent / 'data' / 'hand_z_angles.npz')['landmarks']
+        frames = [LandmarkFrame.from_parts('HAND', idx, left=hand, right=None if idx % 3 else fixture[-idx])
+                  for idx, hand in enumerate(fixture[:12])]
+        calculator = mp_calc_hand_rot.HandRotationCalculator()
+        expected = [calculator.update(frame, idx)[0] for idx, frame in enumerate(frames)]
+        results, _ = mp_calc_hand_rot.HandRotationCalculator().update_batch(frames, range(12))
+
+        for (locations, angles, _), (expected_locations, expected_angles, _) in zip(results, expected):
+            for hand, expected_hand in zip(locations + angles, expected_locations + expected_angles):
+                self.assertEqual([idx for idx, _ in hand], [idx for idx, _ in expected_hand])
+                np.testing.assert_allclose([value for _, value in hand], [value for _, value in expected_hand])
+        self.assertEqual(results[1][0][1], [])
+
+    def test_pose_batch(self):
+        rng = np.random.default_rng(0)
+        poses = np.cumsum(rng.normal(0, .05, (12, 33, 3)), axis=0) + rng.normal(size=(33, 3))
+        frames = [LandmarkFrame('POSE', frame=idx) if idx == 5 else LandmarkFrame.from_parts('POSE', idx, pose=pose)
+                  for idx, pose in enumerate(poses)]
+        calculator = mp_calc_pose_rot.PoseRotationCalculator()
+        expected = [calculator.update(frame, idx)[0] for idx, frame in enumerate(frames)]
+        results, _ = mp_calc_pose_rot.PoseRotationCalculator().update_batch(frames, range(12))
+
+        self.assertEqual(results[5], [[], [], []])
+        for (locations, rotations, _), (expected_locations, expected_rotations, _) in zip(results, expected):
+            for data, expected_data in [(locations, expected_locations), (rotations, expected_rotations)]:
+                self.assertEqual([idx for idx, _ in data], [idx for idx, _ in expected_data])
+                # streams calculate single frames using mathutils (float32) inside of Blender
+                np.testing.assert_allclose([value for _, value in data], [value for _, value in expected_data],
+                                           atol=1e-5)
+        self.assertEqual([idx for idx, _ in results[0][1]], mp_calc_pose_rot.PoseRotationCalculator.rotation_targets)
+
+    @unittest.skipIf(cgt_math.Euler is None, "mathutils is only available inside of Blender")
+    def test_pose_frame_rotations(self):
+        rng = np.random.default_rng(1)
+        poses = np.cumsum(rng.normal(0, .2, (24, 33, 3)), axis=0) + rng.normal(size=(33, 3))
+        locations = mp_calc_pose_rot.PoseRotationCalculator().prepare_landmarks(poses)
+        # single frames use mathutils, batches the vectorized numpy implementation
+        calculator, batch_calculator = mp_calc_pose_rot.PoseRotationCalculator(), mp_calc_pose_rot.PoseRotationCalculator()
+        rotations = [calculator.frame_rotations(frame_locations) for frame_locations in locations]
+        expected = batch_calculator.calculate_rotations(locations)
+        np.testing.assert_allclose(rotations, expected, atol=1e-5)
+        # both keep the last eulers to stay compatible with the next frame
+        np.testing.assert_allclose(calculator.prev_rotation, batch_calculator.prev_rotation, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+from ..cgt_mediapipe.cgt_mp_core import mp_landmark_cache
+import unittest
+import tempfile
+import os
+
+
+class TestLandmarkCache(unittest.TestCase):
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'movie.mp4')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * 1024)
+
+            key = mp_landmark_cache.cache_key(path, 'POSE', {'model_complexity': 1})
+            self.assertEqual(key, mp_landmark_cache.cache_key(path, 'POSE', {'model_complexity': 1}))
+            self.assertNotEqual(key, mp_landmark_cache.cache_key(path, 'POSE', {'model_complexity': 0}))
+
+            # only the start and end of large files get read
+            with open(path, 'wb') as f:
+                f.write(b'\0' * 1024 * 3)
+            stat = os.stat(path)
+            fingerprint = mp_landmark_cache.file_fingerprint(path, sample_size=1024)
+            self.assertNotEqual(key, mp_landmark_cache.cache_key(path, 'POSE', {'model_complexity': 1}))
+
+            with open(path, 'r+b') as f:
+                f.seek(1500)
+                f.write(b'\1')
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(fingerprint, mp_landmark_cache.file_fingerprint(path, sample_size=1024))
+
+            with open(path, 'r+b') as f:
+                f.write(b'\1')
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertNotEqual(fingerprint, mp_landmark_cache.file_fingerprint(path, sample_size=1024))
+
+
+if __name__ == '__main__':
+    unittest.main()
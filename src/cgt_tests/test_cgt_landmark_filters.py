@@ -0,0 +1,57 @@
+from ..cgt_core.cgt_calculators_nodes.cgt_landmark_filters import *
+import unittest
+
+
+def noisy_frames(count, speed=0.0, seed=0):
+    """ Pose moving along x with noise, the pose gets lost in frames 20-24. """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for frame in range(count):
+        if 20 <= frame < 25:
+            frames.append(LandmarkFrame('POSE', frame=frame))
+            continue
+        pose = np.zeros((33, 3)) + [frame * speed, 0, 0] + rng.normal(0, 0.005, (33, 3))
+        frames.append(LandmarkFrame.from_parts('POSE', frame, pose=pose))
+    return frames
+
+
+class TestLandmarkFilters(unittest.TestCase):
+    def assert_smoothed(self, results, frames, speed=0.0):
+        truth = np.arange(len(frames))[:, None] * speed
+        raw_error = np.mean([np.abs(f.data[:, 0] - truth[i]).mean() for i, f in enumerate(frames) if f.any()])
+        error = np.mean([np.abs(f.data[:, 0] - truth[i]).mean() for i, f in enumerate(results) if f.any()])
+        self.assertLess(error, raw_error)
+        for frame, result in zip(frames, results):
+            np.testing.assert_array_equal(frame.mask, result.mask)
+
+    def test_streaming(self):
+        frames = noisy_frames(60)
+        for landmark_filter in [OneEuroFilter(), KalmanFilter(), SavitzkyGolayFilter()]:
+            results = [landmark_filter.update(frame, idx)[0].copy() for idx, frame in enumerate(frames)]
+            self.assert_smoothed(results[1:], frames[1:])
+            # filters restart after landmarks got lost
+            np.testing.assert_array_equal(results[25].data, frames[25].data)
+
+    def test_savgol(self):
+        # polynomials up to the order get preserved
+        x = np.arange(20, dtype=np.float64)[:, None] ** 2
+        np.testing.assert_allclose(savgol_smooth(x, 7, 2), x, atol=1e-9)
+        np.testing.assert_array_equal(savgol_smooth(x[:2], 7, 2), x[:2])
+
+        frames = noisy_frames(60, speed=0.01)
+        results, _ = SavitzkyGolayFilter().update_batch(frames, range(60))
+        self.assert_smoothed(results, frames, speed=0.01)
+        self.assertFalse(results[22].any())
+
+    def test_holistic(self):
+        frames = [[LandmarkFrame.from_parts('HAND', i, left=np.full((21, 3), i)),
+                   LandmarkFrame.from_parts('FACE', i, face=np.zeros((468, 3))),
+                   LandmarkFrame('POSE', frame=i)] for i in range(5)]
+        results, _ = OneEuroFilter().update_batch(frames, range(5))
+        self.assertEqual([f.source for f in results[-1]], ['HAND', 'FACE', 'POSE'])
+        self.assertLess(results[-1][0].part('left')[0, 0], 4)
+        self.assertIsNone(results[-1][0].part('right'))
+
+
+if __name__ == '__main__':
+    unittest.main()
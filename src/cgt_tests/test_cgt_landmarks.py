@@ -0,0 +1,36 @@
+from ..cgt_core.cgt_patterns.cgt_landmarks import *
+import unittest
+import pickle
+
+
+class TestLandmarkFrame(unittest.TestCase):
+    def test_parts(self):
+        frame = LandmarkFrame.from_parts('HAND', 3, left=np.ones((21, 3)), right=[])
+        self.assertEqual(frame.data.shape, (42, 4))
+        self.assertIsNone(frame.part('right'))
+        np.testing.assert_array_equal(frame.part('left'), [[1, 1, 1, 0]] * 21)
+
+        frame.clear('left')
+        self.assertFalse(frame.any())
+        # parts with less landmarks than the layout remain invalid
+        self.assertIsNone(LandmarkFrame.from_parts('POSE', pose=np.ones((20, 3))).part('pose'))
+
+    def test_smooth(self):
+        frame = LandmarkFrame.from_parts('HAND', left=np.full((21, 4), 2.0))
+        frame.smooth(LandmarkFrame.from_parts('HAND', left=np.zeros((21, 4)), right=np.ones((21, 4))))
+        np.testing.assert_array_equal(frame.part('left'), np.ones((21, 4)))
+        np.testing.assert_array_equal(frame.part('right'), np.ones((21, 4)))
+
+        frame.smooth(LandmarkFrame('HAND'))
+        np.testing.assert_array_equal(frame.part('left'), np.ones((21, 4)))
+
+    def test_copy(self):
+        frame = LandmarkFrame.from_parts('FACE', 7, face=np.ones((478, 3)))
+        for other in [frame.copy(), pickle.loads(pickle.dumps(frame))]:
+            self.assertEqual((other.source, other.frame), ('FACE', 7))
+            np.testing.assert_array_equal(other.part('face'), frame.part('face'))
+            self.assertIsNot(other.data, frame.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
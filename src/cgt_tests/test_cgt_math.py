@@ -1,4 +1,5 @@
 from ..cgt_core.cgt_calculators_nodes.cgt_math import *
+from pathlib import Path
 import unittest
 import math
 
@@ -189,5 +190,137 @@ class TestMathutils(unittest.TestCase):
             self.assertEqual(a, b)
 
 
+class TestNumpyBackend(unittest.TestCase):
+    """ The numpy backend has to match the mathutils reference results stored in data/mathutils_rotations.npz. """
+    reference = np.load(Path(__file__).parent / 'data' / 'mathutils_rotations.npz')
+
+    def assert_quaternions(self, quarts, expected, atol=1e-5):
+        # q and -q represent the same rotation
+        sign = np.where(np.einsum('...i,...i->...', quarts, expected) < 0, -1, 1)[..., None]
+        np.testing.assert_allclose(quarts * sign, expected, atol=atol)
+
+    def test_decompose_matrix(self):
+        matrices = self.reference['matrices']
+        quarts, scales = decompose_rotations(matrices)
+        self.assert_quaternions(quaternion_invert(quarts), self.reference['matrix_quaternions'])
+        np.testing.assert_allclose(scales, self.reference['matrix_scales'], atol=1e-5)
+
+        try:
+            set_backend(NUMPY)
+            for rows, expected, expected_scale in zip(
+                    matrices[:20], self.reference['matrix_quaternions'], self.reference['matrix_scales']):
+                _, quart, scale = decompose_matrix(generate_matrix(*rows))
+                self.assert_quaternions(quart, expected)
+                np.testing.assert_allclose(scale, expected_scale, atol=1e-5)
+        finally:
+            set_backend(MATHUTILS if Euler is not None else NUMPY)
+
+    def test_quaternion_to_euler(self):
+        np.testing.assert_allclose(quaternion_to_euler(np.array([1.0, 0, 0, 0])), np.zeros(3))
+        quarts, compat, expected = self.reference['quaternions'], self.reference['compat'], self.reference['eulers']
+        np.testing.assert_allclose(quaternions_to_eulers(quarts, compat), expected, atol=1e-4)
+        for quart, prev, euler in zip(quarts[:20], compat, expected):
+            np.testing.assert_allclose(quaternion_to_euler(quart, prev), euler, atol=1e-4)
+
+    def test_euler_orders(self):
+        compat = self.reference['compat']
+        for order, quarts, expected in zip(
+                self.reference['orders'], self.reference['order_quaternions'], self.reference['order_eulers']):
+            np.testing.assert_allclose(quaternions_to_eulers(quarts, compat, str(order)), expected, atol=1e-4)
+            np.testing.assert_allclose(to_euler(quarts[0], compat[0], str(order)), expected[0], atol=1e-4)
+        self.assertRaises(ValueError, quaternion_to_euler, np.array([1.0, 0, 0, 0]), None, 'XXY')
+
+    def test_quaternions_to_eulers(self):
+        walk = self.reference['walk']
+        eulers = quaternions_to_eulers(walk)
+        self.assertEqual(eulers.shape, (50, 8, 3))
+        np.testing.assert_allclose(quaternions_to_eulers(walk[0]), eulers[0])
+        np.testing.assert_allclose(eulers, self.reference['walk_eulers'], atol=1e-4)
+
+    def test_track_quaternion(self):
+        vectors = self.reference['track_vectors']
+        for (track, up), expected in zip(self.reference['tracks'], self.reference['track_quaternions']):
+            np.testing.assert_allclose(vector_to_track_quaternion(vectors, track, up), expected, atol=1e-5)
+            np.testing.assert_allclose(vector_to_track_quaternion(vectors[0], track, up), expected[0], atol=1e-5)
+
+
+@unittest.skipIf(Euler is None, "mathutils is only available inside of Blender")
+class TestMathutilsParity(unittest.TestCase):
+    """ The numpy backend has to match the live mathutils results. """
+    rng = np.random.default_rng(0)
+
+    def random_matrices(self, count):
+        for _ in range(count):
+            tangent, normal = normalize(self.rng.normal(size=3)), normalize(self.rng.normal(size=3))
+            binormal = normalize(np.cross(tangent, normal))
+            normal = np.cross(binormal, tangent)
+            yield tangent * self.rng.uniform(0.5, 2), normal, binormal
+
+    def test_decompose_matrix(self):
+        for tangent, normal, binormal in self.random_matrices(200):
+            _, expected, scale = decompose_matrix(generate_matrix(tangent, normal, binormal))
+            try:
+                set_backend(NUMPY)
+                _, quart, np_scale = decompose_matrix(generate_matrix(tangent, normal, binormal))
+            finally:
+                set_backend(MATHUTILS)
+            # q and -q represent the same rotation
+            sign = np.sign(np.dot(quart, expected)) or 1
+            np.testing.assert_allclose(quart * sign, expected, atol=1e-5)
+            np.testing.assert_allclose(np_scale, scale, atol=1e-5)
+
+    def test_quaternion_to_euler(self):
+        np.testing.assert_allclose(quaternion_to_euler(np.array([1.0, 0, 0, 0])), np.zeros(3))
+        for _ in range(200):
+            quart = normalize(self.rng.normal(size=4))
+            compat = self.rng.uniform(-2 * np.pi, 2 * np.pi, 3)
+            expected = Quaternion(quart).to_euler('XYZ', Euler(compat))
+            np.testing.assert_allclose(to_euler(quart, compat), expected, atol=1e-4)
+
+    def test_euler_orders(self):
+        for order in EULER_ORDERS:
+            for _ in range(50):
+                quart = normalize(self.rng.normal(size=4))
+                compat = self.rng.uniform(-2 * np.pi, 2 * np.pi, 3)
+                expected = Quaternion(quart).to_euler(order, Euler(compat, order))
+                np.testing.assert_allclose(to_euler(quart, compat, order), expected, atol=1e-4)
+
+    def test_quaternions_to_eulers(self):
+        # random walks including sign flips of the quaternions
+        quarts = np.cumsum(self.rng.normal(scale=0.2, size=(50, 8, 4)), axis=0) + self.rng.normal(size=(8, 4))
+        quarts *= np.sign(self.rng.normal(size=(50, 8, 1))) / np.linalg.norm(quarts, axis=-1, keepdims=True)
+        eulers = quaternions_to_eulers(quarts)
+        self.assertEqual(eulers.shape, (50, 8, 3))
+        np.testing.assert_allclose(quaternions_to_eulers(quarts[0]), eulers[0])
+        for n in range(8):
+            prev = Euler()
+            for t in range(50):
+                prev = Quaternion(quarts[t, n]).to_euler('XYZ', prev)
+                np.testing.assert_allclose(eulers[t, n], prev, atol=1e-4)
+
+    def test_track_quaternion(self):
+        for track in ['X', 'Y', 'Z', '-X', '-Y', '-Z']:
+            for up in ['X', 'Y', 'Z']:
+                if track[-1] == up:
+                    continue
+                for _ in range(20):
+                    vec = normalize(self.rng.normal(size=3))
+                    expected = Vector(vec).to_track_quat(track, up)
+                    np.testing.assert_allclose(vector_to_track_quaternion(vec, track, up), expected, atol=1e-5)
+
+    def test_set_backend(self):
+        self.assertRaises(ValueError, set_backend, 'scipy')
+        origin, destination = np.zeros(3), np.array([0.2, -1, 0.5])
+        expected = rotate_towards(origin, destination, 'Y', 'Z')
+        try:
+            set_backend(NUMPY)
+            quart = rotate_towards(origin, destination, 'Y', 'Z')
+            self.assertIsInstance(quart, np.ndarray)
+            self.assertIsInstance(euler_rotation((0, 0, 0)), np.ndarray)
+            np.testing.assert_allclose(quart, expected, atol=1e-6)
+        finally:
+            set_backend(MATHUTILS)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+from ..cgt_mediapipe.cgt_mp_core import mp_landmark_cache, mp_movie_keying
+from ..cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
+from ..cgt_core.cgt_patterns import cgt_nodes
+from types import SimpleNamespace
+from pathlib import Path
+import numpy as np
+import unittest
+import tempfile
+
+
+class Record(cgt_nodes.OutputNode):
+    def __init__(self):
+        self.results = []
+
+    def update(self, data, frame):
+        self.results.append((float(data.part('pose')[0, 0]), frame))
+        return data, frame
+
+
+class TestMovieKeying(unittest.TestCase):
+    def replay_cached_movie(self, key_step: int, sample_frames: bool, sample_window: int, start_frame: int = 1):
+        """ Replays a cached movie like the detection operator, frame by frame. """
+        user = SimpleNamespace(landmark_filter='average')
+        filter_node = mp_movie_keying.landmark_filter(user, rate=30)
+        self.assertIsNone(filter_node)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # cache entry of 20 frames, the landmarks store the frame index
+            writer = mp_landmark_cache.LandmarkCacheWriter('POSE')
+            writer.extend([LandmarkFrame.from_parts('POSE', idx, pose=np.full((33, 3), idx)) for idx in range(20)])
+            writer.save('movie', cache_dir=Path(directory))
+
+            sample_step = key_step if sample_frames else 1
+            node_chain = mp_landmark_cache.cached_chain(
+                'movie', Record, sample_step=sample_step, sample_window=sample_window,
+                sample_offset=-start_frame, cache_dir=Path(directory))
+            self.assertIsInstance(node_chain.nodes[0], mp_landmark_cache.CachedLandmarkInput)
+
+        input_node, record = node_chain.nodes
+        memo, frame = None, start_frame
+        while True:
+            data, frame = mp_movie_keying.next_movie_frame(input_node, frame, start_frame, sample_frames)
+            if data is None:
+                break
+            memo, keyed = mp_movie_keying.smooth_movie_frame(memo, data, frame, key_step, filter_node)
+            frame += 1
+            if keyed is not None:
+                record.update(*keyed)
+        return record.results
+
+    def test_cached_sampling(self):
+        # keyed frames are multiples of the key step, starting at frame 1
+        results = self.replay_cached_movie(key_step=4, sample_frames=True, sample_window=2)
+        self.assertEqual(results, [(2.5, 4), (6.5, 8), (10.5, 12), (14.5, 16), (18.5, 20)])
+
+        # without sampling, all frames get replayed and smoothed
+        results = self.replay_cached_movie(key_step=4, sample_frames=False, sample_window=2)
+        self.assertEqual(results, [(2.125, 4), (6.125, 8), (10.125, 12), (14.125, 16), (18.125, 20)])
+
+    def test_key_movie(self):
+        frames = [LandmarkFrame.from_parts('POSE', idx, pose=np.full((33, 3), idx)) for idx in range(20)]
+        keyed = mp_movie_keying.key_movie(frames, start_frame=1, key_step=4)
+        self.assertEqual([(float(data.part('pose')[0, 0]), frame) for data, frame in keyed],
+                         [(2.125, 4), (6.125, 8), (10.125, 12), (14.125, 16), (18.125, 20)])
+
+    def test_missing_cache_entry(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # the chain template doesn't get created without cache entry
+            templates = []
+            chain = mp_landmark_cache.cached_chain('movie', lambda: templates.append(Record()), cache_dir=Path(directory))
+            self.assertIsNone(chain)
+            self.assertEqual(templates, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
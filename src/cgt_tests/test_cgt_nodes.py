@@ -0,0 +1,211 @@
+from ..cgt_core.cgt_patterns.cgt_nodes import *
+from ..cgt_core.cgt_utils import cgt_metrics, cgt_tracing
+import unittest
+import threading
+
+
+class Counter(InputNode):
+    def __init__(self, count):
+        self.count = count
+
+    def update(self, data, frame):
+        if frame >= self.count:
+            return None, frame
+        return [frame], frame
+
+
+class ReusingCounter(Counter):
+    reuses_data = True
+
+    def __init__(self, count):
+        super().__init__(count)
+        self.buffer = [0]
+
+    def update(self, data, frame):
+        if frame >= self.count:
+            return None, frame
+        self.buffer[0] = frame
+        return self.buffer, frame
+
+
+class Pair(Counter):
+    def update(self, data, frame):
+        if frame >= self.count:
+            return None, frame
+        return [[frame], [-frame]], frame
+
+
+class Double(CalculatorNode):
+    def update(self, data, frame):
+        return [x * 2 for x in data], frame
+
+
+class Record(OutputNode):
+    def __init__(self):
+        self.results = []
+        self.threads = set()
+
+    def update(self, data, frame):
+        self.results.append((data, frame))
+        self.threads.add(threading.current_thread())
+        return data, frame
+
+
+class TestNodes(unittest.TestCase):
+    def test_split_main_thread(self):
+        chain = NodeChain()
+        chain.append(Double())
+        chain.append(Record())
+        group = NodeChainGroup()
+        group.nodes = [chain, NodeChain()]
+
+        worker, main = split_main_thread(group)
+        self.assertIsInstance(worker.nodes[0].nodes[0], Double)
+        self.assertIsInstance(main.nodes[0].nodes[0], Record)
+        self.assertEqual(worker.update([[1], [2]], 0), ([[2], [2]], 0))
+
+        # the worker part keeps the executor of the group
+        group = NodeChainGroup(cgt_executors.THREAD)
+        group.nodes = [chain, NodeChain()]
+        worker, main = split_main_thread(group)
+        self.assertEqual(worker.executor_type, cgt_executors.THREAD)
+        self.assertEqual(main.executor_type, cgt_executors.SEQUENTIAL)
+        self.assertEqual(worker.update([[1], [2]], 0), ([[2], [2]], 0))
+        worker.close()
+
+    def test_pipelined_chain(self):
+        for counter in [Counter(20), ReusingCounter(20)]:
+            record = Record()
+            chain = PipelinedNodeChain(frame_step=1)
+            chain.append(counter)
+            chain.append(Double())
+            chain.append(record)
+
+            data, frame = chain.update([], 0)
+            while data is not None:
+                data, frame = chain.update([], frame)
+            chain.stop()
+
+            self.assertEqual(record.results, [([x * 2], x) for x in range(20)])
+            self.assertEqual(record.threads, {threading.main_thread()})
+
+        # chains without worker stages get started once
+        chain = PipelinedNodeChain()
+        chain.append(Record())
+        chain.update([1], 0)
+        main_nodes = chain.main_nodes
+        self.assertEqual(chain.update([2], 1), ([2], 1))
+        self.assertIs(chain.main_nodes, main_nodes)
+        self.assertEqual(chain.main_nodes.nodes[0].results, [([1], 0), ([2], 1)])
+
+    def test_pipelined_group(self):
+        record = Record()
+        chains = [NodeChain(), NodeChain()]
+        chains[0].append(Double())
+        chains[0].append(record)
+        chains[1].append(Double())
+        group = NodeChainGroup(cgt_executors.THREAD)
+        group.nodes = chains
+
+        chain = PipelinedNodeChain()
+        chain.append(Pair(5))
+        chain.append(group)
+        data, frame = chain.update([], 0)
+        while data is not None:
+            data, frame = chain.update([], frame)
+        chain.close()
+
+        self.assertEqual(record.results, [([x * 2], x) for x in range(5)])
+        # the executor of the split worker group got shut down
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name.startswith('cgt_node')])
+
+    def test_update_batch(self):
+        chain = NodeChain()
+        chain.append(Double())
+        chain.append(Record())
+        self.assertEqual(chain.update_batch([[1], None, [3]], [0, 1, 2]), ([[2], None, [6]], [0, 1, 2]))
+
+        group = NodeChainGroup()
+        group.nodes = [chain, NodeChain()]
+        self.assertEqual(group.update_batch([[[1], [1]], [[2], [2]]], [0, 1]), ([[[2], [1]], [[4], [2]]], [0, 1]))
+
+    def test_stream(self):
+        chain = NodeChain()
+        chain.append(Counter(6))
+        chain.append(Double())
+        stream = chain.stream(frame=0, frame_step=2)
+        self.assertEqual(next(stream), ([0], 0))
+        self.assertEqual(list(stream), [([4], 2), ([8], 4)])
+
+        # external sources skip the input node, frames without data pass through
+        chain = NodeChain()
+        chain.append(Double())
+        group = NodeChainGroup()
+        group.nodes = [NodeChain(), chain]
+        source = iter([([[1], [1]], 7), (None, 8)])
+        self.assertEqual(list(group.stream(source)), [([[1], [2]], 7), (None, 8)])
+
+    def test_metrics(self):
+        chain = NodeChain()
+        chain.append(Double())
+        chain.append(Record())
+
+        cgt_metrics.REGISTRY.reset()
+        chain.update([1], 0)
+        self.assertEqual(cgt_metrics.REGISTRY.snapshot()['nodes'], {})
+
+        cgt_metrics.REGISTRY.enable()
+        try:
+            for frame in range(3):
+                chain.update([1], frame)
+        finally:
+            cgt_metrics.REGISTRY.disable()
+
+        snapshot = cgt_metrics.REGISTRY.snapshot()
+        self.assertEqual({name: stats['count'] for name, stats in snapshot['nodes'].items()},
+                         {'NodeChain': 3, 'Double': 3, 'Record': 3})
+        self.assertEqual(set(snapshot['categories_total_ms']), {'chain', 'calculator', 'output'})
+
+    def test_tracing(self):
+        chain = NodeChain()
+        chain.append(Double())
+        chain.append(Record())
+
+        cgt_tracing.TRACER.clear()
+        cgt_tracing.TRACER.enable()
+        try:
+            chain.update([1], 3)
+            with cgt_tracing.trace_scope("scope"):
+                pass
+        finally:
+            cgt_tracing.TRACER.disable()
+
+        events = [event for event in cgt_tracing.TRACER.to_chrome()['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual([event['name'] for event in events], ['Double', 'Record', 'NodeChain', 'scope'])
+        self.assertEqual(events[0]['args'], {'frame': 3})
+        self.assertLessEqual(events[2]['ts'], events[0]['ts'])
+
+    def run_group(self, executor):
+        records = [Record(), Record()]
+        group = NodeChainGroup(executor)
+        for record in records:
+            chain = NodeChain()
+            chain.append(Double())
+            chain.append(record)
+            group.nodes.append(chain)
+
+        results = [group.update([[frame], [-frame]], frame)[0] for frame in range(5)]
+        group.close()
+        return results, records
+
+    def test_group_executors(self):
+        expected, _ = self.run_group(cgt_executors.SEQUENTIAL)
+        for executor in [cgt_executors.THREAD, cgt_executors.PROCESS]:
+            results, records = self.run_group(executor)
+            self.assertEqual(results, expected)
+            self.assertEqual(records[1].results, [([-frame * 2], frame) for frame in range(5)])
+            self.assertEqual(records[0].threads, {threading.main_thread()})
+
+
+if __name__ == '__main__':
+    unittest.main()
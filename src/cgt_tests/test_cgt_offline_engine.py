@@ -0,0 +1,43 @@
+from ..cgt_mediapipe.cgt_mp_core.mp_offline_engine import *
+from ..cgt_core.cgt_patterns.cgt_landmarks import LandmarkFrame
+import unittest
+import tempfile
+
+
+class TestOfflineEngine(unittest.TestCase):
+    def test_seek(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # the brightness of the frames encodes their index
+            path = os.path.join(directory, 'movie.mp4')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 64))
+            for idx in range(40):
+                writer.write(np.full((64, 64, 3), idx * 6, dtype=np.uint8))
+            writer.release()
+
+            capture = cv2.VideoCapture(path)
+            expected = [capture.read()[1].mean() for _ in range(40)]
+            capture.release()
+
+            for frame in [0, 13, 39]:
+                capture = cv2.VideoCapture(path)
+                self.assertTrue(seek(capture, frame))
+                updated, image = capture.read()
+                capture.release()
+                self.assertTrue(updated)
+                self.assertEqual(image.mean(), expected[frame])
+
+            capture = cv2.VideoCapture(path)
+            self.assertFalse(seek(capture, 50))
+            capture.release()
+
+    def test_merge_chunks(self):
+        empty = LandmarkFrame('POSE')
+        chunks = [[LandmarkFrame('POSE', frame=idx) for idx in range(start, end)]
+                  for start, end in [(0, 3), (3, 4), (6, 8)]]
+        results = merge_chunks(chunks, [(0, 3), (3, 6), (6, None)], empty)
+        self.assertEqual([frame.frame for frame in results], [0, 1, 2, 3, -1, -1, 6, 7])
+        self.assertIsNot(results[4], results[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+from ..cgt_core.cgt_bpy.cgt_take_buffer import *
+import unittest
+
+
+class TestTakeBuffer(unittest.TestCase):
+    def test_write(self):
+        take = TakeBuffer([None] * 3, chunk_size=4)
+        for frame in range(10):
+            take.write('location', frame, [0, 5], [[frame, 0, 0], [1, 1, 1]])
+            take.write('rotation_euler', frame, [1], [[0, frame, 0]], offset=1)
+
+        self.assertEqual((len(take), take.capacity), (10, 12))
+        np.testing.assert_array_equal(take.view('location', 0)[:, 0], np.arange(10))
+        np.testing.assert_array_equal(take.view('rotation_euler', 2)[:, 1], np.arange(10))
+        self.assertTrue(np.isnan(take.view('location', 1)).all())
+        self.assertIsNone(take.view('scale'))
+        # object views share the memory of the take
+        self.assertTrue(np.shares_memory(take.view('location', 0), take.data['location']))
+
+    def test_flush(self):
+        ob = bpy.data.objects.new("cgt_take_buffer_test", None)
+        try:
+            ob.location = (5, 5, 5)
+            ob.keyframe_insert(data_path="location", frame=0)
+            ob.keyframe_insert(data_path="location", frame=1)
+
+            fc = ob.animation_data.action.fcurves.find('location', index=0)
+            key = fc.keyframe_points[1]
+            key.interpolation, key.type, key.handle_left_type = 'CONSTANT', 'BREAKDOWN', 'FREE'
+            key.handle_left = (0.5, 7)
+
+            take = TakeBuffer([ob])
+            for frame in range(1, 4):
+                take.write('location', frame, [0], [[frame, 0, 0]])
+            take.flush()
+
+            self.assertEqual(len(take), 0)
+            fc = ob.animation_data.action.fcurves.find('location', index=0)
+            self.assertEqual([tuple(k.co) for k in fc.keyframe_points], [(0, 5), (1, 1), (2, 2), (3, 3)])
+            # existing keyframes keep their settings, the handles move along with the value
+            key = fc.keyframe_points[1]
+            self.assertEqual((key.interpolation, key.type, key.handle_left_type), ('CONSTANT', 'BREAKDOWN', 'FREE'))
+            self.assertEqual(tuple(key.handle_left), (0.5, 3))
+            self.assertIsNone(ob.animation_data.action.fcurves.find('scale', index=0))
+        finally:
+            bpy.data.objects.remove(ob)
+
+
+if __name__ == '__main__':
+    unittest.main()